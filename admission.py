@@ -0,0 +1,217 @@
+# admission.py
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, jsonify, request
+
+from single_flight import Abandoned
+
+# WSGI environ key for a threading.Event the server sets when the client goes away
+DISCONNECTED = "dbanalytics.disconnected"
+
+
+class QueryCancelled(Abandoned):
+    """The statement was cancelled because its client disconnected."""
+
+
+class RouteBudget:
+    """At most ``limit`` requests run at once; up to ``queue`` more wait in line.
+
+    A queued request gives up after ``wait_timeout`` seconds, and one that
+    finds the queue full is turned away immediately.
+    """
+
+    def __init__(self, limit, queue=0, wait_timeout=10.0):
+        if limit < 1 or queue < 0:
+            raise ValueError("Route budgets need limit >= 1 and queue >= 0")
+        self.limit = limit
+        self.queue = queue
+        self.wait_timeout = wait_timeout
+        self.running = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        self._counters = {"admitted": 0, "queued": 0, "shed": 0, "wait_timeouts": 0, "wait_seconds": 0.0}
+
+    @classmethod
+    def parse(cls, spec, wait_timeout=10.0):
+        """Build from ``"limit:queue"``, e.g. ``"2:8"``."""
+        limit, _, queue = spec.partition(":")
+        return cls(int(limit), int(queue or 0), wait_timeout)
+
+    def acquire(self):
+        with self._cond:
+            # Join the line behind anyone already waiting
+            if self.running >= self.limit or self.waiting:
+                if self.waiting >= self.queue:
+                    self._counters["shed"] += 1
+                    return False
+                self.waiting += 1
+                self._counters["queued"] += 1
+                started = time.monotonic()
+                try:
+                    while self.running >= self.limit:
+                        remaining = started + self.wait_timeout - time.monotonic()
+                        if remaining <= 0:
+                            self._counters["wait_timeouts"] += 1
+                            return False
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                    self._counters["wait_seconds"] += time.monotonic() - started
+            self.running += 1
+            self._counters["admitted"] += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.running -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {"limit": self.limit, "queue": self.queue, "running": self.running,
+                    "waiting": self.waiting, **self._counters}
+
+
+class _Watch:
+    __slots__ = ("cursor", "gone", "cancelled")
+
+    def __init__(self, cursor, gone):
+        self.cursor = cursor
+        self.gone = gone
+        self.cancelled = False
+
+
+class AdmissionControl:
+    """Per-route concurrency budgets in front of the database-backed views.
+
+    Budgets are keyed by Flask endpoint. A request over budget waits in its
+    route's queue; when that is full (or the wait runs out) it is answered
+    with ``503`` and ``Retry-After`` before any query is issued. Statements
+    run under :meth:`watch` are cancelled once their client disconnects.
+    """
+
+    def __init__(self, budgets, retry_after=5, watch_interval=1.0):
+        self.budgets = budgets
+        self.retry_after = retry_after
+        self.watch_interval = watch_interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._counters = {"cancelled": 0}
+
+    @classmethod
+    def from_env(cls, defaults, prefix="ADMISSION_"):
+        """``defaults`` maps endpoint to ``"limit:queue"``; ``ADMISSION_<ENDPOINT>`` overrides it."""
+        env = os.environ
+        wait_timeout = float(env.get(prefix + "WAIT_TIMEOUT", 10))
+        budgets = {endpoint: RouteBudget.parse(env.get(prefix + endpoint.upper(), spec), wait_timeout)
+                   for endpoint, spec in defaults.items()}
+        return cls(budgets, retry_after=int(env.get(prefix + "RETRY_AFTER", 5)),
+                   watch_interval=float(env.get(prefix + "WATCH_INTERVAL", 1)))
+
+    def init_app(self, app):
+        @app.before_request
+        def _admit():
+            budget = self.budgets.get(request.endpoint)
+            if budget is None:
+                return None
+            if not budget.acquire():
+                response = jsonify({"error": "Server busy, try again shortly"})
+                response.status_code = 503
+                response.headers["Retry-After"] = str(self.retry_after)
+                return response
+            g.admission = budget
+            return None
+
+        @app.after_request
+        def _hold_while_streaming(response):
+            # A streamed body keeps its cursor open until the last chunk is sent
+            if response.is_streamed:
+                budget = g.pop("admission", None)
+                if budget is not None:
+                    response.call_on_close(budget.release)
+            return response
+
+        @app.teardown_request
+        def _release(exc):
+            budget = g.pop("admission", None)
+            if budget is not None:
+                budget.release()
+
+        @app.errorhandler(QueryCancelled)
+        def _cancelled(e):
+            return "", 499
+
+    @contextmanager
+    def watch(self, cursor):
+        """Cancel ``cursor``'s statement if the current request's client disconnects."""
+        gone = _disconnect_probe()
+        if gone is None or self.watch_interval <= 0:
+            yield
+            return
+        watch = _Watch(cursor, gone)
+        with self._lock:
+            self._watched[id(watch)] = watch
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="admission-watch", daemon=True)
+                self._thread.start()
+        try:
+            yield
+        except Exception as e:
+            if watch.cancelled:
+                raise QueryCancelled("Client disconnected") from e
+            raise
+        finally:
+            with self._lock:
+                del self._watched[id(watch)]
+
+    def cancel(self, cursor):
+        """Cancel ``cursor``'s running statement, ignoring driver errors."""
+        # pyodbc cursors cancel; SQLite and DuckDB interrupt their connection
+        cancel = (getattr(cursor, "cancel", None) or getattr(cursor, "interrupt", None)
+                  or getattr(getattr(cursor, "connection", None), "interrupt", None))
+        try:
+            cancel()
+        except Exception:
+            return
+        with self._lock:
+            self._counters["cancelled"] += 1
+
+    def _loop(self):
+        while True:
+            time.sleep(self.watch_interval)
+            with self._lock:
+                watched = list(self._watched.values())
+            for watch in watched:
+                if not watch.cancelled and watch.gone():
+                    watch.cancelled = True
+                    self.cancel(watch.cursor)
+
+    def stats(self):
+        with self._lock:
+            counters = {"watching": len(self._watched), **self._counters}
+        return {**counters, "routes": {endpoint: b.stats() for endpoint, b in self.budgets.items()}}
+
+
+def _disconnect_probe():
+    if not has_request_context():
+        return None
+    environ = request.environ
+    event = environ.get(DISCONNECTED)
+    if event is not None:
+        return event.is_set
+    sock = environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+    return (lambda: _socket_closed(sock)) if sock is not None else None
+
+
+def _socket_closed(sock):
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
@@ -0,0 +1,100 @@
+# asgi.py
+"""ASGI entry point serving the Flask routes from an event loop.
+
+Run with ``uvicorn asgi:app`` (or gunicorn's uvicorn worker). The WSGI
+bridge is asgiref's ``WsgiToAsgi`` with two changes:
+
+* requests run on a bounded pool of ``ASGI_EXECUTOR_WORKERS`` threads.
+  asgiref's default is thread-sensitive mode, which runs every request on
+  one shared thread;
+* a client disconnect sets a ``threading.Event`` in the environ, so the
+  request's running statement can be cancelled.
+
+The event loop parks any number of connections, and a slow aggregation
+ties up one pool thread rather than a whole worker.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from admission import DISCONNECTED
+from main import app as flask_app
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASGI_EXECUTOR_WORKERS", 16)), thread_name_prefix="asgi")
+
+
+class _GoneBeforeBody(Exception):
+    pass
+
+
+def _closing(wsgi_app):
+    """``wsgi_app`` with its result closed however iteration ends; asgiref never calls ``close()``."""
+    def app(environ, start_response):
+        result = wsgi_app(environ, start_response)
+        try:
+            yield from result
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+    return app
+
+
+async def _watch_disconnect(receive, disconnected):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+    disconnected.set()
+
+
+class _Instance(WsgiToAsgiInstance):
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__["run_wsgi_app"].func,
+                                 thread_sensitive=False, executor=executor)
+
+    async def __call__(self, scope, receive, send):
+        self.disconnected = threading.Event()
+        watcher = None
+
+        async def receive_body():
+            nonlocal watcher
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise _GoneBeforeBody
+            if not message.get("more_body"):
+                # The body is complete; from here on the only message left is the disconnect
+                watcher = asyncio.ensure_future(_watch_disconnect(receive, self.disconnected))
+            return message
+
+        try:
+            await super().__call__(scope, receive_body, send)
+        except _GoneBeforeBody:
+            pass
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    def build_environ(self, scope, body):
+        environ = super().build_environ(scope, body)
+        environ[DISCONNECTED] = self.disconnected
+        return environ
+
+
+class FlaskAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        await _Instance(self.wsgi_application)(scope, receive, send)
+
+
+app = FlaskAsgi(_closing(flask_app.wsgi_app))
@@ -0,0 +1,165 @@
+# backends.py
+"""Source databases the analytics routes can read ``vwSaleDetail`` from.
+
+``DB_BACKEND`` picks one:
+
+``mssql`` (default)
+    The live SQL Server through pyodbc (``DB_CONNECTION_STRING``), with a
+    per-statement timeout of ``DB_STATEMENT_TIMEOUT`` seconds.
+``sqlite``
+    A local SQLite file at ``DB_PATH``, opened read-only.
+``duckdb``
+    An embedded DuckDB database at ``DB_PATH``, opened read-only, or a
+    directory of Parquet snapshots (``flask export-snapshots``) exposed as
+    a ``vwSaleDetail`` view. Use it to take read-heavy analytics off the
+    OLTP server entirely.
+
+Each backend names its SQL dialect (see ``query_builder.DIALECTS``) and
+hands out DB-API connections for :class:`db_pool.ConnectionPool`.
+"""
+import os
+import sqlite3
+import threading
+import urllib.request
+from datetime import date, datetime
+
+from snapshots import PARTITION_TYPES
+
+
+class Backend:
+    name = None
+    dialect = None
+
+    @classmethod
+    def from_env(cls, prefix="DB_"):
+        """On :class:`Backend` itself, build whichever backend ``DB_BACKEND`` names."""
+        if cls is Backend:
+            name = os.environ.get(prefix + "BACKEND", "mssql")
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown {prefix}BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+            return BACKENDS[name].from_env(prefix)
+        return cls(os.environ.get(prefix + "PATH", ""))
+
+    def connect(self):
+        raise NotImplementedError
+
+    def describe(self):
+        return {"backend": self.name, "dialect": self.dialect}
+
+
+DEFAULT_CONNECTION_STRING = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=;"
+    "DATABASE=;"
+    "UID=;"
+    "PWD=;"
+)
+
+
+class SqlServerBackend(Backend):
+    name = dialect = "mssql"
+
+    def __init__(self, connection_string=DEFAULT_CONNECTION_STRING, statement_timeout=60):
+        self.connection_string = connection_string
+        # Seconds before SQL Server abandons a statement (0 = no limit); applies to every cursor
+        self.statement_timeout = statement_timeout
+
+    @classmethod
+    def from_env(cls, prefix="DB_"):
+        env = os.environ
+        return cls(env.get(prefix + "CONNECTION_STRING", DEFAULT_CONNECTION_STRING),
+                   int(env.get(prefix + "STATEMENT_TIMEOUT", 60)))
+
+    def connect(self):
+        import pyodbc
+        try:
+            conn = pyodbc.connect(self.connection_string)
+            conn.timeout = self.statement_timeout
+            return conn
+        except Exception as e:
+            print("❌ DB Error:", e)
+            raise
+
+
+class SqliteBackend(Backend):
+    name = dialect = "sqlite"
+
+    def __init__(self, path):
+        if not path:
+            raise ValueError("DB_PATH must name the SQLite file")
+        self.path = path
+        # Bind datetimes in the text form the stand-in stores them in
+        sqlite3.register_adapter(datetime, lambda v: v.isoformat(" "))
+        sqlite3.register_adapter(date, lambda v: v.isoformat())
+
+    def connect(self):
+        # The pool hands a connection to one thread at a time
+        uri = "file:" + urllib.request.pathname2url(os.path.abspath(self.path)) + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def describe(self):
+        return {**super().describe(), "path": self.path}
+
+
+class _DuckDBConnection:
+    """One DuckDB connection, adapted to what the pool expects.
+
+    Each cursor is a child connection of its own, so the pool closing a
+    cursor (after a ping, or on statement-cache eviction) leaves this one
+    open. DuckDB raises when rolling back outside a transaction, which the
+    pool would take for a broken connection; the snapshots are read-only,
+    so there is nothing to undo.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.conn.close()
+
+
+class DuckDBBackend(Backend):
+    name = dialect = "duckdb"
+
+    def __init__(self, path):
+        if not path:
+            raise ValueError("DB_PATH must name the DuckDB file or Parquet snapshot directory")
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        import duckdb
+        if os.path.isdir(self.path):
+            db = duckdb.connect(":memory:")
+            pattern = os.path.join(self.path, "**", "*.parquet").replace("'", "''")
+            types = ", ".join(f"'{c}': '{t}'" for c, t in PARTITION_TYPES.items())
+            # Filters on the partition columns prune whole files (see snapshots.py)
+            db.execute(f"CREATE VIEW vwSaleDetail AS SELECT * FROM read_parquet('{pattern}', "
+                       f"hive_partitioning = true, hive_types = {{{types}}}, union_by_name = true)")
+            return db
+        return duckdb.connect(self.path, read_only=True)
+
+    def connect(self):
+        # Every pooled connection is a cursor on one shared database instance,
+        # which is how DuckDB is used from several threads.
+        with self._lock:
+            if self._db is None:
+                self._db = self._open()
+            return _DuckDBConnection(self._db.cursor())
+
+    def describe(self):
+        return {**super().describe(), "path": self.path}
+
+
+BACKENDS = {
+    "mssql": SqlServerBackend,
+    "sqlite": SqliteBackend,
+    "duckdb": DuckDBBackend,
+}
@@ -0,0 +1,35 @@
+#!/bin/sh
+# Benchmark gate for CI; exits non-zero on a regression.
+#
+#   bench/ci.sh             compare with the committed bench/baselines/reference.json
+#   bench/ci.sh origin/main record BASE_REF on this runner first, then compare with that
+#
+# Timings only compare on the same machine, so on shared CI runners pass the
+# base ref: both sides then run back to back on the same hardware and data.
+# The committed reference was recorded with BENCH_ARGS below; re-record it
+# with `python -m bench.suite $BENCH_ARGS --save-baseline reference` when the
+# benchmark machine or an intended performance trade-off changes.
+set -eu
+
+BENCH_ARGS=${BENCH_ARGS:-"--years 0.25 --concurrency 1,8 --duration 5"}
+# Five-second runs on one machine still vary by up to ~25% at 8 clients
+TOLERANCE=${BENCH_TOLERANCE:-0.35}
+ROOT=$(cd "$(dirname "$0")/.." && pwd)
+DATA=${BENCH_DATA:-$ROOT/bench/data}
+cd "$ROOT"
+
+if [ $# -eq 0 ]; then
+    exec python -m bench.suite $BENCH_ARGS --data "$DATA" --compare reference --tolerance "$TOLERANCE"
+fi
+
+BASE=$(mktemp -d)
+trap 'git worktree remove --force "$BASE"' EXIT
+git worktree add --detach "$BASE" "$1"
+if [ -f "$BASE/bench/suite.py" ]; then
+    (cd "$BASE" && python -m bench.suite $BENCH_ARGS --data "$DATA" --save-baseline ci-base)
+    cp "$BASE/bench/baselines/ci-base.json" bench/baselines/ci-base.json
+    python -m bench.suite $BENCH_ARGS --data "$DATA" --compare ci-base --tolerance "$TOLERANCE"
+else
+    echo "⚠️ $1 has no benchmark suite; comparing with the committed reference"
+    python -m bench.suite $BENCH_ARGS --data "$DATA" --compare reference --tolerance "$TOLERANCE"
+fi
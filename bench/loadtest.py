@@ -0,0 +1,93 @@
+# bench/loadtest.py
+"""Closed-loop HTTP load test comparing serving modes.
+
+Start the same app twice, e.g.::
+
+    python main.py                              # Flask sync, :5000
+    uvicorn asgi:app --port 8000                # ASGI, :8000
+
+then::
+
+    python -m bench.loadtest --target sync=http://127.0.0.1:5000 \\
+        --target asgi=http://127.0.0.1:8000 --path "/peak-by-date-range?start=2024-01-01&end=2024-12-31"
+
+Each concurrency level runs ``--duration`` seconds with that many clients
+issuing requests back to back, and reports throughput and latency
+percentiles per target.
+"""
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def run_level(url, clients, duration, timeout):
+    """``url`` may be a callable returning the next URL, to vary parameters per request."""
+    next_url = url if callable(url) else (lambda: url)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(next_url(), timeout=timeout) as resp:
+                    resp.read()
+                local.append(time.perf_counter() - started)
+            except (urllib.error.URLError, OSError):
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": (percentile(latencies, 50) or 0) * 1000,
+        "p95_ms": (percentile(latencies, 95) or 0) * 1000,
+        "p99_ms": (percentile(latencies, 99) or 0) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", action="append", required=True, metavar="NAME=BASE_URL")
+    parser.add_argument("--path", default="/dashboard?panels=avg_spending,peak_times")
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    print(f"{'target':<10} {'clients':>7} {'reqs':>7} {'errors':>6} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for target in args.target:
+        name, _, base = target.partition("=")
+        for clients in levels:
+            r = run_level(base.rstrip("/") + args.path, clients, args.duration, args.timeout)
+            print(f"{name:<10} {r['clients']:>7} {r['requests']:>7} {r['errors']:>6} {r['rps']:>8.1f} "
+                  f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
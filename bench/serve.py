@@ -0,0 +1,47 @@
+# bench/serve.py
+"""Serve the app against a synthetic stand-in database (started by ``bench.suite``).
+
+    python -m bench.serve --backend sqlite --db bench/data/vwSaleDetail-<key>.sqlite3 --port 5099
+
+With ``--rollups PATH`` the rollup stores are built over the whole
+history before serving, as ``build-rollups`` would in production.
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"], default="sqlite")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--rollups", default="", help="Rollup database path (default: rollups off).")
+    parser.add_argument("--since", default=None, help="First day to roll up (YYYY-MM-DD).")
+    parser.add_argument("--through", default=None, help="Day after the last one to roll up (YYYY-MM-DD).")
+    args = parser.parse_args(argv)
+
+    # main reads its configuration at import time
+    os.environ["DB_BACKEND"] = args.backend
+    os.environ["DB_PATH"] = args.db
+    os.environ["ROLLUP_DB_PATH"] = args.rollups
+    import main as app_main
+
+    if args.rollups:
+        since = datetime.fromisoformat(args.since)
+        through = datetime.fromisoformat(args.through) if args.through else None
+        for store in app_main.ROLLUP_STORES:
+            rows = store.build(app_main.fetch_all, since, through, chunk=timedelta(days=7))
+            print(f"✅ {store.name}: rolled up {rows} rows", flush=True)
+
+    from werkzeug.serving import make_server
+    # One access log line per benchmark request would swamp the results table
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", args.port, app_main.app, threaded=True)
+    print(f"Serving on http://127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# bench/suite.py
+"""Route benchmark against a synthetic stand-in, with stored baselines.
+
+Generates (once) a synthetic ``vwSaleDetail`` for the given spec, serves the
+app on it in a child process, then drives each scenario at every
+concurrency level with randomized date ranges and branches::
+
+    python -m bench.suite --save-baseline local        # record
+    python -m bench.suite --compare local              # exits 1 on regression
+    python -m bench.suite --backend duckdb --no-rollups  # embedded columnar engine
+
+Reports throughput, p50/p95/p99 latency, errors (including 503 load
+shedding) and the server's peak RSS. A result regresses when its p95 grows
+or its throughput drops by more than ``--tolerance`` against the baseline.
+Baselines are only comparable on the same machine and spec.
+
+``baselines/reference.json`` is committed and is what ``bench/ci.sh``
+compares with by default; ``bench/ci.sh <base-ref>`` instead records the
+base commit on the same runner first, for CI machines that vary.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, fields
+from datetime import timedelta
+
+from bench.loadtest import run_level
+from bench.synth import SynthSpec, ensure
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+SCENARIOS = {
+    "top_items": "/top-items?start={start}&end={end}&branch={branch}",
+    "top_items_all_time": "/top-items",
+    "avg_spending": "/avg-spending",
+    "peak_times": "/peak-times",
+    "peak_by_date": "/peak-by-date?date={day}",
+    "peak_by_date_range": "/peak-by-date-range?start={start}&end={end}&branch={branch}",
+    "table_spending": "/table-spending?start={start}&end={end}&branch={branch}",
+    "dashboard": "/dashboard?start={start}&end={end}&branch={branch}&date={day}",
+    "branches": "/branches",
+}
+# Absolute slack so sub-millisecond jitter on fast routes is not a regression
+P95_SLACK_MS = 5.0
+
+
+class Windows:
+    """Random filters inside the generated history, reproducible per scenario."""
+
+    def __init__(self, spec, seed, max_days=90):
+        self.spec = spec
+        self.rng = random.Random(seed)
+        self.max_days = max_days
+        self.days = (spec.last_day - spec.first_day).days + 1
+        self.branches = ["All"] + [f"Branch {b + 1}" for b in range(spec.branches)]
+
+    def __call__(self):
+        length = self.rng.randint(1, min(self.max_days, self.days))
+        start = self.spec.first_day + timedelta(days=self.rng.randrange(self.days - length + 1))
+        end = start + timedelta(days=length - 1)
+        day = start + timedelta(days=self.rng.randrange(length))
+        branch = self.rng.choice(self.branches).replace(" ", "%20")
+        return {"start": start.isoformat(), "end": end.isoformat(), "day": day.isoformat(), "branch": branch}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb(pid):
+    """The process's peak resident set size, from /proc (None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def start_server(backend, db, port, rollups, spec, ready_timeout):
+    cmd = [sys.executable, "-m", "bench.serve", "--backend", backend, "--db", db, "--port", str(port)]
+    if rollups:
+        cmd += ["--rollups", rollups, "--since", spec.first_day.isoformat(),
+                "--through", (spec.last_day + timedelta(days=1)).isoformat()]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(BENCH_DIR))
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"❌ Server exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/pool-stats", timeout=2):
+                return proc
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit(f"❌ Server not ready after {ready_timeout:g}s")
+
+
+def run(args, spec):
+    db = ensure(args.data, spec, args.backend)
+    rollups = os.path.join(args.data, f"rollups-{spec.key}-{args.backend}.sqlite3") if args.rollups else ""
+    if rollups and os.path.exists(rollups):
+        os.remove(rollups)
+    port = free_port()
+    proc = start_server(args.backend, db, port, rollups, spec, args.ready_timeout)
+    base = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        for name in args.scenarios:
+            windows = Windows(spec, f"{spec.seed}:{name}")
+            next_url = lambda: base + SCENARIOS[name].format(**windows())
+            # Warm up (connections, imports, first statement prepares)
+            for _ in range(3):
+                try:
+                    with urllib.request.urlopen(next_url(), timeout=args.timeout) as resp:
+                        resp.read()
+                except (urllib.error.URLError, OSError) as e:
+                    print(f"⚠️ Warm-up {name} failed:", e)
+            results[name] = {}
+            for clients in args.levels:
+                r = run_level(next_url, clients, args.duration, args.timeout)
+                r["peak_rss_mb"] = peak_rss_mb(proc.pid)
+                results[name][str(clients)] = r
+                print(f"{name:<20} {clients:>7} {r['requests']:>7} {r['errors']:>6} {r['rps']:>8.1f} "
+                      f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+                      f"{r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '-':>8}", flush=True)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a line per result that regressed against ``baseline``."""
+    regressions = []
+    for name, levels in results.items():
+        for clients, r in levels.items():
+            b = baseline.get("results", {}).get(name, {}).get(clients)
+            if not b:
+                continue
+            if r["p95_ms"] > b["p95_ms"] * (1 + tolerance) and r["p95_ms"] - b["p95_ms"] > P95_SLACK_MS:
+                regressions.append(f"{name} @{clients}: p95 {b['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+            if r["rps"] < b["rps"] * (1 - tolerance):
+                regressions.append(f"{name} @{clients}: throughput {b['rps']:.1f} -> {r['rps']:.1f} req/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = SynthSpec()
+    for f in fields(SynthSpec):
+        parser.add_argument("--" + f.name.replace("_", "-"), type=type(getattr(defaults, f.name)),
+                            default=getattr(defaults, f.name))
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"], default="sqlite")
+    parser.add_argument("--data", default=os.path.join(BENCH_DIR, "data"), help="Where generated data is kept.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--ready-timeout", type=float, default=900.0)
+    parser.add_argument("--no-rollups", dest="rollups", action="store_false", help="Serve from raw SQL only.")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    spec = SynthSpec(**{f.name: getattr(args, f.name) for f in fields(SynthSpec)})
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    args.levels = [int(c) for c in args.concurrency.split(",")]
+
+    print(f"{'scenario':<20} {'clients':>7} {'reqs':>7} {'errors':>6} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>8}")
+    report = {"spec": asdict(spec), "backend": args.backend, "rollups": args.rollups, "duration": args.duration,
+              "results": run(args, spec)}
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, args.save_baseline + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"✅ Baseline saved to {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, args.compare + ".json"), encoding="utf-8") as f:
+            baseline = json.load(f)
+        if any(baseline.get(k) != report[k] for k in ("spec", "backend", "rollups")):
+            print("⚠️ Baseline was recorded with a different spec, backend or rollup setting")
+        regressions = compare(report["results"], baseline, args.tolerance)
+        for line in regressions:
+            print("❌ Regression:", line)
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against", args.compare)
+
+
+if __name__ == "__main__":
+    main()
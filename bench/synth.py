@@ -0,0 +1,174 @@
+# bench/synth.py
+"""Deterministic synthetic ``vwSaleDetail`` for benchmarking without SQL Server.
+
+Written to SQLite, or to DuckDB when it is installed (``backend="duckdb"``).
+
+One row per voucher line, with the columns the app reads. Sales follow a
+lunch/dinner curve, a few vouchers are entered after midnight against the
+previous business day, item popularity is Zipf-like and only dine-in
+(``SaleType = 'D'``) vouchers carry a table. The same :class:`SynthSpec`
+always produces the same rows.
+"""
+import csv
+import hashlib
+import json
+import os
+import random
+import sqlite3
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+
+COLUMNS = ("BranchName", "VoucherNo", "VoucherDate", "EntryTime", "SaleType", "TableCode", "TableName",
+           "ItemName", "GroupName", "Qty", "Amount")
+
+SCHEMA = """
+    CREATE TABLE vwSaleDetail (
+        BranchName TEXT,
+        VoucherNo INTEGER,
+        VoucherDate TEXT,
+        EntryTime TEXT,
+        SaleType TEXT,
+        TableCode TEXT,
+        TableName TEXT,
+        ItemName TEXT,
+        GroupName TEXT,
+        Qty REAL,
+        Amount REAL
+    );
+    CREATE INDEX IX_vwSaleDetail_EntryTime ON vwSaleDetail (EntryTime, BranchName);
+    CREATE INDEX IX_vwSaleDetail_VoucherDate ON vwSaleDetail (VoucherDate, BranchName, SaleType);
+    CREATE TABLE bench_meta (spec TEXT);
+"""
+
+DUCKDB_TYPES = {
+    "BranchName": "VARCHAR", "VoucherNo": "BIGINT", "VoucherDate": "DATE", "EntryTime": "TIMESTAMP",
+    "SaleType": "VARCHAR", "TableCode": "VARCHAR", "TableName": "VARCHAR", "ItemName": "VARCHAR",
+    "GroupName": "VARCHAR", "Qty": "DOUBLE", "Amount": "DOUBLE",
+}
+
+GROUPS = ("MAIN KITCHEN", "MAIN KITCHEN", "MAIN KITCHEN", "BAR", "BAKERY", "DESSERTS")
+SALE_TYPES = (("D", 0.6), ("T", 0.25), ("H", 0.15))
+# Relative share of vouchers per hour of the business day (11am to 1am)
+HOUR_WEIGHTS = {11: 2, 12: 6, 13: 8, 14: 5, 15: 2, 16: 2, 17: 3, 18: 5, 19: 8, 20: 9, 21: 7, 22: 4, 23: 2, 0: 1}
+
+
+@dataclass(frozen=True)
+class SynthSpec:
+    branches: int = 5
+    tables: int = 30
+    items: int = 200
+    vouchers_per_day: int = 400
+    years: float = 1.0
+    end: str = "2024-12-31"
+    seed: int = 42
+
+    @property
+    def last_day(self):
+        return date.fromisoformat(self.end)
+
+    @property
+    def first_day(self):
+        return self.last_day - timedelta(days=max(1, int(round(self.years * 365))) - 1)
+
+    @property
+    def key(self):
+        return hashlib.sha1(json.dumps(asdict(self), sort_keys=True).encode()).hexdigest()[:10]
+
+
+def rows(spec):
+    """Yield ``vwSaleDetail`` rows as tuples in :data:`COLUMNS` order."""
+    rng = random.Random(spec.seed)
+    branches = [f"Branch {b + 1}" for b in range(spec.branches)]
+    items = [(f"Item {i + 1:04d}", GROUPS[i % len(GROUPS)], round(rng.uniform(150, 2500), -1))
+             for i in range(spec.items)]
+    popularity = [1.0 / (rank + 1) for rank in range(spec.items)]
+    hours, hour_weights = list(HOUR_WEIGHTS), list(HOUR_WEIGHTS.values())
+    types, type_weights = [t for t, _ in SALE_TYPES], [w for _, w in SALE_TYPES]
+    voucher = 100000
+    day = spec.first_day
+    while day <= spec.last_day:
+        entries = []
+        for hour in rng.choices(hours, hour_weights, k=spec.vouchers_per_day):
+            entered = datetime(day.year, day.month, day.day, hour, rng.randrange(60), rng.randrange(60))
+            entries.append(entered + timedelta(days=1) if hour < 11 else entered)
+        # Voucher numbers rise with entry time, as they do at the till
+        for entered in sorted(entries):
+            voucher += 1
+            branch = rng.choice(branches)
+            sale_type = rng.choices(types, type_weights)[0]
+            table = rng.randrange(spec.tables) + 1 if sale_type == "D" else None
+            for item, group, price in rng.choices(items, popularity, k=rng.randint(1, 6)):
+                qty = rng.randint(1, 4)
+                yield (branch, voucher, day.isoformat(), entered.isoformat(" "), sale_type,
+                       f"T{table:02d}" if table else None, f"Table {table}" if table else None,
+                       item, group, qty, qty * price)
+        day += timedelta(days=1)
+
+
+def generate(path, spec, backend="sqlite", batch=10000):
+    """Write ``spec``'s rows to a fresh database file at ``path``; returns the row count."""
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    count = (_generate_duckdb if backend == "duckdb" else _generate_sqlite)(tmp, spec, batch)
+    os.replace(tmp, path)
+    return count
+
+
+def _generate_sqlite(tmp, spec, batch):
+    db = sqlite3.connect(tmp)
+    try:
+        db.executescript(SCHEMA)
+        insert = f"INSERT INTO vwSaleDetail ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        count, pending = 0, []
+        for row in rows(spec):
+            pending.append(row)
+            if len(pending) >= batch:
+                db.executemany(insert, pending)
+                count += len(pending)
+                pending = []
+        db.executemany(insert, pending)
+        count += len(pending)
+        db.execute("INSERT INTO bench_meta (spec) VALUES (?)", [json.dumps(asdict(spec))])
+        db.commit()
+        db.execute("ANALYZE")
+    finally:
+        db.close()
+    return count
+
+
+def _generate_duckdb(tmp, spec, batch):
+    import duckdb
+    # Bulk-load through CSV; row-by-row inserts into DuckDB are slow
+    staging = tmp + ".csv"
+    count = 0
+    with open(staging, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows(spec):
+            writer.writerow(row)
+            count += 1
+    db = duckdb.connect(tmp)
+    try:
+        types = ", ".join(f"'{c}': '{DUCKDB_TYPES[c]}'" for c in COLUMNS)
+        db.execute(f"CREATE TABLE vwSaleDetail AS SELECT * FROM read_csv('{staging}', header = true, "
+                   f"columns = {{{types}}})")
+        db.execute("CREATE TABLE bench_meta (spec VARCHAR)")
+        db.execute("INSERT INTO bench_meta VALUES (?)", [json.dumps(asdict(spec))])
+    finally:
+        db.close()
+        os.remove(staging)
+    return count
+
+
+EXTENSIONS = {"sqlite": "sqlite3", "duckdb": "duckdb"}
+
+
+def ensure(data_dir, spec, backend="sqlite"):
+    """Path of ``spec``'s database under ``data_dir``, generating it on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"vwSaleDetail-{spec.key}.{EXTENSIONS[backend]}")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...", flush=True)
+        print(f"✅ {generate(path, spec, backend)} rows", flush=True)
+    return path
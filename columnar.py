@@ -0,0 +1,93 @@
+# columnar.py
+"""Column-oriented response bodies built straight from cursor batches.
+
+``format=columns`` is one JSON array per column and ``format=arrow`` is an
+Arrow IPC stream (needs pyarrow). Each ``fetchmany`` batch is transposed
+with ``zip(*rows)`` and cast a column at a time, so no per-row dict is built.
+"""
+import io
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+COLUMNAR_FORMATS = {"columns": "application/json", "arrow": "application/vnd.apache.arrow.stream"}
+
+# Column kinds: Python cast for the JSON arrays, Arrow type for the IPC schema
+CASTS = {"str": str, "int": int, "float": float}
+ARROW_TYPES = {"str": "string", "int": "int64", "float": "float64"}
+
+
+def arrow_available():
+    return pa is not None
+
+
+def cursor_batches(cursor, size):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def record_batches(records, columns):
+    """Adapt already-built dict rows (e.g. cached results) to row batches."""
+    names = [name for name, _ in columns]
+    yield [tuple(r[n] for n in names) for r in records]
+
+
+def transpose(rows, columns):
+    out = []
+    for values, (_, kind) in zip(zip(*rows), columns):
+        cast = CASTS[kind]
+        out.append([None if v is None else cast(v) for v in values])
+    return out
+
+
+def columns_body(batches, columns):
+    names = [name for name, _ in columns]
+    data = [[] for _ in columns]
+    count = 0
+    for rows in batches:
+        count += len(rows)
+        for acc, values in zip(data, transpose(rows, columns)):
+            acc.extend(values)
+    return {"names": names, "columns": dict(zip(names, data)), "rows": count}
+
+
+class _Chunks(io.RawIOBase):
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        return len(b)
+
+    def take(self):
+        out = b"".join(self.parts)
+        self.parts.clear()
+        return out
+
+
+def arrow_schema(columns):
+    return pa.schema([(name, pa.type_for_alias(ARROW_TYPES[kind])) for name, kind in columns])
+
+
+def arrow_stream(batches, columns):
+    """Yield an Arrow IPC stream one record batch at a time."""
+    schema = arrow_schema(columns)
+    sink = _Chunks()
+    writer = pa.ipc.new_stream(sink, schema)
+    yield sink.take()
+    for rows in batches:
+        if not rows:
+            continue
+        arrays = [pa.array(values, type=field.type) for values, field in zip(transpose(rows, columns), schema)]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
@@ -0,0 +1,268 @@
+# db_pool.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    """A raw DB-API connection plus the cursors prepared on it.
+
+    pyodbc keeps the last prepared statement per cursor and skips the
+    prepare step when the same SQL text runs again, so handing out one
+    cursor per distinct statement lets repeated route queries reuse it.
+    """
+
+    def __init__(self, raw, statement_cache_size):
+        self.raw = raw
+        self.created_at = self.last_used = time.monotonic()
+        self.statement_cache_size = statement_cache_size
+        self._cursors = OrderedDict()
+        self.statement_hits = 0
+        self.statement_misses = 0
+
+    def cursor(self, sql=None):
+        if sql is None or self.statement_cache_size <= 0:
+            return self.raw.cursor()
+        cur = self._cursors.get(sql)
+        if cur is not None:
+            self._cursors.move_to_end(sql)
+            self.statement_hits += 1
+            return cur
+        self.statement_misses += 1
+        if len(self._cursors) >= self.statement_cache_size:
+            _, old = self._cursors.popitem(last=False)
+            _quiet_close(old)
+        cur = self._cursors[sql] = self.raw.cursor()
+        return cur
+
+    def ping(self):
+        cur = self.raw.cursor()
+        try:
+            cur.execute("SELECT 1")
+            cur.fetchall()
+        finally:
+            _quiet_close(cur)
+
+    def close(self):
+        for cur in self._cursors.values():
+            _quiet_close(cur)
+        self._cursors.clear()
+        _quiet_close(self.raw)
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections.
+
+    Connections are created lazily up to ``max_size``. Idle connections
+    beyond ``min_size`` are closed once unused for ``idle_timeout`` seconds,
+    and a connection idle for longer than ``ping_interval`` is checked with
+    ``SELECT 1`` before it is handed out again.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, idle_timeout=300.0,
+                 checkout_timeout=30.0, ping_interval=30.0, statement_cache_size=32):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_interval = ping_interval
+        self.statement_cache_size = statement_cache_size
+
+        self._cond = threading.Condition()
+        self._idle = []  # LIFO: the most recently used connection is reused first
+        self._all = set()
+        self._in_use = 0
+        self._opening = 0
+        self._closed = False
+        self._counters = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "connect_errors": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "failed_pings": 0,
+            "idle_evictions": 0,
+        }
+
+    @classmethod
+    def from_env(cls, connect, prefix="DB_POOL_"):
+        env = os.environ
+        return cls(
+            connect,
+            min_size=int(env.get(prefix + "MIN", 1)),
+            max_size=int(env.get(prefix + "MAX", 10)),
+            idle_timeout=float(env.get(prefix + "IDLE_TIMEOUT", 300)),
+            checkout_timeout=float(env.get(prefix + "CHECKOUT_TIMEOUT", 30)),
+            ping_interval=float(env.get(prefix + "PING_INTERVAL", 30)),
+            statement_cache_size=int(env.get(prefix + "STATEMENT_CACHE", 32)),
+        )
+
+    @property
+    def size(self):
+        return len(self._idle) + self._in_use + self._opening
+
+    def acquire(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited_since = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                self._evict_idle_locked()
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self.size < self.max_size:
+                    self._opening += 1
+                    conn = None
+                    break
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._counters["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(f"No connection available within {timeout:g}s "
+                                      f"(max_size={self.max_size})")
+                self._cond.wait(remaining)
+            if waited_since is not None:
+                self._counters["wait_seconds"] += time.monotonic() - waited_since
+            self._counters["checkouts"] += 1
+
+        if conn is None:
+            return self._open()
+        if self.ping_interval >= 0 and time.monotonic() - conn.last_used >= self.ping_interval:
+            try:
+                conn.ping()
+            except Exception:
+                with self._cond:
+                    self._counters["failed_pings"] += 1
+                self._discard(conn)
+                return self.acquire(max(0.0, deadline - time.monotonic()))
+        return conn
+
+    def release(self, conn, broken=False):
+        if broken or self._closed:
+            self._discard(conn)
+            return
+        try:
+            conn.raw.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except Exception as e:
+            broken = is_disconnect(e)
+            raise
+        finally:
+            # Also runs on GeneratorExit when a streamed response is abandoned.
+            self.release(conn, broken=broken)
+
+    def evict_idle(self):
+        with self._cond:
+            self._evict_idle_locked()
+
+    def stats(self):
+        with self._cond:
+            hits = sum(c.statement_hits for c in self._all)
+            misses = sum(c.statement_misses for c in self._all)
+            return {
+                "pid": os.getpid(),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "statement_cache_hits": hits,
+                "statement_cache_misses": misses,
+                **self._counters,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._all.difference_update(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def _open(self):
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._counters["connect_errors"] += 1
+                self._cond.notify()
+            raise
+        conn = PooledConnection(raw, self.statement_cache_size)
+        with self._cond:
+            self._opening -= 1
+            self._in_use += 1
+            self._all.add(conn)
+            self._counters["connections_opened"] += 1
+        return conn
+
+    def _discard(self, conn):
+        conn.close()
+        with self._cond:
+            self._in_use -= 1
+            self._all.discard(conn)
+            self._counters["connections_closed"] += 1
+            self._cond.notify()
+
+    def _evict_idle_locked(self):
+        if self.idle_timeout <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        # Oldest idle connections sit at the front of the LIFO list.
+        while self._idle and self.size > self.min_size and self._idle[0].last_used < cutoff:
+            conn = self._idle.pop(0)
+            self._all.discard(conn)
+            conn.close()
+            self._counters["connections_closed"] += 1
+            self._counters["idle_evictions"] += 1
+
+
+def is_disconnect(exc):
+    # Only a dead link is fatal. ODBC reports one as SQLSTATE class 08
+    # ("08S01" communication link failure); a bad statement, a missing table
+    # or a statement timeout (HYT00) leaves the connection usable. sqlite3
+    # raises OperationalError for those too, so the class alone is not enough.
+    if isinstance(exc, OSError) or type(exc).__name__ == "ConnectionException":  # duckdb
+        return True
+    state = exc.args[0] if exc.args else None
+    return (type(exc).__name__ in ("OperationalError", "InterfaceError")
+            and isinstance(state, str) and state.startswith("08"))
+
+
+def _quiet_close(obj):
+    try:
+        obj.close()
+    except Exception:
+        pass
@@ -0,0 +1,414 @@
+# hot_window.py
+"""In-process columnar copy of the last few days of ``vwSaleDetail``.
+
+Rows are held as NumPy arrays, one block per ``EntryTime`` day::
+
+    ts        int64    EntryTime, seconds since 1970-01-01 (naive, as stored)
+    vday      int32    VoucherDate, days since 1970-01-01
+    voucher   int64    VoucherNo (-1 for NULL)
+    branch    int16    code into the BranchName dictionary
+    group     int16    code into the GroupName dictionary
+    item      int32    code into the ItemName dictionary
+    table     int32    code into the (TableCode, TableName) dictionary
+    dine_in   bool     SaleType = 'D'
+    qty       float32  Qty (NULL as 0)
+    amount    float64  Amount (NULL as 0)
+
+which is 45 bytes a row. Each route's aggregation is a masked
+``np.bincount`` over the blocks whose VoucherDate/EntryTime span meets the
+filter; distinct voucher counts come from ``np.unique`` over
+``(group, voucher)`` keys.
+
+The window is kept current by delta loads: whenever the source watermark
+moves, rows entered since the newest loaded row (less ``overlap``, to pick
+up lines added or edited moments late) are pulled and replace that tail.
+Rows entered or edited further back than the overlap are only picked up by
+the full reload the background thread does every ``reload_interval``
+seconds. Blocks are swapped in whole, so readers never see a half-applied
+delta, and keep being served the old copy while a reload runs.
+A range is served from the window only when it starts inside it; rows are
+assumed never to be entered before their ``VoucherDate``. Each worker
+process holds its own copy.
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from rollups import day_start
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LOAD_SQL = """
+    SELECT EntryTime, VoucherDate, VoucherNo, BranchName, GroupName, ItemName, TableCode, TableName,
+           SaleType, Qty, Amount
+    FROM vwSaleDetail
+    WHERE EntryTime >= ?{upper}
+"""
+
+EPOCH = datetime(1970, 1, 1)
+DAY = 86400
+NO_DAY = -(2 ** 31)
+
+
+class Dictionary:
+    """Append-only value <-> code mapping; a code never changes once handed out."""
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.codes = {}
+        self.values = []
+
+    def _add(self, value):
+        code = self.codes[value] = len(self.values)
+        self.values.append(value)
+        return code
+
+    def encode(self, values):
+        codes = self.codes
+        return np.fromiter((codes[v] if v in codes else self._add(v) for v in values), self.dtype, len(values))
+
+    def code(self, value):
+        return self.codes.get(value)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class _Block:
+    __slots__ = ("ts", "vday", "voucher", "branch", "group", "item", "table", "dine_in", "qty", "amount",
+                 "vday_min", "vday_max")
+    columns = __slots__[:-2]
+
+    def __init__(self, **arrays):
+        for name in self.columns:
+            setattr(self, name, arrays[name])
+        days = self.vday[self.vday != NO_DAY]
+        self.vday_min = int(days.min()) if len(days) else None
+        self.vday_max = int(days.max()) if len(days) else None
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.columns)
+
+    def head(self, n):
+        return _Block(**{name: getattr(self, name)[:n] for name in self.columns})
+
+    @classmethod
+    def concat(cls, blocks):
+        return cls(**{name: np.concatenate([getattr(b, name) for b in blocks]) for name in cls.columns})
+
+
+def _distinct_counts(groups, vouchers, size):
+    """Number of distinct non-NULL vouchers per group code."""
+    keep = vouchers >= 0
+    groups, vouchers = groups[keep], vouchers[keep]
+    if not len(vouchers):
+        return np.zeros(size, np.int64)
+    low = vouchers.min()
+    span = int(vouchers.max() - low) + 1
+    keys = np.unique(groups.astype(np.int64) * span + (vouchers - low))
+    return np.bincount(keys // span, minlength=size)
+
+
+class HotWindow:
+    def __init__(self, fetch, days=90, watermark=None, overlap=timedelta(hours=1), chunk=timedelta(days=1),
+                 reload_interval=6 * 3600):
+        self.fetch = fetch
+        self.days = days
+        self.watermark = watermark
+        self.overlap = overlap
+        self.chunk = chunk
+        self.reload_interval = reload_interval
+        self.branches = Dictionary(np.int16)
+        self.groups = Dictionary(np.int16)
+        self.items = Dictionary(np.int32)
+        self.tables = Dictionary(np.int32)
+        self.lo = None
+        self._blocks = {}
+        self._synced = None
+        self._loaded_at = None
+        self._loading = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counters = {"loads": 0, "deltas": 0, "delta_rows": 0, "errors": 0, "served": 0}
+
+    @classmethod
+    def from_env(cls, fetch, watermark=None, prefix="HOT_WINDOW_"):
+        env = os.environ
+        days = int(env.get(prefix + "DAYS", 0))
+        if days <= 0:
+            return None
+        if np is None:
+            print("⚠️ HOT_WINDOW_DAYS is set but numpy is not installed; the hot window is off")
+            return None
+        return cls(fetch, days, watermark, timedelta(minutes=float(env.get(prefix + "OVERLAP_MINUTES", 60))),
+                   reload_interval=float(env.get(prefix + "RELOAD_HOURS", 6)) * 3600)
+
+    # Loading
+    def _window_start(self):
+        return day_start(datetime.now()) - timedelta(days=self.days - 1)
+
+    def _encode(self, rows):
+        cols = list(zip(*rows))
+        ts = np.array(cols[0], dtype="datetime64[s]").astype(np.int64)
+        order = np.argsort(ts, kind="stable")
+        vday = np.array(cols[1], dtype="datetime64[D]")
+        vday = np.where(np.isnat(vday), NO_DAY, vday.astype(np.int64)).astype(np.int32)
+        block = _Block(
+            ts=ts,
+            vday=vday,
+            voucher=np.array([-1 if v is None else int(v) for v in cols[2]], np.int64),
+            branch=self.branches.encode(cols[3]),
+            group=self.groups.encode(cols[4]),
+            item=self.items.encode(cols[5]),
+            table=self.tables.encode(list(zip(cols[6], cols[7]))),
+            dine_in=np.array([t == "D" for t in cols[8]], bool),
+            qty=np.array([float(q or 0) for q in cols[9]], np.float32),
+            amount=np.array([float(a or 0) for a in cols[10]], np.float64),
+        )
+        return _Block(**{name: getattr(block, name)[order] for name in _Block.columns})
+
+    def _apply(self, blocks, rows, cutoff, lo):
+        """``blocks`` with every row at ``EntryTime >= cutoff`` replaced by ``rows`` and days before ``lo`` dropped."""
+        cutoff_ts = int((cutoff - EPOCH).total_seconds())
+        cut_day = cutoff_ts // DAY
+        old = blocks.get(cut_day)
+        blocks = {day: b for day, b in blocks.items() if day < cut_day}
+        parts = {}
+        if old is not None:
+            parts[cut_day] = [old.head(int(np.searchsorted(old.ts, cutoff_ts)))]
+        if rows:
+            new = self._encode(rows)
+            days = new.ts // DAY
+            bounds = np.flatnonzero(np.diff(days)) + 1
+            for start, stop in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(new)]))):
+                piece = _Block(**{name: getattr(new, name)[start:stop] for name in _Block.columns})
+                parts.setdefault(int(days[start]), []).append(piece)
+        for day, pieces in parts.items():
+            block = pieces[0] if len(pieces) == 1 else _Block.concat(pieces)
+            if len(block):
+                blocks[day] = block
+        lo_day = int((lo - EPOCH).total_seconds()) // DAY
+        return {day: b for day, b in sorted(blocks.items()) if day >= lo_day}
+
+    def _latest(self):
+        if not self._blocks:
+            return None
+        last = self._blocks[max(self._blocks)]
+        return EPOCH + timedelta(seconds=int(last.ts[-1]))
+
+    def load(self):
+        """(Re)load the whole window, a chunk at a time; readers keep the old one meanwhile."""
+        with self._lock:
+            self._loading = True
+            try:
+                self._load()
+            finally:
+                self._loading = False
+
+    def _load(self):
+        watermark = self.watermark() if self.watermark else None
+        lo = self._window_start()
+        blocks, start = {}, lo
+        while True:
+            end = start + self.chunk
+            last = end > datetime.now()
+            if last:
+                rows = self.fetch(LOAD_SQL.format(upper=""), [start])
+            else:
+                rows = self.fetch(LOAD_SQL.format(upper=" AND EntryTime < ?"), [start, end])
+            blocks = self._apply(blocks, rows, start, lo)
+            if last:
+                break
+            start = end
+        self._blocks, self.lo = blocks, lo
+        self._synced = watermark
+        self._loaded_at = time.monotonic()
+        self._counters["loads"] += 1
+
+    def reload_due(self):
+        return self.reload_interval > 0 and (self._loaded_at is None
+                                             or time.monotonic() - self._loaded_at >= self.reload_interval)
+
+    def _refresh(self, watermark):
+        lo = self._window_start()
+        latest = self._latest()
+        cutoff = max(lo, min(latest, datetime.now()) - self.overlap) if latest is not None else lo
+        rows = self.fetch(LOAD_SQL.format(upper=""), [cutoff])
+        self._blocks, self.lo = self._apply(self._blocks, rows, cutoff, lo), lo
+        self._synced = watermark
+        self._counters["deltas"] += 1
+        self._counters["delta_rows"] += len(rows)
+
+    def refresh(self):
+        """Pull rows entered since the newest loaded one (less the overlap)."""
+        with self._lock:
+            if self.lo is not None:
+                self._refresh(self.watermark() if self.watermark else None)
+
+    def _stale(self, watermark):
+        return watermark != self._synced or self.lo != self._window_start()
+
+    def sync(self):
+        """Catch up with the source when its watermark has moved; on failure keep serving what is loaded."""
+        if self.watermark is None or self.lo is None or self._loading:
+            # A reload in progress brings the window up to date; serve the loaded copy until then
+            return
+        watermark = self.watermark()
+        if not self._stale(watermark):
+            return
+        with self._lock:
+            if not self._stale(watermark):
+                return
+            try:
+                self._refresh(watermark)
+            except Exception as e:
+                print("❌ Hot Window Error:", e)
+                self._counters["errors"] += 1
+                self._synced = watermark
+
+    def start(self, interval):
+        """Load the window in the background, then refresh it every ``interval`` seconds.
+
+        The window is loaded again from scratch once ``reload_interval`` has passed.
+        """
+        if self._thread is not None:
+            return
+
+        def loop():
+            try:
+                self.load()
+                print(f"✅ Hot window: {self.stats()['rows']} rows since {self.lo:%Y-%m-%d}")
+            except Exception as e:
+                print("❌ Hot Window Error:", e)
+                self._counters["errors"] += 1
+            while not self._stop.wait(interval):
+                try:
+                    if self.lo is None or self.reload_due():
+                        self.load()
+                    else:
+                        self.refresh()
+                except Exception as e:
+                    print("❌ Hot Window Error:", e)
+                    self._counters["errors"] += 1
+
+        self._thread = threading.Thread(target=loop, name="hot-window", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # Reading
+    def covers(self, start):
+        """True when ``[start, ...)`` lies inside the loaded window (bringing it up to date first)."""
+        if start is None or self.lo is None:
+            return False
+        self.sync()
+        if start < self.lo:
+            return False
+        self._counters["served"] += 1
+        return True
+
+    def _select(self, columns, lo_day=None, hi_day=None, lo_ts=None, hi_ts=None, branch=None, group=None,
+                dine_in=False):
+        """The named columns of matching rows, concatenated across blocks; None when nothing can match."""
+        branch_code = self.branches.code(branch) if branch else None
+        group_code = self.groups.code(group) if group else None
+        if (branch and branch_code is None) or (group and group_code is None):
+            return None
+        picked = {name: [] for name in columns}
+        for day, b in self._blocks.items():
+            if lo_day is not None and (b.vday_max is None or b.vday_max < lo_day or b.vday_min >= hi_day):
+                continue
+            if lo_ts is not None and ((day + 1) * DAY <= lo_ts or day * DAY >= hi_ts):
+                continue
+            mask = np.ones(len(b), bool)
+            if lo_day is not None:
+                mask &= (b.vday >= lo_day) & (b.vday < hi_day)
+            if lo_ts is not None:
+                mask &= (b.ts >= lo_ts) & (b.ts < hi_ts)
+            if branch_code is not None:
+                mask &= b.branch == branch_code
+            if group_code is not None:
+                mask &= b.group == group_code
+            if dine_in:
+                mask &= b.dine_in
+            for name in columns:
+                picked[name].append(getattr(b, name)[mask])
+        if not picked[columns[0]]:
+            return None
+        return {name: np.concatenate(parts) for name, parts in picked.items()}
+
+    @staticmethod
+    def _days(start, end):
+        return int((start - EPOCH).total_seconds()) // DAY, int((end - EPOCH).total_seconds()) // DAY
+
+    def item_totals(self, start, end, branch=None, group=None):
+        """``{item: qty}`` for voucher days in ``[start, end)``."""
+        lo_day, hi_day = self._days(start, end)
+        sel = self._select(("item", "qty"), lo_day, hi_day, branch=branch, group=group)
+        if sel is None:
+            return {}
+        size = len(self.items)
+        qty = np.bincount(sel["item"], weights=sel["qty"], minlength=size)
+        present = np.bincount(sel["item"], minlength=size)
+        values = self.items.values
+        return {values[i]: float(qty[i]) for i in np.flatnonzero(present)}
+
+    def top_items(self, start, end, branch=None, group=None, n=10):
+        """``[(item, qty)]`` ordered as :func:`rollups.top_items` orders them."""
+        totals = self.item_totals(start, end, branch, group)
+        key = lambda kv: (-kv[1], kv[0])
+        if n is None:
+            return sorted(totals.items(), key=key)
+        return heapq.nsmallest(n, totals.items(), key=key)
+
+    def table_totals(self, start, end, branch=None):
+        """``[(code, name, orders, amount)]`` for dine-in vouchers on days in ``[start, end)``."""
+        lo_day, hi_day = self._days(start, end)
+        sel = self._select(("table", "voucher", "amount"), lo_day, hi_day, branch=branch, dine_in=True)
+        if sel is None:
+            return []
+        size = len(self.tables)
+        amount = np.bincount(sel["table"], weights=sel["amount"], minlength=size)
+        orders = _distinct_counts(sel["table"], sel["voucher"], size)
+        present = np.bincount(sel["table"], minlength=size)
+        values = self.tables.values
+        return [(*values[i], int(orders[i]), float(amount[i])) for i in np.flatnonzero(present)]
+
+    def hourly(self, start, end, branch=None):
+        """Per-hour ``[amount, orders]`` for ``EntryTime`` in ``[start, end)``, like :func:`rollups.raw_hourly`."""
+        lo_ts, hi_ts = (int((t - EPOCH).total_seconds()) for t in (start, end))
+        sel = self._select(("ts", "voucher", "amount"), lo_ts=lo_ts, hi_ts=hi_ts, branch=branch)
+        if sel is None:
+            return {}
+        hour = (sel["ts"] // 3600) % 24
+        amount = np.bincount(hour, weights=sel["amount"], minlength=24)
+        orders = _distinct_counts(hour, sel["voucher"], 24)
+        present = np.bincount(hour, minlength=24)
+        return {int(h): [float(amount[h]), int(orders[h])] for h in np.flatnonzero(present)}
+
+    def stats(self):
+        blocks = list(self._blocks.values())
+        rows = sum(len(b) for b in blocks)
+        nbytes = sum(b.nbytes for b in blocks)
+        return {
+            "days": self.days,
+            "from": self.lo.isoformat(sep=" ") if self.lo else None,
+            "latest": str(self._latest()) if blocks else None,
+            "rows": rows,
+            "bytes": nbytes,
+            "bytes_per_row": round(nbytes / rows, 1) if rows else None,
+            "dictionaries": {"branches": len(self.branches), "groups": len(self.groups),
+                             "items": len(self.items), "tables": len(self.tables)},
+            **self._counters,
+        }
@@ -0,0 +1,173 @@
+# http_cache.py
+import gzip
+import hashlib
+import os
+
+from flask import g, has_app_context, request
+
+from result_cache import _MISSING, normalize_args, range_is_closed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/", "application/javascript")
+IMMUTABLE = "public, max-age={}, immutable"
+CLOSED = "public, max-age={}"
+REVALIDATE = "no-cache"
+NO_STORE = "no-store"
+
+
+def source_version(directory):
+    """Digest of the ``.py`` files in ``directory``, so a deploy changes every ETag."""
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()[:12]
+
+
+def _encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _compress(data, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def _tagged(digest, encoding=None):
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _matches(digest):
+    """True when If-None-Match names any encoding of ``digest``."""
+    tags = request.if_none_match
+    if not tags:
+        return False
+    return any(tags.contains(_tagged(digest, e).strip('"')) for e in [None, "br", "gzip"])
+
+
+class HttpCache:
+    """Conditional GETs, Cache-Control and compression for the JSON routes.
+
+    A route's ETag is a hash of the app ``version``, its path and normalized
+    query string plus, for ranges that are not closed, the data watermark.
+    The check runs before the view, so a matching ``If-None-Match`` is
+    answered with 304 without touching the database. Closed historical
+    ranges (see :func:`result_cache.range_is_closed`) may be reused for
+    ``closed_max_age`` seconds; everything else must be revalidated.
+    """
+
+    def __init__(self, watermark=None, closed_max_age=21600, compress_min_size=1024,
+                 gzip_level=6, brotli_quality=5, version=""):
+        self.watermark = watermark
+        self.closed_max_age = closed_max_age
+        self.version = version
+        self.compress_min_size = compress_min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @classmethod
+    def from_env(cls, watermark=None, version="", prefix="HTTP_CACHE_"):
+        env = os.environ
+        return cls(
+            watermark=watermark,
+            closed_max_age=int(env.get(prefix + "CLOSED_MAX_AGE", 21600)),
+            compress_min_size=int(env.get(prefix + "COMPRESS_MIN_SIZE", 1024)),
+            gzip_level=int(env.get(prefix + "GZIP_LEVEL", 6)),
+            brotli_quality=int(env.get(prefix + "BROTLI_QUALITY", 5)),
+            version=env.get(prefix + "VERSION", version),
+        )
+
+    def fingerprint(self, path, args, is_closed=range_is_closed):
+        """Return ``(digest, closed)``, or ``(None, closed)`` when the watermark is unreadable."""
+        closed = is_closed(args)
+        key = [self.version, path, normalize_args(args)]
+        if not closed and self.watermark is not None:
+            watermark = self.watermark()
+            if watermark is _MISSING:
+                return None, closed
+            key.append(watermark)
+        return hashlib.sha1(repr(key).encode()).hexdigest()[:20], closed
+
+    def init_app(self, app, endpoints, no_store=(), closed_when=None):
+        """``closed_when`` maps endpoints whose data is not just their date range to their own test."""
+        endpoints, no_store, closed_when = set(endpoints), set(no_store), closed_when or {}
+
+        @app.before_request
+        def _conditional_get():
+            if request.method != "GET" or request.endpoint not in endpoints:
+                return None
+            is_closed = closed_when.get(request.endpoint, range_is_closed)
+            digest, closed = self.fingerprint(request.path, request.args.to_dict(), is_closed)
+            if digest is None:
+                return None
+            g.http_cache = (digest, CLOSED.format(self.closed_max_age) if closed else REVALIDATE)
+            if _matches(digest):
+                response = app.response_class(status=304)
+                response.headers["ETag"] = _tagged(digest)
+                response.headers["Cache-Control"] = g.http_cache[1]
+                response.vary.add("Accept-Encoding")
+                return response
+            return None
+
+        @app.after_request
+        def _cache_headers(response):
+            if request.endpoint in no_store:
+                response.headers["Cache-Control"] = NO_STORE
+            cached = g.pop("http_cache", None)
+            if cached and response.status_code == 200:
+                response.headers["ETag"] = _tagged(cached[0])
+                response.headers["Cache-Control"] = cached[1]
+            return self.compress(response)
+
+    def skip(self):
+        """Send the current response without an ETag or long-lived Cache-Control."""
+        if has_app_context():
+            g.pop("http_cache", None)
+
+    def compress(self, response):
+        if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(COMPRESSIBLE)):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(_encodings())
+        data = response.get_data()
+        if not encoding or len(data) < self.compress_min_size:
+            return response
+        response.set_data(_compress(data, encoding, self.gzip_level, self.brotli_quality))
+        response.headers["Content-Encoding"] = encoding
+        etag = response.headers.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = _tagged(etag.strip('"'), encoding)
+        return response
+
+
+class PrecompressedBody:
+    """A fixed body kept alongside its gzip/brotli variants and ETag."""
+
+    def __init__(self, body, mimetype, cache_control=REVALIDATE, compress=True):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.digest = hashlib.sha1(body).hexdigest()[:20]
+        self.variants = {None: body}
+        for encoding in _encodings() if compress else []:
+            self.variants[encoding] = _compress(body, encoding, gzip_level=9, brotli_quality=11)
+
+    def response(self, response_class):
+        encoding = request.accept_encodings.best_match([e for e in self.variants if e])
+        if _matches(self.digest):
+            response = response_class(status=304)
+        else:
+            response = response_class(self.variants[encoding], mimetype=self.mimetype)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+        response.headers["ETag"] = _tagged(self.digest, encoding)
+        response.headers["Cache-Control"] = self.cache_control
+        response.vary.add("Accept-Encoding")
+        return response
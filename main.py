@@ -1,26 +1,108 @@
 # analytics_web_app.py
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, abort, jsonify, request
 from flask_cors import CORS
-import pyodbc
-from datetime import datetime
+import os
+import click
+import contextvars
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from admission import AdmissionControl
+from backends import Backend
+from db_pool import ConnectionPool
+from metrics import Metrics, add_rows, current as current_timer, note, phase
+from result_cache import ResultCache, range_is_closed
+from single_flight import SingleFlight
+from rollups import (HourlyRollup, ItemDailyRollup, RollupRefresher, TableDailyRollup, day_start, hourly_profile,
+                     hourly_query, table_totals, top_items as rollup_top_items)
+from query_builder import Query, covering_indexes
+from paging import PAGING_ARGS, PageSpec, PagingError, paginate, parse_limit, parse_paging, wants_paging
+from http_cache import HttpCache, source_version
+from static_bundle import StaticBundle, build as build_bundle
+from refreshing import RefreshingValue
+from hot_window import HotWindow
+from scheduler import Scheduler
+from snapshots import SnapshotExporter
+from tracing import Tracer
+from columnar import COLUMNAR_FORMATS, arrow_available, arrow_stream, columns_body, cursor_batches, record_batches
 
 app = Flask(__name__)
-CORS(app)
-
-# DB Connection
-def get_db_cursor():
-    try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 17 for SQL Server};"
-            "SERVER=;"
-            "DATABASE=;"
-            "UID=;"
-            "PWD=;"
-        )
-        return conn, conn.cursor()
-    except Exception as e:
-        print("❌ DB Error:", e)
-        return None, None
+CORS(app, expose_headers=["X-Next-Cursor", "X-Total-Count", "Retry-After", "Server-Timing"])
+
+# Per-route Prometheus metrics at /metrics; registered first so it sees every response
+metrics = Metrics()
+metrics.init_app(app)
+
+# Server-Timing on every response; TRACE_LOG=path|- also logs each request's spans
+tracer = Tracer.from_env()
+tracer.init_app(app)
+
+# DB Connection: SQL Server by default; DB_BACKEND=sqlite|duckdb reads a local copy (see backends.py)
+backend = Backend.from_env()
+
+# One pool per process (i.e. per gunicorn worker); size it with DB_POOL_MIN / DB_POOL_MAX.
+db_pool = ConnectionPool.from_env(backend.connect)
+# Pool occupancy, read on each /metrics scrape
+metrics.gauge("pool_connections", "Pooled connections by state.", ("state",),
+              lambda: {(state,): v for state, v in db_pool.stats().items() if state in ("idle", "in_use")})
+metrics.gauge("pool_max_connections", "Pool size limit.", (), lambda: {(): db_pool.max_size})
+
+# Concurrency budget per route, "limit:queue"; override with e.g. ADMISSION_AVG_SPENDING=1:4.
+# The heavy scans of the POS database get the smallest budgets.
+ADMISSION_DEFAULTS = {
+    "avg_spending": "2:4",
+    "table_spending": "4:8",
+    "dashboard": "2:4",
+    "top_items": "6:12",
+    "peak_times": "4:8",
+    "peak_by_date": "4:8",
+    "peak_by_date_range": "4:8",
+    "branches": "4:8",
+}
+admission = AdmissionControl.from_env(ADMISSION_DEFAULTS)
+metrics.gauge("admission_requests", "Requests running or queued per budgeted route.", ("route", "state"),
+              lambda: {(route, state): b[state] for route, b in admission.stats()["routes"].items()
+                       for state in ("running", "waiting")})
+
+# Pool checkout (including any wait or reconnect) counts as the "connect" phase
+@contextmanager
+def db_connection(timer=None):
+    started = time.perf_counter()
+    with db_pool.connection() as conn:
+        timer = timer or current_timer()
+        if timer is not None:
+            timer.add("connect", time.perf_counter() - started, started)
+        yield conn
+
+# Identical concurrent queries (same SQL modulo whitespace, same params) run once
+query_flight = SingleFlight()
+
+def _fetch_all(query, params):
+    with db_connection() as conn:
+        cursor = conn.cursor(query)
+        with admission.watch(cursor):
+            with phase("execute", sql=query, params=params):
+                cursor.execute(query, params)
+            with phase("fetch"):
+                rows = cursor.fetchall()
+    add_rows(len(rows))
+    return rows
+
+def fetch_all(query, params=()):
+    return query_flight.do((" ".join(query.split()), tuple(params)), lambda: _fetch_all(query, params))
+
+def fetch_one(query, params=()):
+    with db_connection() as conn:
+        cursor = conn.cursor(query)
+        with phase("execute", sql=query, params=params):
+            cursor.execute(query, params)
+        with phase("fetch"):
+            row = cursor.fetchone()
+            cursor.fetchall()
+        return row
 
 # Utility
 def format_hour_range(hour_24):
@@ -29,10 +111,331 @@ def format_hour_range(hour_24):
     def to_ampm(h): return f"{h % 12 or 12}{'am' if h < 12 else 'pm'}"
     return f"{to_ampm(start)} to {to_ampm(end)}"
 
+# Both peaks come from one per-hour scan: {hour: [amount, orders]}
+def peaks_from_profile(profile):
+    amt = max(profile.items(), key=lambda kv: kv[1][0], default=None)
+    ords = max(profile.items(), key=lambda kv: kv[1][1], default=None)
+    return {
+        "peak_amount": {"hour": format_hour_range(amt[0]) if amt else None, "amount": amt[1][0] if amt else 0},
+        "peak_orders": {"hour": format_hour_range(ords[0]) if ords else None, "orders": ords[1][1] if ords else 0},
+        "profile": [{
+            "Hour": hour,
+            "HourRange": format_hour_range(hour),
+            "TotalAmount": profile.get(hour, [0.0, 0])[0],
+            "TotalOrders": profile.get(hour, [0.0, 0])[1]
+        } for hour in range(24)]
+    }
+
+# Result cache
+def current_watermark():
+    row = fetch_one("SELECT MAX(EntryTime), MAX(VoucherNo) FROM vwSaleDetail")
+    return tuple(row) if row else None
+
+def note_cache_lookup(route, hit, stale):
+    note("cache", f"{route} {'stale' if stale else 'hit' if hit else 'miss'}")
+    # A stale body must not be tagged with the current watermark's ETag
+    if stale:
+        http_cache.skip()
+
+result_cache = ResultCache.from_env(watermark=current_watermark, on_lookup=note_cache_lookup)
+
+# HTTP caching: ETag/304, Cache-Control and gzip/brotli (wired up below the routes)
+http_cache = HttpCache.from_env(watermark=result_cache.current_watermark,
+                                version=source_version(os.path.dirname(os.path.abspath(__file__))))
+
+# Hourly, daily per-item and daily per-table rollups (set ROLLUP_DB_PATH="" to disable).
+# Order counts merge voucher sketches; SKETCH_KIND=exact|hll picks the kind.
+hourly_rollup = HourlyRollup.from_env(dialect=backend.dialect)
+item_rollup = ItemDailyRollup.from_env(dialect=backend.dialect)
+table_rollup = TableDailyRollup.from_env(dialect=backend.dialect)
+ROLLUP_STORES = [s for s in (hourly_rollup, item_rollup, table_rollup) if s is not None]
+
+rollup_refresher = RollupRefresher(
+    ROLLUP_STORES, fetch_all,
+    chunk=timedelta(hours=float(os.environ.get("ROLLUP_CHUNK_HOURS", 6))),
+    # Edits to vouchers of the last ROLLUP_RECHECK_DAYS days are found by fingerprinting them each run
+    recheck_days=int(os.environ.get("ROLLUP_RECHECK_DAYS", 2)),
+)
+if float(os.environ.get("ROLLUP_REFRESH_INTERVAL", 0)) > 0:
+    rollup_refresher.start(float(os.environ["ROLLUP_REFRESH_INTERVAL"]))
+
+# The last HOT_WINDOW_DAYS days as in-memory NumPy columns (0, the default, disables it).
+# Ranges starting inside the window are aggregated in process; deltas follow the watermark.
+hot_window = HotWindow.from_env(fetch_all, watermark=result_cache.current_watermark)
+if hot_window is not None:
+    hot_window.start(float(os.environ.get("HOT_WINDOW_REFRESH_INTERVAL", 60)))
+
+def in_hot_window(start):
+    return hot_window is not None and hot_window.covers(start)
+
+# Queries
+TOP_ITEMS_GROUP = os.environ.get("TOP_ITEMS_GROUP", "MAIN KITCHEN")
+TOP_ITEMS_N = int(os.environ.get("TOP_ITEMS_N", 10))
+
+def top_items_query(start=None, end=None, branch=None, top=TOP_ITEMS_N, group=TOP_ITEMS_GROUP):
+    q = Query("ItemName, SUM(Qty) AS TotalQty", uses=["ItemName", "Qty"])
+    if group:
+        q.equals("GroupName", group)
+    if start and end:
+        q.day_range("VoucherDate", start, end)
+    q.branch(branch)
+    q.group_by("ItemName").order_by("TotalQty DESC")
+    return q.top(top) if top else q
+
+def avg_spending_query():
+    q = Query("BranchName, TableName, ROUND(AVG(Amount), 2) AS AvgAmount", uses=["Amount"])
+    q.not_null("TableCode").equals("SaleType", "D")
+    return q.group_by("BranchName", "TableName")
+
+def table_spending_query(start, end, branch=None):
+    q = Query("""TableCode, TableName,
+               COUNT(DISTINCT VoucherNo) AS TotalOrders,
+               SUM(Amount) AS TotalSpending,
+               ROUND(SUM(Amount) * 1.0 / COUNT(DISTINCT VoucherNo), 0) AS AvgSpending""",
+              uses=["VoucherNo", "Amount"])
+    q.day_range("VoucherDate", start, end).equals("SaleType", "D").branch(branch)
+    return q.group_by("TableCode", "TableName")
+
+def branches_query():
+    q = Query("BranchName").not_null("BranchName")
+    return q.group_by("BranchName").order_by("BranchName")
+
+# Branch names come from the (small) rollup when it has data, else from the view
+def load_branches():
+    if hourly_rollup is not None and hourly_rollup.coverage() is not None:
+        return hourly_rollup.branches()
+    q = branches_query()
+    return [r[0] for r in fetch_all(q.sql(backend.dialect), q.params)]
+
+branch_list = RefreshingValue.from_env(load_branches, "branches")
+if float(os.environ.get("BRANCHES_REFRESH_INTERVAL", 0)) > 0:
+    branch_list.start(float(os.environ["BRANCHES_REFRESH_INTERVAL"]))
+
+# Top items: daily per-item partials from the rollup, raw SQL only for uncovered days
+def item_totals_rows(start, end, branch, group, n):
+    lo, hi = (day_start(start), day_start(end) + timedelta(days=1)) if start and end else (None, None)
+    branch = branch if branch != "All" else None
+    if in_hot_window(lo):
+        items = hot_window.top_items(lo, hi, branch, group, n)
+    else:
+        items = rollup_top_items(item_rollup, fetch_all, lo, hi, branch, group, n, backend.dialect)
+    return [{"ItemName": item, "TotalQty": int(qty)} for item, qty in items]
+
+@result_cache.memoize("top-items")
+def query_top_items(start=None, end=None, branch=None, group=TOP_ITEMS_GROUP, n=TOP_ITEMS_N):
+    return item_totals_rows(start, end, branch, group, n)
+
+def avg_spending_row(r):
+    return {"Branch": r[0], "Table": r[1], "AvgAmount": float(r[2])}
+
+def table_spending_row(r):
+    row = dict(zip(["TableCode", "TableName", "TotalOrders", "TotalSpending", "AvgSpending"], r))
+    row["TotalSpending"] = float(row["TotalSpending"])
+    row["AvgSpending"] = float(row["AvgSpending"])
+    return row
+
+# Every item's total, for searching and paging past the top 10
+@result_cache.memoize("item-totals")
+def query_item_totals(start=None, end=None, branch=None, group=TOP_ITEMS_GROUP):
+    return item_totals_rows(start, end, branch, group, None)
+
+@result_cache.memoize("avg-spending")
+def query_avg_spending():
+    q = avg_spending_query()
+    return [avg_spending_row(r) for r in fetch_all(q.sql(backend.dialect), q.params)]
+
+# Per-hour [amount, orders] for EntryTime in [start, end)
+def hourly_totals(start=None, end=None, branch=None):
+    if in_hot_window(start):
+        return hot_window.hourly(start, end, branch)
+    return hourly_profile(hourly_rollup, fetch_all, start, end, branch, backend.dialect)
+
+@result_cache.memoize("peak-times")
+def query_peak_times():
+    return peaks_from_profile(hourly_totals())
+
+@result_cache.memoize("peak-by-date")
+def query_peak_by_date(date):
+    day = day_start(date)
+    return peaks_from_profile(hourly_totals(day, day + timedelta(days=1)))
+
+@result_cache.memoize("peak-by-date-range")
+def query_peak_by_date_range(start, end, branch=None):
+    if branch == "All":
+        branch = None
+    profile = hourly_totals(day_start(start), day_start(end) + timedelta(days=1), branch)
+    return [{
+        "HourRange": format_hour_range(hour),
+        "TotalAmount": amount,
+        "TotalOrders": orders
+    } for hour, (amount, orders) in sorted(profile.items())]
+
+@result_cache.memoize("table-spending")
+def query_table_spending(start, end, branch=None):
+    lo, hi = day_start(start), day_start(end) + timedelta(days=1)
+    if in_hot_window(lo):
+        totals = hot_window.table_totals(lo, hi, branch if branch != "All" else None)
+    elif table_rollup is None or table_rollup.coverage() is None:
+        q = table_spending_query(start, end, branch)
+        return [table_spending_row(r) for r in fetch_all(q.sql(backend.dialect), q.params)]
+    else:
+        totals = table_totals(table_rollup, fetch_all, lo, hi, branch if branch != "All" else None)
+    return [table_spending_row((code, table, orders, amount, math.floor(amount / orders + 0.5) if orders else 0))
+            for code, table, orders, amount in totals]
+
+# Common views recomputed ahead of demand, for every branch and "All": today, yesterday and
+# the last 7/30 days, at startup and every WARM_INTERVAL seconds (0, the default, disables it),
+# give or take WARM_JITTER of it.
+WARM_RANGES = {"today": (0, 0), "yesterday": (1, 1), "last_7_days": (6, 0), "last_30_days": (29, 0)}
+WARM_INTERVAL = float(os.environ.get("WARM_INTERVAL", 0))
+
+def warm_range(first, last):
+    today = date.today()
+    start, end = (today - timedelta(days=first)).isoformat(), (today - timedelta(days=last)).isoformat()
+    for branch in [None] + branch_list.get():
+        for fn in (query_top_items, query_table_spending, query_peak_by_date_range):
+            fn.warm(WARM_INTERVAL, start=start, end=end, branch=branch)
+    if start == end:
+        query_peak_by_date.warm(WARM_INTERVAL, date=start)
+
+def warm_all_time():
+    query_avg_spending.warm(WARM_INTERVAL)
+    query_peak_times.warm(WARM_INTERVAL)
+
+warm_scheduler = Scheduler.from_env()
+for name, (first, last) in WARM_RANGES.items():
+    warm_scheduler.add(name, lambda first=first, last=last: warm_range(first, last), WARM_INTERVAL)
+warm_scheduler.add("all_time", warm_all_time, WARM_INTERVAL)
+if WARM_INTERVAL > 0:
+    warm_scheduler.start()
+
+# Streaming: rows are encoded batch by batch while the cursor is still open
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "json-stream": "application/json"}
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 500))
+
+def stream_query(q, to_row, fmt):
+    dumps = app.json.dumps
+    # The body is produced after the request returns, so time it on this request's timer
+    timer = current_timer()
+
+    sql = q.sql(backend.dialect)
+
+    def generate():
+        with db_connection(timer) as conn:
+            cursor = conn.cursor(sql)
+            with timer.phase("execute", sql=sql, params=q.params):
+                cursor.execute(sql, q.params)
+            first = True
+            try:
+                if fmt == "json-stream":
+                    yield "["
+                while True:
+                    with timer.phase("fetch"):
+                        rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                    if not rows:
+                        break
+                    timer.add_rows(len(rows))
+                    with timer.phase("serialize"):
+                        encoded = [dumps(to_row(r)) for r in rows]
+                    if fmt == "ndjson":
+                        yield "\n".join(encoded) + "\n"
+                    else:
+                        yield ("" if first else ",") + ",".join(encoded)
+                    first = False
+                if fmt == "json-stream":
+                    yield "]"
+            except GeneratorExit:
+                # Client went away mid-stream: stop the server-side work too
+                admission.cancel(cursor)
+                raise
+
+    return app.response_class(generate(), mimetype=STREAM_FORMATS[fmt])
+
+# Columnar formats: (name, kind) per output column, in SELECT order
+ROUTE_COLUMNS = {
+    "top-items": [("ItemName", "str"), ("TotalQty", "int")],
+    "avg-spending": [("Branch", "str"), ("Table", "str"), ("AvgAmount", "float")],
+    "table-spending": [("TableCode", "str"), ("TableName", "str"), ("TotalOrders", "int"),
+                       ("TotalSpending", "float"), ("AvgSpending", "float")],
+    "peak-profile": [("Hour", "int"), ("HourRange", "str"), ("TotalAmount", "float"), ("TotalOrders", "int")],
+    "peak-by-date-range": [("HourRange", "str"), ("TotalAmount", "float"), ("TotalOrders", "int")],
+}
+
+def columnar_response(fmt, columns, q=None, records=None):
+    """Answer ``format=columns|arrow`` from query ``q`` or from ready ``records``."""
+    if fmt == "arrow" and not arrow_available():
+        return jsonify({"error": "format=arrow requires pyarrow on the server"}), 501
+    if q is None:
+        batches = record_batches(records, columns)
+        if fmt == "columns":
+            return jsonify(columns_body(batches, columns))
+        return app.response_class(arrow_stream(batches, columns), mimetype=COLUMNAR_FORMATS[fmt])
+    sql = q.sql(backend.dialect)
+    if fmt == "columns":
+        with db_connection() as conn:
+            cursor = conn.cursor(sql)
+            with admission.watch(cursor):
+                with phase("execute", sql=sql, params=q.params):
+                    cursor.execute(sql, q.params)
+                with phase("fetch"):
+                    body = columns_body(cursor_batches(cursor, STREAM_BATCH_SIZE), columns)
+        add_rows(body["rows"])
+        return jsonify(body)
+
+    timer = current_timer()
+
+    def generate():
+        with db_connection(timer) as conn:
+            cursor = conn.cursor(sql)
+            with timer.phase("execute", sql=sql, params=q.params):
+                cursor.execute(sql, q.params)
+            try:
+                yield from arrow_stream(cursor_batches(cursor, STREAM_BATCH_SIZE), columns)
+            except GeneratorExit:
+                admission.cancel(cursor)
+                raise
+
+    return app.response_class(generate(), mimetype=COLUMNAR_FORMATS[fmt])
+
+# Server-side search / sort / keyset paging over the (cached) full result
+PAGE_SPECS = {
+    "top-items": PageSpec(search=["ItemName"], sort=["ItemName", "TotalQty"],
+                          key=["ItemName"], default_sort="-TotalQty"),
+    "avg-spending": PageSpec(search=["Branch", "Table"], sort=["Branch", "Table", "AvgAmount"],
+                             key=["Branch", "Table"], default_sort="Branch"),
+    "table-spending": PageSpec(search=["TableCode", "TableName"],
+                               sort=["TableCode", "TableName", "TotalOrders", "TotalSpending", "AvgSpending"],
+                               key=["TableCode", "TableName"], default_sort="-TotalSpending"),
+}
+
+def paged_response(fetch, spec):
+    """Page the rows ``fetch()`` returns; bad paging arguments get a 400 before it runs."""
+    args = [request.args.get(a) for a in PAGING_ARGS]
+    try:
+        parse_paging(spec, *args)
+    except PagingError as e:
+        return jsonify({"error": str(e)}), 400
+    page, next_cursor, total = paginate(fetch(), spec, *args)
+    response = jsonify(page)
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
 # Routes
+# Front end: the built bundle (flask --app main build-static), else static/src
+static_bundle = StaticBundle()
+
 @app.route("/")
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return static_bundle.page.response(app.response_class)
+
+@app.route("/assets/<path:name>")
+def assets(name):
+    asset = static_bundle.asset(name)
+    if asset is None:
+        abort(404)
+    return asset.response(app.response_class)
 
 @app.route("/top-items")
 def top_items():
@@ -40,74 +443,42 @@ def top_items():
     end = request.args.get("end")
     branch = request.args.get("branch")
 
-    where_clause = "WHERE GroupName = 'MAIN KITCHEN'"
-    params = []
-
     # ✅ Only allow both dates or neither
     if (start and not end) or (end and not start):
         return jsonify({"error": "Please select both start and end dates or leave both empty."}), 400
 
-    if start and end:
-        where_clause += " AND VoucherDate BETWEEN ? AND ?"
-        params.extend([start, end])
-
-    if branch and branch != "All":
-        where_clause += " AND BranchName = ?"
-        params.append(branch)
-
-    query = f"""
-        SELECT TOP 10 ItemName, SUM(Qty) AS TotalQty
-        FROM vwSaleDetail
-        {where_clause}
-        GROUP BY ItemName
-        ORDER BY TotalQty DESC
-    """
-
-    conn, cursor = get_db_cursor()
-    cursor.execute(query, *params)
-    results = [{"ItemName": row[0], "TotalQty": int(row[1])} for row in cursor.fetchall()]
-    conn.close()
-    return jsonify(results)
+    group = request.args.get("group", TOP_ITEMS_GROUP)
+    group = None if group in ("", "All") else group
+    n = request.args.get("n", str(TOP_ITEMS_N))
+    if not n.isdigit() or not 1 <= int(n) <= 1000:
+        return jsonify({"error": "'n' must be a number from 1 to 1000"}), 400
+    n = int(n)
+
+    fmt = request.args.get("format")
+    if fmt in COLUMNAR_FORMATS:
+        return columnar_response(fmt, ROUTE_COLUMNS["top-items"], top_items_query(start, end, branch, n, group))
+    if wants_paging(request.args):
+        return paged_response(lambda: query_item_totals(start=start, end=end, branch=branch, group=group),
+                              PAGE_SPECS["top-items"])
+    return jsonify(query_top_items(start=start, end=end, branch=branch, group=group, n=n))
 
 @app.route("/avg-spending")
 def avg_spending():
-    conn, cursor = get_db_cursor()
-    cursor.execute("""
-        SELECT BranchName, TableName, ROUND(AVG(Amount), 2) AS AvgAmount
-        FROM vwSaleDetail
-        WHERE TableCode IS NOT NULL AND SaleType = 'D'
-        GROUP BY BranchName, TableName
-    """)
-    results = [{"Branch": r[0], "Table": r[1], "AvgAmount": float(r[2])} for r in cursor.fetchall()]
-    conn.close()
-    return jsonify(results)
+    fmt = request.args.get("format")
+    if fmt in STREAM_FORMATS:
+        return stream_query(avg_spending_query(), avg_spending_row, fmt)
+    if fmt in COLUMNAR_FORMATS:
+        return columnar_response(fmt, ROUTE_COLUMNS["avg-spending"], avg_spending_query())
+    if wants_paging(request.args):
+        return paged_response(query_avg_spending, PAGE_SPECS["avg-spending"])
+    return jsonify(query_avg_spending())
 
 @app.route("/peak-times")
 def peak_times():
-    conn, cursor = get_db_cursor()
-    cursor.execute("""
-        SELECT DATEPART(HOUR, EntryTime) AS Hour, SUM(ISNULL(Amount, 0)) AS TotalAmount
-        FROM vwSaleDetail WHERE EntryTime IS NOT NULL
-        GROUP BY DATEPART(HOUR, EntryTime)
-        ORDER BY TotalAmount DESC
-    """)
-    amt = cursor.fetchone()
-    hour_amt = format_hour_range(int(amt[0])) if amt else None
-
-    cursor.execute("""
-        SELECT DATEPART(HOUR, EntryTime) AS Hour, COUNT(DISTINCT VoucherNo) AS OrderCount
-        FROM vwSaleDetail WHERE EntryTime IS NOT NULL
-        GROUP BY DATEPART(HOUR, EntryTime)
-        ORDER BY OrderCount DESC
-    """)
-    ords = cursor.fetchone()
-    hour_ord = format_hour_range(int(ords[0])) if ords else None
-
-    conn.close()
-    return jsonify({
-        "peak_amount": {"hour": hour_amt, "amount": float(amt[1]) if amt else 0},
-        "peak_orders": {"hour": hour_ord, "orders": int(ords[1]) if ords else 0}
-    })
+    fmt = request.args.get("format")
+    if fmt in COLUMNAR_FORMATS:
+        return columnar_response(fmt, ROUTE_COLUMNS["peak-profile"], records=query_peak_times()["profile"])
+    return jsonify(query_peak_times())
 
 @app.route("/peak-by-date")
 def peak_by_date():
@@ -117,31 +488,10 @@ def peak_by_date():
     except:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
-    conn, cursor = get_db_cursor()
-
-    cursor.execute("""
-        SELECT DATEPART(HOUR, EntryTime) AS Hour, SUM(ISNULL(Amount, 0)) AS TotalAmount
-        FROM vwSaleDetail WHERE CAST(EntryTime AS DATE) = ?
-        GROUP BY DATEPART(HOUR, EntryTime)
-        ORDER BY TotalAmount DESC
-    """, date)
-    amt = cursor.fetchone()
-    hour_amt = format_hour_range(int(amt[0])) if amt else None
-
-    cursor.execute("""
-        SELECT DATEPART(HOUR, EntryTime) AS Hour, COUNT(DISTINCT VoucherNo) AS OrderCount
-        FROM vwSaleDetail WHERE CAST(EntryTime AS DATE) = ?
-        GROUP BY DATEPART(HOUR, EntryTime)
-        ORDER BY OrderCount DESC
-    """, date)
-    ords = cursor.fetchone()
-    hour_ord = format_hour_range(int(ords[0])) if ords else None
-
-    conn.close()
-    return jsonify({
-        "peak_amount": {"hour": hour_amt, "amount": float(amt[1]) if amt else 0},
-        "peak_orders": {"hour": hour_ord, "orders": int(ords[1]) if ords else 0}
-    })
+    fmt = request.args.get("format")
+    if fmt in COLUMNAR_FORMATS:
+        return columnar_response(fmt, ROUTE_COLUMNS["peak-profile"], records=query_peak_by_date(date=date)["profile"])
+    return jsonify(query_peak_by_date(date=date))
 
 
 @app.route("/peak-by-date-range")
@@ -156,42 +506,15 @@ def peak_by_date_range():
     except:
         return jsonify({"error": "Invalid date format"}), 400
 
-    conn, cursor = get_db_cursor()
-
-    query = """
-        SELECT DATEPART(HOUR, EntryTime) AS Hour,
-               SUM(ISNULL(Amount, 0)) AS TotalAmount,
-               COUNT(DISTINCT VoucherNo) AS TotalOrders
-        FROM vwSaleDetail
-        WHERE CAST(EntryTime AS DATE) BETWEEN ? AND ?
-    """
-
-    params = [start, end]
-
-    if branch and branch != "All":
-        query += " AND BranchName = ?"
-        params.append(branch)
-
-    query += " GROUP BY DATEPART(HOUR, EntryTime) ORDER BY DATEPART(HOUR, EntryTime)"
-
     try:
-        cursor.execute(query, *params)  # ✅ Fix here
-        rows = cursor.fetchall()
+        result = query_peak_by_date_range(start=start, end=end, branch=branch)
     except Exception as e:
         print("❌ SQL Error:", e)
         return jsonify({"error": "Query failed"}), 500
-    finally:
-        conn.close()
-
-    result = []
-    for r in rows:
-        hour = int(r[0])
-        result.append({
-            "HourRange": format_hour_range(hour),
-            "TotalAmount": float(r[1]),
-            "TotalOrders": int(r[2])
-        })
 
+    fmt = request.args.get("format")
+    if fmt in COLUMNAR_FORMATS:
+        return columnar_response(fmt, ROUTE_COLUMNS["peak-by-date-range"], records=result)
     return jsonify(result)
 
 
@@ -210,1261 +533,254 @@ def table_spending():
     except:
         return jsonify({"error": "Invalid date format"}), 400
 
-    conn, cursor = get_db_cursor()
-
-    base_query = """
-        SELECT TableCode, TableName, 
-               COUNT(DISTINCT VoucherNo) AS TotalOrders,
-               SUM(Amount) AS TotalSpending,
-               ROUND(SUM(Amount) * 1.0 / COUNT(DISTINCT VoucherNo), 0) AS AvgSpending
-        FROM vwSaleDetail
-        WHERE VoucherDate BETWEEN ? AND ?
-          AND SaleType = 'D'
-    """
-
-    params = [start, end]
-
-    if branch and branch != "All":
-        base_query += " AND BranchName = ?"
-        params.append(branch)
-
-    base_query += " GROUP BY TableCode, TableName"
-
-    cursor.execute(base_query, params)
-    rows = cursor.fetchall()
-    conn.close()
-
-    results = [dict(zip(["TableCode", "TableName", "TotalOrders", "TotalSpending", "AvgSpending"], r)) for r in rows]
-    for r in results:
-        r["TotalSpending"] = float(r["TotalSpending"])
-        r["AvgSpending"] = float(r["AvgSpending"])
-    return jsonify(results)
-
-
-
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8">
-  <title>FredDB Sale Analytics</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1">
-  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-  <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-  <style>
-    :root {
-      --primary-gradient: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-      --secondary-gradient: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-      --success-gradient: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-      --dark-bg: #1a1d29;
-      --card-bg: #ffffff;
-      --sidebar-bg: #2d3748;
-      --text-primary: #2d3748;
-      --text-secondary: #718096;
-      --border-color: #e2e8f0;
-      --shadow: 0 10px 25px rgba(0, 0, 0, 0.1);
-      --shadow-hover: 0 20px 40px rgba(0, 0, 0, 0.15);
-    }
-
-    * {
-      box-sizing: border-box;
-      margin: 0;
-      padding: 0;
-    }
-
-    body {
-      font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-      background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-      min-height: 100vh;
-    }
-
-    /* Header */
-    .main-header {
-      background: var(--primary-gradient);
-      padding: 1rem 0;
-      position: fixed;
-      top: 0;
-      left: 0;
-      right: 0;
-      z-index: 1030;
-      box-shadow: var(--shadow);
-    }
-
-    .main-header h1 {
-      color: white;
-      font-weight: 700;
-      font-size: 1.75rem;
-      margin: 0;
-      text-align: center;
-    }
-
-    .hamburger {
-      display: none;
-      background: none;
-      border: none;
-      color: white;
-      font-size: 1.5rem;
-      cursor: pointer;
-      position: absolute;
-      left: 1rem;
-      top: 50%;
-      transform: translateY(-50%);
-    }
-
-    /* Sidebar */
-    .sidebar {
-      background: var(--sidebar-bg);
-      width: 280px;
-      position: fixed;
-      left: 0;
-      top: 70px;
-      bottom: 0;
-      padding: 2rem 0;
-      transition: transform 0.3s ease;
-      z-index: 1020;
-      overflow-y: auto;
-    }
-
-    .sidebar.collapsed {
-      transform: translateX(-100%);
-    }
-
-    .sidebar-nav {
-      list-style: none;
-      padding: 0;
-      margin: 0;
-    }
-
-    .sidebar-nav li {
-      margin: 0.5rem 1rem;
-    }
-
-    .sidebar-nav a {
-      display: flex;
-      align-items: center;
-      padding: 0.875rem 1rem;
-      color: #cbd5e1;
-      text-decoration: none;
-      border-radius: 10px;
-      transition: all 0.3s ease;
-      font-weight: 500;
-    }
-
-    .sidebar-nav a:hover,
-    .sidebar-nav a.active {
-      background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-      color: white;
-      transform: translateX(5px);
-      box-shadow: 0 5px 15px rgba(102, 126, 234, 0.3);
-    }
-
-    .sidebar-nav a i {
-      margin-right: 0.75rem;
-      width: 20px;
-      text-align: center;
-    }
-
-    /* Main Content */
-    .main-content {
-      margin-left: 280px;
-      margin-top: 70px;
-      padding: 2rem;
-      transition: margin-left 0.3s ease;
-      min-height: calc(100vh - 70px);
-    }
-
-    .main-content.expanded {
-      margin-left: 0;
-    }
-
-    /* Cards */
-    .analytics-card {
-      background: var(--card-bg);
-      border-radius: 16px;
-      padding: 2rem;
-      box-shadow: var(--shadow);
-      border: 1px solid var(--border-color);
-      transition: all 0.3s ease;
-      margin-bottom: 2rem;
-    }
-
-    # .analytics-card:hover {
-    #   box-shadow: var(--shadow-hover);
-    #   transform: translateY(-2px);
-    # }
-
-    .section-title {
-      font-size: 1.5rem;
-      font-weight: 700;
-      color: var(--text-primary);
-      margin-bottom: 1.5rem;
-      display: flex;
-      align-items: center;
-    }
-
-    .section-title i {
-      margin-right: 0.75rem;
-      background: var(--primary-gradient);
-      -webkit-background-clip: text;
-      -webkit-text-fill-color: transparent;
-      background-clip: text;
-    }
-
-    /* Form Controls */
-    .form-control, .form-select {
-      border: 2px solid var(--border-color);
-      border-radius: 10px;
-      padding: 0.75rem 1rem;
-      font-size: 0.95rem;
-      transition: all 0.3s ease;
-    }
-
-    .form-control:focus, .form-select:focus {
-      border-color: #667eea;
-      box-shadow: 0 0 0 0.2rem rgba(102, 126, 234, 0.25);
-    }
-
-    /* Buttons */
-    .btn-gradient {
-      background: var(--primary-gradient);
-      border: none;
-      color: white;
-      padding: 0.75rem 1.5rem;
-      border-radius: 10px;
-      font-weight: 600;
-      transition: all 0.3s ease;
-      box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-    }
-
-    .btn-gradient:hover {
-      transform: translateY(-2px);
-      box-shadow: 0 8px 25px rgba(102, 126, 234, 0.4);
-      color: white;
-    }
-
-    .btn-secondary-gradient {
-      background: var(--secondary-gradient);
-      border: none;
-      color: white;
-      padding: 0.75rem 1.5rem;
-      border-radius: 10px;
-      font-weight: 600;
-      transition: all 0.3s ease;
-      box-shadow: 0 4px 15px rgba(245, 87, 108, 0.3);
-    }
-
-    .btn-secondary-gradient:hover {
-      transform: translateY(-2px);
-      box-shadow: 0 8px 25px rgba(245, 87, 108, 0.4);
-      color: white;
-    }
-
-    .btn-success-gradient {
-      background: var(--success-gradient);
-      border: none;
-      color: white;
-      padding: 0.75rem 1.5rem;
-      border-radius: 10px;
-      font-weight: 600;
-      transition: all 0.3s ease;
-      box-shadow: 0 4px 15px rgba(79, 172, 254, 0.3);
-    }
-
-    .btn-success-gradient:hover {
-      transform: translateY(-2px);
-      box-shadow: 0 8px 25px rgba(79, 172, 254, 0.4);
-      color: white;
-    }
-
-    /* Search Bar */
-    .search-container {
-      position: relative;
-      margin-bottom: 1.5rem;
-    }
-
-    .search-input {
-      padding-left: 3rem;
-    }
-
-    .search-icon {
-      position: absolute;
-      left: 1rem;
-      top: 50%;
-      transform: translateY(-50%);
-      color: var(--text-secondary);
-    }
-
-    /* Table */
-    .table-container {
-      background: white;
-      border-radius: 12px;
-      overflow: hidden;
-      box-shadow: var(--shadow);
-    }
-
-    .table {
-      margin: 0;
-    }
-
-    .table thead th {
-      background: var(--primary-gradient);
-      color: white;
-      font-weight: 600;
-      border: none;
-      padding: 1rem;
-      text-align: center;
-    }
-
-    .table tbody td {
-      padding: 0.875rem 1rem;
-      border-color: var(--border-color);
-      text-align: center;
-      vertical-align: middle;
-    }
-
-    .table tbody tr:hover {
-      background-color: #f8fafc;
-    }
-
-    /* Stats Cards */
-    .stats-card {
-      background: var(--card-bg);
-      border-radius: 16px;
-      padding: 1.5rem;
-      text-align: center;
-      box-shadow: var(--shadow);
-      border: 1px solid var(--border-color);
-      transition: all 0.3s ease;
-    }
-
-    .stats-card:hover {
-      transform: translateY(-5px);
-      box-shadow: var(--shadow-hover);
-    }
-
-    .stats-card .icon {
-      font-size: 2.5rem;
-      background: var(--primary-gradient);
-      -webkit-background-clip: text;
-      -webkit-text-fill-color: transparent;
-      background-clip: text;
-      margin-bottom: 1rem;
-    }
-
-    .stats-card h3 {
-      font-size: 2rem;
-      font-weight: 700;
-      color: var(--text-primary);
-      margin-bottom: 0.5rem;
-    }
-
-    .stats-card p {
-      color: var(--text-secondary);
-      margin: 0;
-      font-weight: 500;
-    }
-
-    /* Records Counter */
-    .records-info {
-      display: flex;
-      justify-content: space-between;
-      align-items: center;
-      padding: 1rem;
-      background: #f8fafc;
-      border-top: 1px solid var(--border-color);
-      font-size: 0.875rem;
-      color: var(--text-secondary);
-      font-weight: 500;
-    }
-
-    .no-data {
-      text-align: center;
-      padding: 3rem;
-      color: var(--text-secondary);
-    }
-
-    .no-data i {
-      font-size: 3rem;
-      margin-bottom: 1rem;
-      opacity: 0.5;
-    }
-
-    /* Responsive Design */
-    @media (max-width: 11024px) {
-      .sidebar {
-        transform: translateX(-100%);
-      }
-      
-      .sidebar.show {
-        transform: translateX(0);
-      }
-      
-      .main-content {
-        margin-left: 0;
-      }
-      
-      .hamburger {
-        display: block;
-      }
-    }
-
-    @media (max-width: 768px) {
-      .main-header h1 {
-        font-size: 1.25rem;
-        margin-left: 3rem;
-        text-align: left;
-      }
-      
-      .main-content {
-        padding: 1rem;
-      }
-      
-      .analytics-card {
-        padding: 1.5rem;
-      }
-      
-      .section-title {
-        font-size: 1.25rem;
-      }
-      
-      .table-responsive {
-        font-size: 0.875rem;
-      }
-    }
-
-    @media (max-width: 576px) {
-      .main-header h1 {
-        font-size: 1.1rem;
-      }
-      
-      .analytics-card {
-        padding: 1rem;
-      }
-      
-      .form-control, .form-select {
-        padding: 0.625rem 0.875rem;
-        font-size: 0.875rem;
-      }
-      
-      .btn-gradient, .btn-secondary-gradient, .btn-success-gradient {
-        padding: 0.625rem 1rem;
-        font-size: 0.875rem;
-      }
-    }
-
-    /* Loading Animation */
-    .loading {
-      display: flex;
-      justify-content: center;
-      align-items: center;
-      padding: 3rem;
-    }
-
-    .spinner {
-      width: 40px;
-      height: 40px;
-      border: 4px solid #f3f3f3;
-      border-top: 4px solid #667eea;
-      border-radius: 50%;
-      animation: spin 1s linear infinite;
-    }
-
-    @keyframes spin {
-      0% { transform: rotate(0deg); }
-      100% { transform: rotate(360deg); }
-    }
-
-    /* Overlay for mobile sidebar */
-    .sidebar-overlay {
-      display: none;
-      position: fixed;
-      top: 0;
-      left: 0;
-      right: 0;
-      bottom: 0;
-      background: rgba(0, 0, 0, 0.5);
-      z-index: 1010;
-    }
-
-    .sidebar-overlay.show {
-      display: block;
-    }
-  </style>
-</head>
-<body>
-  <!-- Header -->
-  <header class="main-header">
-    <button class="hamburger" onclick="toggleSidebar()">
-      <i class="fas fa-bars"></i>
-    </button>
-    <h1><i class="fas fa-chart-line me-2"></i>FredDB Sale Analytics</h1>
-  </header>
-
-  <!-- Sidebar Overlay -->
-  <div class="sidebar-overlay" id="sidebarOverlay" onclick="toggleSidebar()"></div>
-
-  <!-- Sidebar -->
-  <nav class="sidebar" id="sidebar">
-    <ul class="sidebar-nav">
-      <li>
-        <a href="#" onclick="showSection('top-selling')" class="active">
-          <i class="fas fa-trophy"></i>
-          Top Selling Items
-        </a>
-      </li>
-      <li>
-        <a href="#" onclick="showSection('avg-spending')">
-          <i class="fas fa-coins"></i>
-          Average Spending
-        </a>
-      </li>
-      <li>
-        <a href="#" onclick="showSection('peak-time')">
-          <i class="fas fa-clock"></i>
-          Peak Times
-        </a>
-      </li>
-      <li>
-        <a href="#" onclick="showSection('peak-date')">
-          <i class="fas fa-calendar-alt"></i>
-          Peak by Date
-        </a>
-      </li>
-      <li>
-        <a href="#" onclick="showSection('table-spending')">
-          <i class="fas fa-table"></i>
-          Table Spending
-        </a>
-      </li>
-    </ul>
-  </nav>
-
-  <!-- Main Content -->
-  <main class="main-content" id="mainContent">
-    
-    <!-- Top Selling Items Section -->
-    <section id="top-selling" class="section">
-      <div class="analytics-card">
-        <h2 class="section-title">
-          <i class="fas fa-trophy"></i>
-          Top Selling Items
-        </h2>
-        
-        <div class="row g-3 mb-4">
-          <div class="col-md-3">
-            <label class="form-label fw-semibold">From Date</label>
-            <input type="date" id="start" class="form-control">
-          </div>
-          <div class="col-md-3">
-            <label class="form-label fw-semibold">To Date</label>
-            <input type="date" id="end" class="form-control">
-          </div>
-          <div class="col-md-4">
-            <label class="form-label fw-semibold">Branch</label>
-            <select id="branch" class="form-select">
-              <option>All</option>
-              <option>FRED - THE RESTAURANT</option>
-              <option>GAIJIN</option>
-              <option>POLYMATH</option>
-              <option>SOULFEST 2024</option>
-              <option>THE OBSERVATORY</option>
-            </select>
-          </div>
-          <div class="col-md-2 d-flex align-items-end">
-            <button onclick="loadTopItems()" class="btn btn-gradient w-100">
-              <i class="fas fa-search me-2"></i>Analyze
-            </button>
-          </div>
-        </div>
-        
-        <div id="top-selling-output">
-          <div class="no-data">
-            <i class="fas fa-chart-bar"></i>
-            <p>Please select filters and click "Analyze" to view results</p>
-          </div>
-        </div>
-      </div>
-    </section>
-
-    <!-- Average Spending Section -->
-    <section id="avg-spending" class="section d-none">
-      <div class="analytics-card">
-        <h2 class="section-title">
-          <i class="fas fa-coins"></i>
-          Average Spending per Table for All Data
-        </h2>
-        <div id="avg-output">
-          <div class="loading">
-            <div class="spinner"></div>
-          </div>
-        </div>
-      </div>
-    </section>
-
-    <!-- Peak Times Section -->
-    <section id="peak-time" class="section d-none">
-      <div class="analytics-card">
-        <h2 class="section-title">
-          <i class="fas fa-clock"></i>
-          Peak Times (All Time)
-        </h2>
-        <div id="peak-output">
-          <div class="loading">
-            <div class="spinner"></div>
-          </div>
-        </div>
-      </div>
-    </section>
-
-<!-- Peak by Date Section -->
-<section id="peak-date" class="section d-none">
-  <div class="analytics-card">
-    <h2 class="section-title">
-      <i class="fas fa-calendar-alt"></i>
-      Peak Times by Date Range
-    </h2>
-
-    <div class="row g-3 mb-4">
-      <div class="col-md-3">
-        <label class="form-label fw-semibold">Start Date</label>
-        <input type="date" id="pb-start" class="form-control">
-      </div>
-      <div class="col-md-3">
-        <label class="form-label fw-semibold">End Date</label>
-        <input type="date" id="pb-end" class="form-control">
-      </div>
-      <div class="col-md-3">
-        <label class="form-label fw-semibold">Branch</label>
-        <select id="pb-branch" class="form-select">
-          <option value="All">All</option>
-          <option>FRED - THE RESTAURANT</option>
-          <option>GAIJIN</option>
-          <option>POLYMATH</option>
-          <option>SOULFEST 2024</option>
-          <option>THE OBSERVATORY</option>
-        </select>
-      </div>
-      <div class="col-md-3 d-flex align-items-end">
-        <button onclick="loadPeakByDateRange()" class="btn btn-secondary-gradient w-100">
-          <i class="fas fa-calendar-check me-2"></i>Analyze Range
-        </button>
-      </div>
-      <div class="col-md-3 d-flex align-items-end mt-2">
-        <button onclick="showPeakChartPopup()" class="btn btn-success-gradient w-100">
-          <i class="fas fa-chart-bar me-2"></i>Show Chart
-        </button>
-      </div>
-    </div>
-
-    <div id="peak-date-output">
-      <div class="no-data">
-        <i class="fas fa-calendar"></i>
-        <p>Choose date range and click "Analyze Range" to view results</p>
-      </div>
-    </div>
-  </div>
-</section>
-
-<!-- 🔳 MODAL CHART POPUP -->
-<div class="modal" id="peakChartModal" style="display:none; position:fixed; top:0; left:0; width:100%; height:100%; background:rgba(0,0,0,0.6); z-index:1050; justify-content:center; align-items:center;">
-  <div style="background:white; border-radius:12px; padding:20px; max-width:800px; width:90%; position:relative;">
-    <button onclick="closePeakChartPopup()" style="position:absolute; top:10px; right:15px; background:none; border:none; font-size:1.5rem; cursor:pointer;">
-      <i class="fas fa-times"></i>
-    </button>
-    <h5 class="mb-3">Peak Hours by Date Range</h5>
-    <canvas id="peakChartCanvas" height="100"></canvas>
-  </div>
-</div>
-
-
-   
-    <!-- Table Spending Section -->
-<section id="table-spending" class="section d-none">
-  <div class="analytics-card">
-    <h2 class="section-title">
-      <i class="fas fa-table"></i>
-      Table Spending Analysis
-    </h2>
-
-    <div class="row g-3 mb-4">
-      <div class="col-md-3">
-        <label class="form-label fw-semibold">Start Date</label>
-        <input type="date" id="ts-start" class="form-control">
-      </div>
-      <div class="col-md-3">
-        <label class="form-label fw-semibold">End Date</label>
-        <input type="date" id="ts-end" class="form-control">
-      </div>
-      <div class="col-md-3">
-        <label class="form-label fw-semibold">Branch</label>
-        <select id="ts-branch" class="form-select">
-          <option value="All">All</option>
-          <option>FRED - THE RESTAURANT</option>
-          <option>GAIJIN</option>
-          <option>POLYMATH</option>
-          <option>SOULFEST 2024</option>
-          <option>THE OBSERVATORY</option>
-        </select>
-      </div>
-      <div class="col-md-3 d-flex align-items-end">
-        <button onclick="loadTableSpending()" class="btn btn-secondary-gradient w-100">
-          <i class="fas fa-chart-line me-2"></i>Get Data
-        </button>
-      </div>
-      <div class="col-md-3 d-flex align-items-end">
-        <button onclick="renderSpendingChart()" class="btn btn-success-gradient w-100">
-          <i class="fas fa-chart-bar me-2"></i>Show Chart
-        </button>
-      </div>
-    </div>
-
-    <div id="table-spending-output">
-      <div class="no-data">
-        <i class="fas fa-table"></i>
-        <p>Select date range and click "Get Data" to view results</p>
-      </div>
-    </div>
-  </div>
-
-</section>
-
-  <!-- 🔳 TABLE SPENDING CHART POPUP -->
-<div class="modal" id="tableChartModal" style="display:none; position:fixed; top:0; left:0; width:100%; height:100%; background:rgba(0,0,0,0.6); z-index:1050; justify-content:center; align-items:center;">
-  <div style="background:white; border-radius:12px; padding:20px; max-width:800px; width:90%; position:relative;">
-    <button onclick="closeTableChartPopup()" style="position:absolute; top:10px; right:15px; background:none; border:none; font-size:1.5rem; cursor:pointer;">
-      <i class="fas fa-times"></i>
-    </button>
-    <h5 class="mb-3">Table Spending Chart</h5>
-    <canvas id="tableSpendingChart" height="100"></canvas>
-  </div>
-</div>
-
-
-  </main>
-
-  <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js"></script>
-  <script>
-    let currentTableData = [];
-    let filteredData = [];
-
-    // Toggle sidebar for mobile
-    function toggleSidebar() {
-      const sidebar = document.getElementById('sidebar');
-      const overlay = document.getElementById('sidebarOverlay');
-      const mainContent = document.getElementById('mainContent');
-      
-      sidebar.classList.toggle('show');
-      overlay.classList.toggle('show');
-      
-      if (window.innerWidth > 1024) {
-        sidebar.classList.toggle('collapsed');
-        mainContent.classList.toggle('expanded');
-      }
-    }
-
-    // Show section
-    function showSection(sectionId) {
-      // Hide all sections
-      document.querySelectorAll('.section').forEach(section => {
-        section.classList.add('d-none');
-      });
-      
-      // Show selected section
-      document.getElementById(sectionId).classList.remove('d-none');
-      
-      // Update active nav item
-      document.querySelectorAll('.sidebar-nav a').forEach(link => {
-        link.classList.remove('active');
-      });
-      event.target.classList.add('active');
-      
-      // Close sidebar on mobile after selection
-      if (window.innerWidth <= 11024) {
-        toggleSidebar();
-      }
-      
-      // Load data for specific sections
-      if (sectionId === 'avg-spending') {
-        loadAvgSpending();
-      } else if (sectionId === 'peak-time') {
-        loadPeakTimes();
-      }
-    }
+    fmt = request.args.get("format")
+    if fmt in STREAM_FORMATS:
+        return stream_query(table_spending_query(start, end, branch), table_spending_row, fmt)
+    if fmt in COLUMNAR_FORMATS:
+        return columnar_response(fmt, ROUTE_COLUMNS["table-spending"], table_spending_query(start, end, branch))
+    if wants_paging(request.args):
+        return paged_response(lambda: query_table_spending(start=start, end=end, branch=branch), PAGE_SPECS["table-spending"])
+    return jsonify(query_table_spending(start=start, end=end, branch=branch))
+
+@app.route("/branches")
+def branches():
+    try:
+        return jsonify(branch_list.get())
+    except Exception as e:
+        print("❌ SQL Error:", e)
+        return jsonify({"error": "Query failed"}), 500
 
-    // Load top items
-function loadTopItems() {
-  const start = document.getElementById('start').value;
-  const end = document.getElementById('end').value;
-  const branch = document.getElementById('branch').value;
-  const output = document.getElementById('top-selling-output');
-
-  // 🛑 Enforce both or none logic
-  if ((start && !end) || (!start && end)) {
-    alert('⚠️ Please select both Start and End dates.');
-    return;
-  }
-
-  // ✅ At least require both dates
-  if (!start || !end) {
-    alert('⚠️ Date range is required.');
-    return;
-  }
-
-  output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
-
-  const url = `/top-items?start=${start}&end=${end}&branch=${encodeURIComponent(branch)}`;
-
-  fetch(url)
-    .then(response => response.json())
-    .then(data => {
-      currentTableData = data;
-      filteredData = [...data];
-      renderTable('top-selling-output', data, ['ItemName', 'TotalQty']);
-    })
-    .catch(error => {
-      output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
-    });
+# Dashboard: every panel for one filter set, queried in parallel
+DASHBOARD_PANELS = {
+    "top_items": (query_top_items, ("start", "end", "branch"), ()),
+    "avg_spending": (query_avg_spending, (), ()),
+    "peak_times": (query_peak_times, (), ()),
+    "peak_by_date": (query_peak_by_date, ("date",), ("date",)),
+    "peak_by_date_range": (query_peak_by_date_range, ("start", "end", "branch"), ("start", "end")),
+    "table_spending": (query_table_spending, ("start", "end", "branch"), ("start", "end")),
 }
 
-
-    // Load average spending
-    function loadAvgSpending() {
-      const output = document.getElementById('avg-output');
-      output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
-      
-      fetch('/avg-spending')
-        .then(response => response.json())
-        .then(data => {
-          currentTableData = data;
-          filteredData = [...data];
-          renderTable('avg-output', data, ['Branch', 'Table', 'AvgAmount']);
-        })
-        .catch(error => {
-          output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
-        });
-    }
-
-    // Load peak times
-    function loadPeakTimes() {
-      const output = document.getElementById('peak-output');
-      output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
-      
-      fetch('/peak-times')
-        .then(response => response.json())
-        .then(data => {
-          renderPeakStats(data, 'peak-output');
-        })
-        .catch(error => {
-          output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
-        });
-    }
-
-    // Load peak by date
-    function loadPeakDate() {
-      const date = document.getElementById('peak-date-input').value;
-      if (!date) {
-        alert('Please select a date');
-        return;
-      }
-      
-      const output = document.getElementById('peak-date-output');
-      output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
-      
-      fetch(`/peak-by-date?date=${date}`)
-        .then(response => response.json())
-        .then(data => {
-          renderPeakStats(data, 'peak-date-output');
-        })
-        .catch(error => {
-          output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
-        });
-    }
-
-    // Load table spending
-  function loadTableSpending() {
-  const start = document.getElementById('ts-start').value;
-  const end = document.getElementById('ts-end').value;
-  const branch = document.getElementById('ts-branch').value;
-
-  if (!start || !end) {
-    alert('Please select start and end dates');
-    return;
-  }
-
-  const output = document.getElementById('table-spending-output');
-  output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
-
-  fetch(`/table-spending?start=${start}&end=${end}&branch=${encodeURIComponent(branch)}`)
-    .then(response => response.json())
-    .then(data => {
-      currentTableData = data;
-      filteredData = [...data];
-      renderTable('table-spending-output', data, ['TableCode', 'TableName', 'TotalOrders', 'TotalSpending', 'AvgSpending']);
-    })
-    .catch(error => {
-      output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
-    });
+DASHBOARD_PAGE_SPECS = {
+    "avg_spending": PAGE_SPECS["avg-spending"],
+    "table_spending": PAGE_SPECS["table-spending"],
 }
 
+# Bounded so one dashboard can't take more than its share of the DB pool.
+dashboard_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("DASHBOARD_WORKERS", 4)), thread_name_prefix="dashboard")
+DASHBOARD_PANEL_TIMEOUT = float(os.environ.get("DASHBOARD_PANEL_TIMEOUT", 60))
 
-    // Render table with search functionality
-    function renderTable(containerId, data, columns) {
-      const container = document.getElementById(containerId);
-      
-      if (!data || data.length === 0) {
-        container.innerHTML = '<div class="no-data"><i class="fas fa-inbox"></i><p>No data found</p></div>';
-        return;
-      }
-
-      // Create search bar
-      const searchId = `search-${containerId}`;
-      const tableId = `table-${containerId}`;
-      
-      let html = `
-        <div class="search-container">
-          <i class="fas fa-search search-icon"></i>
-          <input type="text" 
-                 id="${searchId}" 
-                 class="form-control search-input" 
-                 placeholder="Search in results..." 
-                 onkeyup="filterTable('${searchId}', '${tableId}', '${containerId}')">
-        </div>
-        <div class="table-container">
-          <div class="table-responsive">
-            <table class="table table-hover" id="${tableId}">
-              <thead>
-                <tr>
-                  <th><i class="fas fa-hashtag me-1"></i>#</th>
-      `;
-      
-      // Add column headers
-      columns.forEach(col => {
-        let icon = getColumnIcon(col);
-        html += `<th><i class="${icon} me-1"></i>${formatColumnName(col)}</th>`;
-      });
-      html += '</tr></thead><tbody>';
-      
-      // Add data rows
-      data.forEach((row, index) => {
-        html += `<tr><td><span class="badge bg-primary">${index + 1}</span></td>`;
-        columns.forEach(col => {
-          let value = row[col];
-          if (col.includes('Amount') || col.includes('Avg')) {
-            value = `<span class="fw-bold text-success">Rs. ${Number(value).toLocaleString()}</span>`;
-          } else if (col.includes('Date')) {
-            value = `<span class="text-muted">${value}</span>`;
-          } else if (col.includes('Qty')) {
-            value = `<span class="badge bg-info">${value}</span>`;
-          }
-          html += `<td>${value}</td>`;
-        });
-        html += '</tr>';
-      });
-      
-      html += '</tbody></table></div>';
-      html += `<div class="records-info">
-                 <span><i class="fas fa-info-circle me-1"></i>Showing <span id="showing-${containerId}">${data.length}</span> of <span id="total-${containerId}">${data.length}</span> records</span>
-                 <span><i class="fas fa-database me-1"></i>Total Records: ${data.length}</span>
-               </div>`;
-      html += '</div>';
-      
-      container.innerHTML = html;
-      
-      // Store original data for filtering
-      window[`originalData_${containerId}`] = data;
-    }
-
-    // Filter table based on search input
-    function filterTable(searchId, tableId, containerId) {
-      const searchInput = document.getElementById(searchId);
-      const table = document.getElementById(tableId);
-      const searchTerm = searchInput.value.toLowerCase();
-      const tbody = table.getElementsByTagName('tbody')[0];
-      const rows = tbody.getElementsByTagName('tr');
-      
-      let visibleCount = 0;
-      
-      for (let i = 0; i < rows.length; i++) {
-        let row = rows[i];
-        let text = row.textContent || row.innerText;
-        
-        if (text.toLowerCase().indexOf(searchTerm) > -1) {
-          row.style.display = '';
-          visibleCount++;
-          // Update row number
-          row.cells[0].innerHTML = `<span class="badge bg-primary">${visibleCount}</span>`;
-        } else {
-          row.style.display = 'none';
-        }
-      }
-      
-      // Update records info
-      const showingElement = document.getElementById(`showing-${containerId}`);
-      if (showingElement) {
-        showingElement.textContent = visibleCount;
-      }
-    }
-
-    // Render peak statistics
-    function renderPeakStats(data, containerId) {
-      const container = document.getElementById(containerId);
-      
-      const html = `
-        <div class="row">
-          <div class="col-md-6 mb-3">
-            <div class="stats-card">
-              <div class="icon">
-                <i class="fas fa-money-bill-wave"></i>
-              </div>
-              <h3>Rs. ${Number(data.peak_amount.amount).toLocaleString()}</h3>
-              <p>Peak Revenue Hour</p>
-              <div class="mt-2">
-                <span class="badge bg-success fs-6">${data.peak_amount.hour}</span>
-              </div>
-            </div>
-          </div>
-          <div class="col-md-6 mb-3">
-            <div class="stats-card">
-              <div class="icon">
-                <i class="fas fa-shopping-cart"></i>
-              </div>
-              <h3>${data.peak_orders.orders}</h3>
-              <p>Peak Orders Hour</p>
-              <div class="mt-2">
-                <span class="badge bg-info fs-6">${data.peak_orders.hour}</span>
-              </div>
-            </div>
-          </div>
-        </div>
-      `;
-      
-      container.innerHTML = html;
-    }
+def _timed_panel(fn, kwargs):
+    started = time.perf_counter()
+    data = fn(**kwargs)
+    return data, round((time.perf_counter() - started) * 1000, 1)
 
-    // Get appropriate icon for column
-    function getColumnIcon(columnName) {
-      const icons = {
-        'ItemName': 'fas fa-box',
-        'TotalQty': 'fas fa-chart-bar',
-        'Branch': 'fas fa-building',
-        'Table': 'fas fa-chair',
-        'AvgAmount': 'fas fa-calculator',
-        'Date': 'fas fa-calendar',
-        'Type': 'fas fa-tag',
-        'TypeName': 'fas fa-tags',
-        'Amount': 'fas fa-dollar-sign',
-        'TableCode': 'fas fa-hashtag',
-        'TotalOrders': 'fas fa-receipt',
-        'TotalSpending': 'fas fa-wallet',
-        'AvgSpending': 'fas fa-balance-scale'
-
-      };
-      return icons[columnName] || 'fas fa-circle';
-    }
-
-    // Format column name for display
-    function formatColumnName(columnName) {
-      const names = {
-        'ItemName': 'Item Name',
-        'TotalQty': 'Total Quantity',
-        'AvgAmount': 'Average Amount',
-        'TypeName': 'Sale Type'
-      };
-      return names[columnName] || columnName;
-    }
-
-    // Handle window resize
-    window.addEventListener('resize', function() {
-      const sidebar = document.getElementById('sidebar');
-      const overlay = document.getElementById('sidebarOverlay');
-      
-      if (window.innerWidth > 1024) {
-        sidebar.classList.remove('show');
-        overlay.classList.remove('show');
-      }
-    });
-
-    // Initialize page
-    window.addEventListener('DOMContentLoaded', function() {
-      // Set default dates
-      const today = new Date();
-      const oneWeekAgo = new Date(today.getTime() - 7 * 24 * 60 * 60 * 1000);
-      
-      document.getElementById('start').value = oneWeekAgo.toISOString().split('T')[0];
-      document.getElementById('end').value = today.toISOString().split('T')[0];
-      document.getElementById('peak-date-input').value = today.toISOString().split('T')[0];
-      document.getElementById('ts-start').value = oneWeekAgo.toISOString().split('T')[0];
-      document.getElementById('ts-end').value = today.toISOString().split('T')[0];
-    });
-window.addEventListener('DOMContentLoaded', () => {
-  // Top Selling
-  document.getElementById('start').value = '';
-  document.getElementById('end').value = '';
-
-  // Peak by Date
-  document.getElementById('peak-date-input').value = '';
-
-  // Table Spending
-  document.getElementById('ts-start').value = '';
-  document.getElementById('ts-end').value = '';
-});
-  let tableChart = null;
-  function renderSpendingChart() {
-  if (!filteredData || filteredData.length === 0) {
-    alert('Please get data first before showing chart.');
-    return;
-  }
-
-  // Show popup modal
-  const modal = document.getElementById('tableChartModal');
-  modal.style.display = 'flex';
-
-  const ctx = document.getElementById('tableSpendingChart').getContext('2d');
-  if (window.tableChart) window.tableChart.destroy();
-
-  const labels = filteredData.map(row => row.TableName || row.TableCode);
-  const spending = filteredData.map(row => row.TotalSpending);
-
-  window.tableChart = new Chart(ctx, {
-    type: 'bar',
-    data: {
-      labels,
-      datasets: [{
-        label: 'Total Spending (Rs.)',
-        data: spending,
-        backgroundColor: 'rgba(102, 126, 234, 0.6)',
-        borderColor: 'rgba(102, 126, 234, 1)',
-        borderWidth: 1
-      }]
-    },
-    options: {
-      responsive: true,
-      plugins: {
-        title: {
-          display: true,
-          text: 'Total Spending per Table',
-          font: { size: 18 }
-        },
-        tooltip: {
-          callbacks: {
-            label: ctx => `Rs. ${Number(ctx.raw).toLocaleString()}`
-          }
-        }
-      },
-      scales: {
-        y: {
-          beginAtZero: true,
-          ticks: {
-            callback: value => `Rs. ${value}`
-          },
-          title: {
-            display: true,
-            text: 'Total Spending (Rs.)'
-          }
-        },
-        x: {
-          title: {
-            display: true,
-            text: 'Table'
-          }
-        }
-      }
-    }
-  });
-}
-function closeTableChartPopup() {
-  document.getElementById('tableChartModal').style.display = 'none';
-}
-
-
-  function loadPeakByDateRange() {
-  const start = document.getElementById('pb-start').value;
-  const end = document.getElementById('pb-end').value;
-  const branch = document.getElementById('pb-branch').value;
-  const output = document.getElementById('peak-date-output');
+@app.route("/dashboard")
+def dashboard():
+    filters = {k: request.args.get(k) for k in ("start", "end", "branch", "date")}
+    if bool(filters["start"]) != bool(filters["end"]):
+        return jsonify({"error": "Please select both start and end dates or leave both empty."}), 400
+    try:
+        for k in ("start", "end", "date"):
+            if filters[k]:
+                datetime.strptime(filters[k], "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
-  if (!start || !end) {
-    alert('Please select both Start and End dates.');
-    return;
-  }
+    wanted = request.args.get("panels")
+    names = [p.strip() for p in wanted.split(",") if p.strip()] if wanted else list(DASHBOARD_PANELS)
+    unknown = [n for n in names if n not in DASHBOARD_PANELS]
+    if unknown:
+        return jsonify({"error": f"Unknown panels: {', '.join(unknown)}"}), 400
 
-  output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
+    limit = request.args.get("limit")
+    try:
+        limit = parse_limit(limit) if limit else None
+    except PagingError as e:
+        return jsonify({"error": str(e)}), 400
+
+    started = time.perf_counter()
+    panels, futures = {}, {}
+    for name in names:
+        fn, args, required = DASHBOARD_PANELS[name]
+        missing = [a for a in required if not filters[a]]
+        if missing:
+            panels[name] = {"ok": False, "skipped": True, "error": f"Requires {', '.join(missing)}"}
+            continue
+        # Panels run in a copy of this request's context so their timings count towards it
+        futures[dashboard_executor.submit(contextvars.copy_context().run, _timed_panel, fn,
+                                          {a: filters[a] for a in args})] = name
+
+    done, pending = wait(futures, timeout=DASHBOARD_PANEL_TIMEOUT)
+    for future, name in futures.items():
+        if future in pending:
+            future.cancel()
+            panels[name] = {"ok": False, "error": "Timed out"}
+            continue
+        try:
+            data, ms = future.result()
+            panels[name] = {"ok": True, "ms": ms, "data": data}
+            if limit and name in DASHBOARD_PAGE_SPECS:
+                page, next_cursor, total = paginate(data, DASHBOARD_PAGE_SPECS[name], limit=limit)
+                panels[name].update(data=page, next=next_cursor, total=total)
+        except Exception as e:
+            print(f"❌ Dashboard panel {name} failed:", e)
+            panels[name] = {"ok": False, "error": "Query failed"}
 
-  fetch(`/peak-by-date-range?start=${start}&end=${end}&branch=${encodeURIComponent(branch)}`)
-    .then(response => response.json())
-    .then(data => {
-      currentTableData = data;
-      filteredData = [...data];
-      renderTable('peak-date-output', data, ['HourRange', 'TotalAmount', 'TotalOrders']);
+    return jsonify({
+        "filters": {k: v for k, v in filters.items() if v},
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+        "failed": sorted(n for n, p in panels.items() if not p["ok"] and not p.get("skipped")),
+        "panels": {name: panels[name] for name in names}
     })
-    .catch(error => {
-      output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
-    });
-}
-
-function showPeakChartPopup() {
-  if (!filteredData || filteredData.length === 0) {
-    alert('Please analyze data first.');
-    return;
-  }
-
-  const modal = document.getElementById('peakChartModal');
-  modal.style.display = 'flex';
-
-  const ctx = document.getElementById('peakChartCanvas').getContext('2d');
-  if (window.peakChart) window.peakChart.destroy();
-
-  const labels = filteredData.map(r => r.HourRange);
-  const amounts = filteredData.map(r => r.TotalAmount);
-
-  window.peakChart = new Chart(ctx, {
-    type: 'bar',
-    data: {
-      labels,
-      datasets: [{
-        label: 'Total Amount (Rs.)',
-        data: amounts,
-        backgroundColor: 'rgba(245, 87, 108, 0.6)',
-        borderColor: 'rgba(245, 87, 108, 1)',
-        borderWidth: 1
-      }]
-    },
-    options: {
-      responsive: true,
-      plugins: {
-        title: {
-          display: true,
-          text: 'Total Sale by Hour',
-          font: { size: 18 }
-        },
-        tooltip: {
-          callbacks: {
-            label: ctx => `Rs. ${Number(ctx.raw).toLocaleString()}`
-          }
-        }
-      },
-      scales: {
-        y: {
-          beginAtZero: true,
-          ticks: { callback: val => `Rs. ${val}` },
-          title: { display: true, text: 'Total Sale (Rs.)' }
-        }
-      }
-    }
-  });
-}
 
-function closePeakChartPopup() {
-  document.getElementById('peakChartModal').style.display = 'none';
+@app.route("/pool-stats")
+def pool_stats():
+    return jsonify({**db_pool.stats(), **backend.describe(), "admission": admission.stats()})
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return app.response_class(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/cache-stats")
+def cache_stats():
+    return jsonify({**result_cache.stats(), "query_single_flight": query_flight.stats(),
+                    "hot_window": hot_window.stats() if hot_window is not None else None,
+                    "warm_jobs": warm_scheduler.stats()})
+
+@app.route("/rollup-status")
+def rollup_status():
+    status = {"hourly": None, "items_daily": None, "tables_daily": None}
+    for store in ROLLUP_STORES:
+        cov = store.state()
+        status[store.name] = {"from": str(cov[0]), "through": str(cov[1]), "voucher": cov[2]} if cov else None
+    if ROLLUP_STORES:
+        sketcher = ROLLUP_STORES[0].sketcher
+        status["sketch"] = {"kind": sketcher.spec, "relative_error": sketcher.relative_error}
+    status["last_refresh"] = rollup_refresher.last_run
+    return jsonify(status)
+
+# A dashboard is closed only when every panel it shows is; all-time panels never are
+def dashboard_is_closed(args):
+    wanted = args.get("panels")
+    names = [p.strip() for p in wanted.split(",") if p.strip()] if wanted else list(DASHBOARD_PANELS)
+    for name in names:
+        if name in DASHBOARD_PANELS:
+            _, panel_args, _ = DASHBOARD_PANELS[name]
+            if not panel_args or not range_is_closed({a: args.get(a) for a in panel_args}):
+                return False
+    return True
+
+http_cache.init_app(
+    app,
+    endpoints=["top_items", "avg_spending", "peak_times", "peak_by_date", "peak_by_date_range",
+               "table_spending", "dashboard", "branches"],
+    no_store=["pool_stats", "cache_stats", "rollup_status", "prometheus_metrics"],
+    closed_when={"dashboard": dashboard_is_closed},
+)
+# After the HTTP cache, so 304s are answered without taking a slot
+admission.init_app(app)
+
+# CLI
+@app.cli.command("build-rollups")
+@click.option("--since", required=True, help="First day to roll up (YYYY-MM-DD).")
+@click.option("--through", default=None, help="Stop before this hour (default: the current hour).")
+def build_rollups(since, through):
+    """Extend the hourly and daily item rollups to cover SINCE up to the current hour/day."""
+    if not ROLLUP_STORES:
+        raise click.ClickException("ROLLUP_DB_PATH is empty; the rollups are disabled.")
+    through = datetime.fromisoformat(through) if through else None
+    for store in ROLLUP_STORES:
+        rows = store.build(fetch_all, day_start(since), through)
+        lo, hi = store.coverage()
+        click.echo(f"✅ {store.name}: rolled up {rows} rows; covering {lo} to {hi}")
+
+# Representative query per route, for the index advisor
+ROUTE_QUERIES = {
+    "/top-items": lambda: top_items_query("2000-01-01", "2000-01-31", "branch"),
+    "/avg-spending": avg_spending_query,
+    "/peak-times": lambda: hourly_query(),
+    "/peak-by-date": lambda: hourly_query(datetime(2000, 1, 1), datetime(2000, 1, 2)),
+    "/peak-by-date-range": lambda: hourly_query(datetime(2000, 1, 1), datetime(2000, 1, 31), "branch"),
+    "/table-spending": lambda: table_spending_query("2000-01-01", "2000-01-31", "branch"),
+    "/branches": branches_query,
 }
 
-  
-
-  </script>
-  <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-</body>
-</html>
-"""
+@app.cli.command("advise-indexes")
+@click.option("--offline", is_flag=True, help="Do not look up the base tables behind vwSaleDetail.")
+def advise_indexes(offline):
+    """List the columns each route filters and groups on, with covering-index DDL."""
+    base_columns = None
+    if not offline and backend.name == "mssql":
+        rows = fetch_all("""
+            SELECT c.COLUMN_NAME, u.TABLE_SCHEMA, u.TABLE_NAME, u.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.COLUMNS c
+            JOIN INFORMATION_SCHEMA.VIEW_COLUMN_USAGE u
+              ON u.VIEW_NAME = c.TABLE_NAME AND u.COLUMN_NAME = c.COLUMN_NAME
+            WHERE c.TABLE_NAME = 'vwSaleDetail'
+        """)
+        base_columns = {r[0]: (r[1], r[2], r[3]) for r in rows} or None
+        if base_columns is None:
+            click.echo("⚠️ Could not resolve base tables; emitting DDL against the view.")
+    seen = set()
+    for route, build in ROUTE_QUERIES.items():
+        q = build()
+        shape = q.shape()
+        click.echo(f"\n{route}")
+        for kind in ("equality", "range", "group_by", "reads"):
+            click.echo(f"  {kind:<9} {', '.join(shape[kind]) or '-'}")
+        for stmt in covering_indexes(route, q, base_columns):
+            if stmt.split(" ON ", 1)[1] not in seen:
+                seen.add(stmt.split(" ON ", 1)[1])
+                click.echo(f"  {stmt}")
+
+@app.cli.command("refresh-rollups")
+@click.option("--recheck-days", type=int, default=None, help="Also re-verify the last N days against the view.")
+@click.option("--interval", type=float, default=0, help="Keep running, refreshing every N seconds.")
+def refresh_rollups(recheck_days, interval):
+    """Fold rows added since the last run into the rollup stores."""
+    if recheck_days is not None:
+        rollup_refresher.recheck_days = recheck_days
+    while True:
+        click.echo(f"✅ {rollup_refresher.run_once()}")
+        if interval <= 0:
+            break
+        time.sleep(interval)
+
+@app.cli.command("export-snapshots")
+@click.option("--since", default=None, help="First day to export (YYYY-MM-DD; default: resume the last export).")
+@click.option("--through", default=None, help="Stop before this day (default: tomorrow).")
+@click.option("--recheck-days", type=int, default=3, help="When resuming, also re-verify the N days before it.")
+def export_snapshots(since, through, recheck_days):
+    """Write vwSaleDetail to Parquet partitioned by VoucherDate and BranchName, rewriting only changed days."""
+    exporter = SnapshotExporter.from_env(fetch_all)
+    if exporter is None:
+        raise click.ClickException("SNAPSHOT_DIR is empty; nowhere to export to.")
+    if backend.name == "duckdb" and os.path.abspath(backend.path) == os.path.abspath(exporter.root):
+        raise click.ClickException("DB_PATH is the snapshot directory; export from the source database.")
+    if since is None:
+        last = exporter.coverage()[1]
+        if last is None:
+            raise click.ClickException("Nothing exported yet; pass --since.")
+        since = (datetime.fromisoformat(last) - timedelta(days=recheck_days)).date()
+    try:
+        result = exporter.export(since, through)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    lo, hi = exporter.coverage()
+    click.echo(f"✅ {result}; {exporter.root} covers {lo} to {hi}")
+
+@app.cli.command("build-static")
+@click.option("--offline", is_flag=True, help="Use only assets already in static/vendor/.")
+def build_static(offline):
+    """Minify, fingerprint and vendor the front end into static/dist/."""
+    try:
+        manifest = build_bundle(offline=offline)
+    except (OSError, ValueError) as e:
+        raise click.ClickException(str(e))
+    for source, asset in manifest.items():
+        click.echo(f"{asset}  <-  {source}")
+    click.echo(f"✅ Built {len(manifest)} assets; restart the app to serve them")
 
 # ------------- RUN APP -------------
 if __name__ == "__main__":
@@ -0,0 +1,264 @@
+# metrics.py
+"""Per-route request metrics in the Prometheus text format.
+
+Each request carries a :class:`RequestTimer` (in a context variable, so
+dashboard panels running on the executor add to their parent request)
+that totals the time spent in each phase: ``connect`` (pool checkout),
+``execute``, ``fetch`` and ``serialize`` (JSON encoding). When the response
+is done the totals, rows and body size are folded into fixed-bucket
+histograms; recording costs a bisect and a dict update under a lock.
+
+Metrics are per process: with several gunicorn workers, scrape each one
+or sum them in the query.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_current = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Phase totals and row count for one request.
+
+    ``notes`` holds (name, value) events such as cache hits. Individual
+    spans are only kept once a tracer sets ``spans`` to a list.
+    """
+
+    __slots__ = ("started", "phases", "rows", "notes", "spans", "_lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.rows = 0
+        self.notes = []
+        self.spans = None
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds, started=None, attrs=None):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            if self.spans is not None and started is not None:
+                self.spans.append((phase, started, seconds, attrs))
+
+    def add_rows(self, n):
+        with self._lock:
+            self.rows += n
+
+    def note(self, name, value):
+        with self._lock:
+            self.notes.append((name, value))
+
+    def phase(self, name, **attrs):
+        return _Phase(self, name, attrs)
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "attrs", "started")
+
+    def __init__(self, timer, name, attrs=None):
+        self.timer = timer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        if self.timer is not None:
+            self.timer.add(self.name, time.perf_counter() - self.started, self.started, self.attrs)
+
+
+def current():
+    """The running request's timer, or None outside a request."""
+    return _current.get()
+
+
+def phase(name, **attrs):
+    """Time a block into the current request's ``name`` phase.
+
+    ``attrs`` only end up in the trace log, when tracing is on.
+    """
+    return _Phase(_current.get(), name, attrs)
+
+
+def add_rows(n):
+    timer = _current.get()
+    if timer is not None:
+        timer.add_rows(n)
+
+
+def note(name, value):
+    timer = _current.get()
+    if timer is not None:
+        timer.note(name, value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+def _number(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, n=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + n
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in values:
+            yield f"{self.name}{{{_labels(self.labels, labels)}}} {_number(value)}"
+
+
+class Gauge:
+    """Current values read at scrape time; ``read()`` maps label tuples to values."""
+
+    def __init__(self, name, help, labels, read):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.read = read
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in sorted(self.read().items()):
+            base = _labels(self.labels, labels)
+            yield f"{self.name}{{{base}}} {_number(value)}" if base else f"{self.name} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][idx] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = sorted((labels, (counts[:], total)) for labels, (counts, total) in self._series.items())
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in series:
+            base = _labels(self.labels, labels)
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                yield f'{self.name}_bucket{{{base},le="{bound if bound == "+Inf" else float(bound)}"}} {running}'
+            yield f"{self.name}_sum{{{base}}} {_number(total)}"
+            yield f"{self.name}_count{{{base}}} {running}"
+
+
+class _TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        timer = _current.get()
+        if timer is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            timer.add("serialize", time.perf_counter() - started, started)
+
+
+class Metrics:
+    """Request count, latency, phase breakdown, rows and bytes per route."""
+
+    def __init__(self, prefix="dbanalytics"):
+        self.requests = Counter(f"{prefix}_requests_total", "Requests handled.", ("route", "status"))
+        self.latency = Histogram(f"{prefix}_request_seconds", "Request latency.", ("route",), LATENCY_BUCKETS)
+        self.phases = Histogram(f"{prefix}_phase_seconds", "Time per request spent in each phase.",
+                                ("route", "phase"), LATENCY_BUCKETS)
+        self.rows = Histogram(f"{prefix}_response_rows", "Database rows read per request.", ("route",), ROW_BUCKETS)
+        self.bytes = Histogram(f"{prefix}_response_bytes", "Response body size (as sent).", ("route",), BYTE_BUCKETS)
+        self._all = [self.requests, self.latency, self.phases, self.rows, self.bytes]
+        self.prefix = prefix
+
+    def gauge(self, name, help, labels, read):
+        """Expose ``read()`` (label tuple -> value) as ``<prefix>_<name>`` on every scrape."""
+        self._all.append(Gauge(f"{self.prefix}_{name}", help, labels, read))
+
+    def init_app(self, app):
+        """Register before any other request hooks, so it sees short-circuited responses too."""
+        app.json = _TimedJSONProvider(app)
+
+        @app.before_request
+        def _start_timer():
+            _current.set(RequestTimer())
+
+        @app.after_request
+        def _record(response):
+            timer = _current.get()
+            if timer is None:
+                return response
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            status = response.status_code
+            if response.is_streamed:
+                sent = [0]
+                response.response = _counting(response.response, sent)
+                response.call_on_close(lambda: self.record(route, status, timer, sent[0]))
+            else:
+                self.record(route, status, timer, response.calculate_content_length() or 0)
+            return response
+
+        @app.teardown_request
+        def _clear_timer(exc):
+            _current.set(None)
+
+    def record(self, route, status, timer, sent):
+        self.requests.inc((route, str(status)))
+        self.latency.observe((route,), time.perf_counter() - timer.started)
+        for name, seconds in timer.phases.items():
+            self.phases.observe((route, name), seconds)
+        self.rows.observe((route,), timer.rows)
+        self.bytes.observe((route,), sent)
+
+    def render(self):
+        return "\n".join(line for metric in self._all for line in metric.render()) + "\n"
+
+
+def _counting(chunks, sent):
+    try:
+        for chunk in chunks:
+            sent[0] += len(chunk if isinstance(chunk, bytes) else chunk.encode())
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,129 @@
+# paging.py
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+
+PAGING_ARGS = ("q", "sort", "limit", "after")
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+
+class PagingError(ValueError):
+    pass
+
+
+class PageSpec:
+    """How one endpoint's rows may be searched, sorted and paged.
+
+    ``key`` must identify a row uniquely; it breaks ties so that keyset
+    cursors never skip or repeat rows.
+    """
+
+    def __init__(self, search, sort, key, default_sort):
+        self.search = search
+        self.sort = sort
+        self.key = key
+        self.default_sort = default_sort
+
+
+def wants_paging(args):
+    return any(args.get(a) for a in PAGING_ARGS)
+
+
+def _norm(value):
+    if isinstance(value, str):
+        return (False, value.lower(), value)
+    return (value is None, value if value is not None else 0, "")
+
+
+def _listify(value):
+    return [_listify(v) for v in value] if isinstance(value, (list, tuple)) else value
+
+
+def _tuplify(value):
+    return tuple(_tuplify(v) for v in value) if isinstance(value, list) else value
+
+
+def encode_cursor(position):
+    raw = json.dumps(_listify(position), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_norm(value):
+    """Whether ``value`` has the shape :func:`_norm` gives a cell: ``[is_null, value, tie]``."""
+    if not isinstance(value, list) or len(value) != 3:
+        return False
+    missing, v, tie = value
+    return type(missing) is bool and isinstance(tie, str) and (isinstance(v, str) or type(v) in (int, float))
+
+
+def decode_cursor(cursor, arity=None):
+    """The position encoded in ``cursor``; ``arity`` is the number of cells it must hold."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise PagingError("Invalid 'after' cursor") from e
+    if (not isinstance(position, list) or (arity is not None and len(position) != arity)
+            or not all(_is_norm(cell) for cell in position)):
+        raise PagingError("Invalid 'after' cursor")
+    return _tuplify(position)
+
+
+def parse_limit(limit):
+    if limit is None or limit == "":
+        return DEFAULT_LIMIT
+    limit = str(limit)
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_LIMIT:
+        raise PagingError(f"'limit' must be a number from 1 to {MAX_LIMIT}")
+    return int(limit)
+
+
+def parse_paging(spec, q=None, sort=None, limit=None, after=None):
+    """Validate paging arguments without touching any rows, so callers can reject them before querying.
+
+    Returns ``(column, descending, limit, position)``; raises :class:`PagingError`.
+    """
+    sort = sort or spec.default_sort
+    column = sort.lstrip("-")
+    if column not in spec.sort:
+        raise PagingError(f"Cannot sort by '{column}'. Use one of: {', '.join(spec.sort)}")
+    position = decode_cursor(after, 1 + len(spec.key)) if after else None
+    return column, sort.startswith("-"), parse_limit(limit), position
+
+
+def paginate(rows, spec, q=None, sort=None, limit=None, after=None):
+    """Filter, order and slice ``rows`` (a list of dicts).
+
+    Returns ``(page, next_cursor, total)`` where ``total`` counts the rows
+    matching ``q`` and ``next_cursor`` is None on the last page.
+    """
+    column, descending, limit, after = parse_paging(spec, q, sort, limit, after)
+
+    if q:
+        needle = q.strip().lower()
+        rows = [r for r in rows if any(needle in str(r.get(c, "")).lower() for c in spec.search)]
+
+    def position(row):
+        return (_norm(row[column]),) + tuple(_norm(row[k]) for k in spec.key)
+
+    ordered = sorted(rows, key=position)
+    positions = [position(r) for r in ordered]
+    try:
+        cut = (bisect_left if descending else bisect_right)(positions, after) if after else None
+    except TypeError as e:
+        # Well-formed, but its cells do not compare with this column's values
+        raise PagingError("Invalid 'after' cursor") from e
+    if descending:
+        end = len(ordered) if cut is None else cut
+        start = max(0, end - limit)
+        page = ordered[start:end][::-1]
+        more = start > 0
+    else:
+        start = cut or 0
+        page = ordered[start:start + limit]
+        more = start + limit < len(ordered)
+
+    next_cursor = encode_cursor(position(page[-1])) if page and more else None
+    return page, next_cursor, len(ordered)
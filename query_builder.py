@@ -0,0 +1,153 @@
+# query_builder.py
+from datetime import date, datetime, timedelta
+
+# Columns stored as DATE; every other date filter is on a DATETIME column.
+DATE_COLUMNS = {"VoucherDate"}
+
+# Per-engine SQL: truncation to day / hour, and how a row limit is written
+DIALECTS = {
+    "mssql": {"day": "CAST({0} AS DATE)", "hour": "DATEPART(HOUR, {0})", "limit": "top"},
+    "sqlite": {"day": "DATE({0})", "hour": "CAST(strftime('%H', {0}) AS INTEGER)", "limit": "limit"},
+    "duckdb": {"day": "CAST({0} AS DATE)", "hour": "EXTRACT(HOUR FROM {0})", "limit": "limit"},
+}
+
+
+def parse_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+class Query:
+    """Builds a single-table SELECT with sargable predicates.
+
+    Filters are added through methods rather than raw strings so the query
+    can report which columns it filters (by equality or by range), groups
+    and reads; ``advise-indexes`` turns that into covering-index DDL.
+    """
+
+    def __init__(self, select, uses=(), source="vwSaleDetail"):
+        self.select = select
+        self.source = source
+        self.params = []
+        self._where = []
+        self._group_by = []
+        self._order_by = None
+        self._top = None
+        self.equality_columns = []
+        self.range_columns = []
+        self.group_columns = []
+        self.read_columns = list(uses)
+
+    def where(self, clause, *params, columns=()):
+        self._where.append(clause)
+        self.params.extend(params)
+        for c in columns:
+            if c not in self.read_columns:
+                self.read_columns.append(c)
+        return self
+
+    def equals(self, column, value):
+        if column not in self.equality_columns:
+            self.equality_columns.append(column)
+        return self.where(f"{column} = ?", value)
+
+    def not_null(self, column):
+        return self.where(f"{column} IS NOT NULL", columns=[column])
+
+    def branch(self, branch):
+        if branch and branch != "All":
+            self.equals("BranchName", branch)
+        return self
+
+    def time_range(self, column, start=None, end=None):
+        """``start <= column < end``; either bound may be omitted."""
+        if column not in self.range_columns:
+            self.range_columns.append(column)
+        if start is not None:
+            self.where(f"{column} >= ?", start)
+        if end is not None:
+            self.where(f"{column} < ?", end)
+        if start is None and end is None:
+            self.not_null(column)
+        return self
+
+    def day_range(self, column, first_day, last_day):
+        """Whole days ``first_day``..``last_day`` inclusive, as a half-open range."""
+        lo, hi = parse_day(first_day), parse_day(last_day) + timedelta(days=1)
+        if column not in DATE_COLUMNS:
+            lo, hi = datetime(lo.year, lo.month, lo.day), datetime(hi.year, hi.month, hi.day)
+        return self.time_range(column, lo, hi)
+
+    def group_by(self, *exprs, columns=None):
+        self._group_by.extend(exprs)
+        for c in (exprs if columns is None else columns):
+            if c not in self.group_columns:
+                self.group_columns.append(c)
+        return self
+
+    def order_by(self, expr):
+        self._order_by = expr
+        return self
+
+    def top(self, n):
+        self._top = int(n)
+        return self
+
+    def sql(self, dialect="mssql"):
+        limit = DIALECTS[dialect]["limit"] if self._top is not None else None
+        top = f"TOP {self._top} " if limit == "top" else ""
+        parts = [f"SELECT {top}{self.select}", f"FROM {self.source}"]
+        if self._where:
+            parts.append("WHERE " + " AND ".join(self._where))
+        if self._group_by:
+            parts.append("GROUP BY " + ", ".join(self._group_by))
+        if self._order_by:
+            parts.append("ORDER BY " + self._order_by)
+        if limit == "limit":
+            parts.append(f"LIMIT {self._top}")
+        return "\n".join(parts)
+
+    def shape(self):
+        return {
+            "equality": list(self.equality_columns),
+            "range": list(self.range_columns),
+            "group_by": list(self.group_columns),
+            "reads": [c for c in self.read_columns
+                      if c not in self.equality_columns and c not in self.range_columns],
+        }
+
+
+def covering_indexes(route, query, base_columns=None):
+    """CREATE INDEX statements that let ``query`` seek and avoid lookups.
+
+    ``base_columns`` maps view column -> (schema, table, column) for the
+    tables behind the view. Without it the DDL targets the view itself,
+    which only works once the view is schema-bound and clustered-indexed.
+    """
+    shape = query.shape()
+    keys = shape["equality"] + shape["range"]
+    includes = [c for c in shape["group_by"] + shape["reads"] if c not in keys]
+    if base_columns is None:
+        base_columns = {c: ("dbo", query.source, c) for c in keys + includes}
+
+    by_table = {}
+    for c in keys + includes:
+        if c not in base_columns:
+            continue
+        schema, table, column = base_columns[c]
+        entry = by_table.setdefault((schema, table), ([], []))
+        (entry[0] if c in keys else entry[1]).append(column)
+
+    name = route.strip("/").replace("-", "_") or "home"
+    ddl = []
+    for (schema, table), (key_cols, include_cols) in by_table.items():
+        if not key_cols:
+            continue
+        stmt = f"CREATE INDEX IX_{table}_{name} ON [{schema}].[{table}] ({', '.join(key_cols)})"
+        if include_cols:
+            stmt += f" INCLUDE ({', '.join(dict.fromkeys(include_cols))})"
+        ddl.append(stmt + ";")
+    return ddl
@@ -0,0 +1,74 @@
+# refreshing.py
+import os
+import threading
+import time
+
+_MISSING = object()
+
+
+class RefreshingValue:
+    """A slow-to-load value kept in memory and reloaded off the request path.
+
+    The first :meth:`get` loads synchronously; after that callers always get
+    the held value immediately. Once it is older than ``ttl`` the next call
+    starts one background reload, and a failed reload keeps the old value.
+    """
+
+    def __init__(self, load, ttl=3600.0, name="value"):
+        self.load = load
+        self.ttl = ttl
+        self.name = name
+        self._value = _MISSING
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, load, name, default_ttl=3600.0):
+        return cls(load, ttl=float(os.environ.get(f"{name.upper()}_TTL", default_ttl)), name=name)
+
+    def refresh(self):
+        value = self.load()
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+        return value
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"❌ Refreshing {self.name} failed:", e)
+        finally:
+            self._refreshing = False
+
+    def get(self):
+        with self._lock:
+            value, age = self._value, time.monotonic() - self._loaded_at
+            stale = value is not _MISSING and age >= self.ttl and not self._refreshing
+            if stale:
+                self._refreshing = True
+        if value is _MISSING:
+            return self.refresh()
+        if stale:
+            threading.Thread(target=self._refresh_in_background, name=f"refresh-{self.name}", daemon=True).start()
+        return value
+
+    def start(self, interval):
+        """Reload every ``interval`` seconds on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def loop():
+            while not self._stop.wait(interval):
+                self._refresh_in_background()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name=f"refresh-{self.name}-loop", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
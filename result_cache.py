@@ -0,0 +1,260 @@
+# result_cache.py
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from single_flight import SingleFlight
+
+_MISSING = object()
+
+
+def normalize_args(args):
+    """Drop empty values and the "All" branch so equivalent requests share a key."""
+    out = []
+    for name, value in args.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value or (name == "branch" and value == "All"):
+                continue
+        out.append((name, value))
+    return tuple(sorted(out))
+
+
+# Vouchers keep arriving against a VoucherDate for hours after midnight; a day
+# only counts as closed once this much of the next one has passed (the same
+# margin the item rollup waits before trusting a day).
+SETTLE = timedelta(hours=float(os.environ.get("ITEM_ROLLUP_SETTLE_HOURS", 6)))
+
+
+def range_is_closed(args, now=None):
+    """True when the request only covers days that ended at least :data:`SETTLE` ago."""
+    last = args.get("end") or args.get("date")
+    if not last:
+        return False
+    if isinstance(last, str):
+        try:
+            last = datetime.strptime(last, "%Y-%m-%d").date()
+        except ValueError:
+            return False
+    elif isinstance(last, datetime):
+        last = last.date()
+    closes_at = datetime(last.year, last.month, last.day) + timedelta(days=1) + SETTLE
+    return closes_at <= (now or datetime.now())
+
+
+class ResultCache:
+    """In-process LRU + TTL cache for query results.
+
+    Results for closed historical ranges are kept for ``historical_ttl``.
+    Anything touching today is kept for at most ``live_ttl`` and goes stale
+    as soon as the data watermark returned by ``watermark`` moves on. The
+    watermark itself is re-read at most every ``watermark_interval`` seconds.
+    For ``stale_ttl`` seconds past its expiry a stale entry is still served
+    immediately while one background recompute replaces it. Concurrent
+    misses on one key compute it once and share the result.
+    ``on_lookup(route, hit, stale)``, if given, is called for every lookup.
+    """
+
+    def __init__(self, max_entries=512, historical_ttl=86400.0, live_ttl=300.0,
+                 watermark=None, watermark_interval=15.0, on_lookup=None, stale_ttl=300.0):
+        self.max_entries = max_entries
+        self.historical_ttl = historical_ttl
+        self.live_ttl = live_ttl
+        self.stale_ttl = stale_ttl
+        self.watermark_interval = watermark_interval
+        self.on_lookup = on_lookup
+        self._watermark_fn = watermark
+        self._watermark = _MISSING
+        self._watermark_read_at = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._wm_lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._revalidating = set()
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "watermark_reads": 0,
+            "watermark_errors": 0,
+            "revalidations": 0,
+            "revalidation_errors": 0,
+            "warmed": 0,
+        }
+
+    @classmethod
+    def from_env(cls, watermark=None, on_lookup=None, prefix="RESULT_CACHE_"):
+        env = os.environ
+        return cls(
+            max_entries=int(env.get(prefix + "MAX_ENTRIES", 512)),
+            historical_ttl=float(env.get(prefix + "HISTORICAL_TTL", 86400)),
+            live_ttl=float(env.get(prefix + "LIVE_TTL", 300)),
+            watermark=watermark,
+            watermark_interval=float(env.get(prefix + "WATERMARK_INTERVAL", 15)),
+            on_lookup=on_lookup,
+            stale_ttl=float(env.get(prefix + "STALE_TTL", 300)),
+        )
+
+    def current_watermark(self):
+        if self._watermark_fn is None:
+            return None
+        now = time.monotonic()
+        if self._watermark is not _MISSING and now - self._watermark_read_at < self.watermark_interval:
+            return self._watermark
+        with self._wm_lock:
+            if self._watermark is not _MISSING and time.monotonic() - self._watermark_read_at < self.watermark_interval:
+                return self._watermark
+            try:
+                value = self._watermark_fn()
+            except Exception as e:
+                print("❌ Watermark Error:", e)
+                self._counters["watermark_errors"] += 1
+                value = _MISSING
+            self._counters["watermark_reads"] += 1
+            self._watermark = value
+            self._watermark_read_at = time.monotonic()
+            return value
+
+    def get(self, key, live):
+        """Return ``(value, watermark, stale)``; ``value`` is ``_MISSING`` on a miss."""
+        watermark = self.current_watermark() if live else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return _MISSING, watermark, False
+            value, expires_at, entry_watermark = entry
+            now = time.monotonic()
+            expired = now >= expires_at
+            moved = live and (watermark is _MISSING or entry_watermark != watermark)
+            if (expired or moved) and self.stale_ttl > 0 and now < expires_at + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self._counters["stale_hits"] += 1
+                return value, watermark, True
+            if expired or moved:
+                del self._entries[key]
+                self._counters["expirations" if expired else "invalidations"] += 1
+                self._counters["misses"] += 1
+                return _MISSING, watermark, False
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value, watermark, False
+
+    def put(self, key, value, live, watermark=None):
+        if live and watermark is _MISSING:
+            return
+        ttl = self.live_ttl if live else self.historical_ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl, watermark)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def get_or_compute(self, route, args, compute):
+        key = (route, normalize_args(args))
+        live = not range_is_closed(args)
+        value, watermark, stale = self.get(key, live)
+        if self.on_lookup is not None:
+            self.on_lookup(route, value is not _MISSING, stale)
+        if value is _MISSING:
+            value = self._flight.do(key, lambda: self._compute(key, compute, live, watermark))
+        elif stale:
+            self._revalidate(key, compute, live)
+        return value
+
+    def _compute(self, key, compute, live, watermark):
+        value = compute()
+        self.put(key, value, live, watermark)
+        return value
+
+    def _revalidate(self, key, compute, live):
+        """Recompute ``key`` on a background thread unless that is already under way."""
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+            self._counters["revalidations"] += 1
+
+        def run():
+            try:
+                # Read the watermark before computing, so a change mid-compute still invalidates the result
+                watermark = self.current_watermark() if live else None
+                self._flight.do(key, lambda: self._compute(key, compute, live, watermark))
+            except Exception as e:
+                print(f"❌ Revalidating {key[0]} failed:", e)
+                with self._lock:
+                    self._counters["revalidation_errors"] += 1
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, name=f"revalidate-{key[0]}", daemon=True).start()
+
+    def warm(self, route, args, compute, ahead=0.0):
+        """Compute ``route`` for ``args`` unless its entry is fresh for another ``ahead`` seconds.
+
+        Returns True when it computed. Used to precompute common views off the
+        request path, so they are replaced before anyone finds them expired.
+        """
+        key = (route, normalize_args(args))
+        live = not range_is_closed(args)
+        watermark = self.current_watermark() if live else None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            _, expires_at, entry_watermark = entry
+            if expires_at - time.monotonic() > ahead and (not live or entry_watermark == watermark):
+                return False
+        self._flight.do(key, lambda: self._compute(key, compute, live, watermark))
+        with self._lock:
+            self._counters["warmed"] += 1
+        return True
+
+    def memoize(self, route):
+        """Cache a keyword-argument query function under ``route``.
+
+        Arguments are keyed with the function's defaults filled in, so a call
+        that spells out a default shares its entry with one that omits it.
+        The wrapper's ``warm(ahead, **kwargs)`` precomputes an entry.
+        """
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            def bound(kwargs):
+                args = signature.bind(**kwargs)
+                args.apply_defaults()
+                return args.arguments
+
+            @functools.wraps(fn)
+            def wrapper(**kwargs):
+                return self.get_or_compute(route, bound(kwargs), lambda: fn(**kwargs))
+            wrapper.uncached = fn
+            wrapper.warm = lambda ahead=0.0, **kwargs: self.warm(route, bound(kwargs), lambda: fn(**kwargs), ahead)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "revalidating": len(self._revalidating),
+                "max_entries": self.max_entries,
+                "hit_ratio": round(self._counters["hits"] / requests, 4) if requests else None,
+                **self._counters,
+                "single_flight": self._flight.stats(),
+            }
@@ -0,0 +1,787 @@
+# rollups.py
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from query_builder import DATE_COLUMNS, DIALECTS, Query
+from sketches import Sketcher
+
+# Sketched stores are built from one row per voucher per bucket
+HOURLY_SOURCE_SQL = """
+    SELECT BranchName, {day} AS Day, {hour} AS Hour, VoucherNo,
+           SUM(COALESCE(Amount, 0)) AS TotalAmount, COUNT(*) AS TotalLines
+    FROM vwSaleDetail
+    WHERE EntryTime >= ? AND EntryTime < ?
+    GROUP BY BranchName, {day}, {hour}, VoucherNo
+"""
+
+TABLE_SOURCE_SQL = """
+    SELECT BranchName, VoucherDate, TableCode, TableName, VoucherNo,
+           SUM(COALESCE(Amount, 0)) AS TotalAmount, COUNT(*) AS TotalLines
+    FROM vwSaleDetail
+    WHERE EntryTime >= ? AND EntryTime < ? AND VoucherDate IS NOT NULL AND SaleType = 'D'
+    GROUP BY BranchName, VoucherDate, TableCode, TableName, VoucherNo
+"""
+
+ITEM_SOURCE_SQL = """
+    SELECT BranchName, VoucherDate, GroupName, ItemName,
+           SUM(COALESCE(Qty, 0)) AS TotalQty, SUM(COALESCE(Amount, 0)) AS TotalAmount,
+           COUNT(*) AS TotalLines
+    FROM vwSaleDetail
+    WHERE EntryTime >= ? AND EntryTime < ? AND VoucherDate IS NOT NULL
+    GROUP BY BranchName, VoucherDate, GroupName, ItemName
+"""
+
+FINGERPRINT_SQL = """
+    SELECT BranchName, {day} AS Day, SUM(COALESCE(Amount, 0)) AS TotalAmount, COUNT(*) AS TotalLines
+    FROM vwSaleDetail
+    WHERE {column} >= ? AND {column} < ? AND EntryTime < ?{filter}
+    GROUP BY BranchName, {day}
+"""
+
+STATE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        name TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+
+def floor_hour(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
+
+
+def as_day(value):
+    return as_datetime(value).date().isoformat()
+
+
+def day_start(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d")
+    return floor_hour(as_datetime(value)).replace(hour=0)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return json.dumps({"datetime": value.isoformat(sep=" ")})
+    return json.dumps(value, default=str)
+
+
+def _decode(text):
+    value = json.loads(text)
+    if isinstance(value, dict) and "datetime" in value:
+        return datetime.fromisoformat(value["datetime"])
+    return value
+
+
+class RollupStore:
+    """Base for aggregate tables kept in the local rollup SQLite file.
+
+    A store is authoritative for source rows with ``EntryTime`` in
+    ``[from, through)``. ``through`` is the refresh high-watermark and may
+    fall mid-hour; readers only trust whole buckets before it.
+
+    Subclasses describe the raw columns they consume, which date column
+    partitions them per branch, and how to merge new rows or rebuild a
+    (branch, day) partition from scratch. Sketched stores keep a distinct
+    voucher sketch per row so order counts merge across any range; a store
+    whose table layout or sketch kind changed is dropped and must be rebuilt.
+    """
+
+    name = None
+    table = None
+    key_columns = ()
+    schema_version = 1
+    sketched = False
+    schema = ""
+    columns = ("BranchName", "EntryTime", "VoucherNo", "Amount")
+    partition_column = "EntryTime"
+    source_filter = ""
+    source_sql = ""
+    insert_sql = ""
+    # How long after its bucket a source row may still be entered.
+    settle = timedelta(0)
+
+    def __init__(self, path, dialect="mssql", sketcher=None):
+        self.path = path
+        self.dialect_name = dialect
+        self.dialect = DIALECTS[dialect]
+        self.sketcher = sketcher or Sketcher.from_env()
+        self._write_lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(STATE_SCHEMA)
+            self._check_version(db)
+            db.executescript(self.schema)
+
+    @classmethod
+    def from_env(cls, name="ROLLUP_DB_PATH", default="rollups.sqlite3", dialect="mssql"):
+        path = os.environ.get(name, default)
+        return cls(path, dialect) if path else None
+
+    @property
+    def version(self):
+        return f"{self.schema_version}:{self.sketcher.spec}" if self.sketched else str(self.schema_version)
+
+    def _check_version(self, db):
+        row = db.execute("SELECT value FROM rollup_state WHERE name = ?", [self.name + "_version"]).fetchone()
+        exists = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [self.table]).fetchone()
+        stored = _decode(row[0]) if row else ("1" if exists else None)
+        if stored is not None and stored != self.version:
+            print(f"⚠️ Rollup {self.name} was built as {stored}, now {self.version}; run build-rollups again")
+            db.execute(f"DROP TABLE IF EXISTS {self.table}")
+            db.executemany("DELETE FROM rollup_state WHERE name = ?",
+                           [(self.name + k,) for k in ("_from", "_through", "_voucher")])
+        db.execute("INSERT OR REPLACE INTO rollup_state (name, value) VALUES (?, ?)",
+                   [self.name + "_version", _encode(self.version)])
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def state(self, db=None):
+        """Return ``(from, through, last_voucher)`` or None before the first build."""
+        close = db is None
+        db = db or self._connect()
+        try:
+            rows = dict(db.execute("SELECT name, value FROM rollup_state WHERE name LIKE ?",
+                                   [self.name + "_%"]))
+        finally:
+            if close:
+                db.close()
+        if self.name + "_from" not in rows:
+            return None
+        return (_decode(rows[self.name + "_from"]), _decode(rows[self.name + "_through"]),
+                _decode(rows.get(self.name + "_voucher", "null")))
+
+    def set_state(self, db, lo, hi, voucher):
+        db.executemany("INSERT OR REPLACE INTO rollup_state (name, value) VALUES (?, ?)", [
+            (self.name + "_from", _encode(lo)),
+            (self.name + "_through", _encode(hi)),
+            (self.name + "_voucher", _encode(voucher)),
+        ])
+
+    def coverage(self):
+        """Whole-bucket window that readers may answer from the store."""
+        state = self.state()
+        if state is None:
+            return None
+        lo, hi, _ = state
+        return lo, self.bucket_start(hi - self.settle)
+
+    def overlaps(self, start=None, end=None):
+        cov = self.coverage()
+        if cov is None:
+            return False
+        lo, hi = cov
+        return lo < hi and (start is None or start < hi) and (end is None or end > lo)
+
+    def bucket_start(self, ts):
+        return day_start(ts)
+
+    def partition_of(self, row):
+        return row["BranchName"] or "", as_day(row[self.partition_column])
+
+    def fingerprint_sql(self):
+        return FINGERPRINT_SQL.format(
+            day=self.dialect["day"].format(self.partition_column),
+            column=self.partition_column,
+            filter=f" AND {self.source_filter}" if self.source_filter else "")
+
+    def load(self, db, fetched):
+        """Store rows fetched with ``source_sql`` during :meth:`build`."""
+        raise NotImplementedError
+
+    def build(self, fetch, since, through=None, chunk=timedelta(days=1)):
+        """Bulk-aggregate whole buckets from ``since`` in the source database.
+
+        On an empty store this covers ``since`` up to ``through`` (default:
+        the current bucket); afterwards it only backfills older history and
+        leaves moving forward to :class:`RollupRefresher`.
+        """
+        since = self.bucket_start(since)
+        state = self.state()
+        if state is None:
+            through = self.bucket_start(through or datetime.now())
+            voucher = fetch("SELECT MAX(VoucherNo) FROM vwSaleDetail WHERE EntryTime < ?", [through])[0][0]
+            chunks = _chunks(since, through, chunk)
+        else:
+            chunks = list(reversed(_chunks(since, state[0], chunk)))
+        sql = self.source_sql.format(day=self.dialect["day"].format("EntryTime"),
+                                     hour=self.dialect["hour"].format("EntryTime"))
+        loaded = 0
+        for c_start, c_end in chunks:
+            rows = fetch(sql, [c_start, c_end])
+            with self._write_lock, self._connect() as db:
+                db.execute("BEGIN IMMEDIATE")
+                self.load(db, rows)
+                if state is not None:
+                    # Re-read: a refresher may have moved ``through`` meanwhile.
+                    lo, hi, voucher = self.state(db)
+                    self.set_state(db, min(lo, c_start), hi, voucher)
+            loaded += len(rows)
+        if state is None and chunks:
+            with self._write_lock, self._connect() as db:
+                db.execute("BEGIN IMMEDIATE")
+                if self.state(db) is None:
+                    self.set_state(db, since, through, voucher)
+        return loaded
+
+    def merge(self, db, rows):
+        raise NotImplementedError
+
+    def replace_partitions(self, db, partitions, rows):
+        raise NotImplementedError
+
+    def fingerprints(self, db, since_day):
+        return {(b, d): (a, n) for b, d, a, n in db.execute(
+            f"SELECT branch, day, SUM(amount), SUM(lines) FROM {self.table} WHERE day >= ? GROUP BY branch, day",
+            [since_day])}
+
+    def _add(self, buckets, key, voucher, amount, lines):
+        acc = buckets.get(key)
+        if acc is None:
+            acc = buckets[key] = [0.0, 0, self.sketcher.new()]
+        acc[0] += float(amount or 0)
+        acc[1] += lines
+        if voucher is not None:
+            acc[2].add(voucher)
+
+    def _upsert(self, db, buckets):
+        """Add ``{key: [amount, lines, sketch]}`` into the table, merging sketches."""
+        where = " AND ".join(f"{c} = ?" for c in self.key_columns)
+        cols = self.key_columns + ("amount", "orders", "lines", "sketch")
+        rows = []
+        for key, (amount, lines, sketch) in buckets.items():
+            old = db.execute(f"SELECT amount, lines, sketch FROM {self.table} WHERE {where}", key).fetchone()
+            if old is not None:
+                amount, lines = amount + old[0], lines + old[1]
+                sketch.merge_blob(old[2])
+            rows.append(key + (amount, sketch.count(), lines, sketch.to_bytes()))
+        db.executemany(f"INSERT OR REPLACE INTO {self.table} ({', '.join(cols)}) "
+                       f"VALUES ({', '.join('?' * len(cols))})", rows)
+
+    def _replace_sketched(self, db, partitions, buckets):
+        partitions = set(partitions)
+        db.executemany(f"DELETE FROM {self.table} WHERE branch = ? AND day = ?", list(partitions))
+        self._upsert(db, {k: v for k, v in buckets.items() if k[:2] in partitions})
+
+    def _range_where(self, lo, hi, branch):
+        where, params = ["day >= ?", "day < ?"], [lo.date().isoformat(), hi.date().isoformat()]
+        if branch:
+            where.append("branch = ?")
+            params.append(branch)
+        return where, params
+
+    def _covered(self, start, end):
+        cov = self.coverage()
+        if cov is None:
+            return None
+        lo, hi = cov
+        lo = max(lo, start) if start else lo
+        hi = min(hi, end) if end else hi
+        return (lo, hi) if lo < hi else None
+
+
+class HourlyRollup(RollupStore):
+    """Per (branch, day, hour) sales totals backing the peak-hour endpoints."""
+
+    name = "hourly"
+    table = "hourly_sales"
+    key_columns = ("branch", "day", "hour")
+    schema_version = 2
+    sketched = True
+    schema = """
+        CREATE TABLE IF NOT EXISTS hourly_sales (
+            branch TEXT NOT NULL,
+            day TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            orders INTEGER NOT NULL,
+            lines INTEGER NOT NULL,
+            sketch BLOB NOT NULL,
+            PRIMARY KEY (branch, day, hour)
+        );
+        CREATE INDEX IF NOT EXISTS ix_hourly_sales_day ON hourly_sales (day, hour);
+    """
+    source_sql = HOURLY_SOURCE_SQL
+
+    def bucket_start(self, ts):
+        return floor_hour(ts)
+
+    def load(self, db, fetched):
+        buckets = {}
+        for branch, day, hour, voucher, amount, lines in fetched:
+            self._add(buckets, (branch or "", as_day(day), int(hour)), voucher, amount, int(lines))
+        self._upsert(db, buckets)
+
+    def _aggregate(self, rows):
+        buckets = {}
+        for row in rows:
+            ts = as_datetime(row["EntryTime"])
+            self._add(buckets, (row["BranchName"] or "", ts.date().isoformat(), ts.hour),
+                      row["VoucherNo"], row["Amount"], 1)
+        return buckets
+
+    def merge(self, db, rows):
+        # The sketches dedupe vouchers already counted in the boundary hour.
+        self._upsert(db, self._aggregate(rows))
+
+    def replace_partitions(self, db, partitions, rows):
+        self._replace_sketched(db, partitions, self._aggregate(rows))
+
+    def hourly(self, start=None, end=None, branch=None):
+        """``{hour: [amount, voucher sketch]}`` for covered hours in ``[start, end)``."""
+        window = self._covered(start, end)
+        if window is None:
+            return {}
+        lo, hi = window
+        where = ["(day > ? OR (day = ? AND hour >= ?))", "(day < ? OR (day = ? AND hour < ?))"]
+        params = [lo.date().isoformat(), lo.date().isoformat(), lo.hour,
+                  hi.date().isoformat(), hi.date().isoformat(), hi.hour]
+        if branch:
+            where.append("branch = ?")
+            params.append(branch)
+        profile = {}
+        with self._connect() as db:
+            for hour, amount, sketch in db.execute(
+                    "SELECT hour, amount, sketch FROM hourly_sales WHERE " + " AND ".join(where), params):
+                slot = profile.get(hour)
+                if slot is None:
+                    slot = profile[hour] = [0.0, self.sketcher.new()]
+                slot[0] += amount
+                slot[1].merge_blob(sketch)
+        return profile
+
+    def branches(self):
+        # NULL branch names are stored as ''; the view's branch list leaves them out
+        with self._connect() as db:
+            return [r[0] for r in db.execute(
+                "SELECT DISTINCT branch FROM hourly_sales WHERE branch <> '' ORDER BY branch")]
+
+
+class ItemDailyRollup(RollupStore):
+    """Per (branch, voucher date, group, item) quantity and amount totals.
+
+    Rows are bucketed by ``VoucherDate`` (the business day the top-items
+    route filters on) while coverage still follows ``EntryTime``, so a
+    voucher entered after midnight lands on its business day. A day is only
+    trusted once ``settle`` has passed after it ends.
+    """
+
+    name = "items_daily"
+    table = "item_daily"
+    key_columns = ("branch", "day", "grp", "item")
+    schema = """
+        CREATE TABLE IF NOT EXISTS item_daily (
+            branch TEXT NOT NULL,
+            day TEXT NOT NULL,
+            grp TEXT NOT NULL,
+            item TEXT NOT NULL,
+            qty REAL NOT NULL,
+            amount REAL NOT NULL,
+            lines INTEGER NOT NULL,
+            PRIMARY KEY (branch, day, grp, item)
+        );
+        CREATE INDEX IF NOT EXISTS ix_item_daily_grp_day ON item_daily (grp, day);
+    """
+    columns = ("BranchName", "EntryTime", "VoucherNo", "Amount", "VoucherDate", "GroupName", "ItemName", "Qty")
+    partition_column = "VoucherDate"
+    settle = timedelta(hours=float(os.environ.get("ITEM_ROLLUP_SETTLE_HOURS", 6)))
+    source_sql = ITEM_SOURCE_SQL
+    # A business day can straddle two EntryTime chunks, so built rows add up.
+    insert_sql = """
+        INSERT INTO item_daily (branch, day, grp, item, qty, amount, lines) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (branch, day, grp, item) DO UPDATE SET
+            qty = qty + excluded.qty,
+            amount = amount + excluded.amount,
+            lines = lines + excluded.lines
+    """
+
+    def load(self, db, fetched):
+        db.executemany(self.insert_sql, [
+            (r[0] or "", as_day(r[1]), r[2] or "", r[3] or "", float(r[4]), float(r[5]), int(r[6]))
+            for r in fetched])
+
+    def _aggregate(self, rows):
+        buckets = {}
+        for row in rows:
+            if row["VoucherDate"] is None:
+                continue
+            key = (row["BranchName"] or "", as_day(row["VoucherDate"]), row["GroupName"] or "", row["ItemName"] or "")
+            acc = buckets.get(key)
+            if acc is None:
+                acc = buckets[key] = [0.0, 0.0, 0]
+            acc[0] += float(row["Qty"] or 0)
+            acc[1] += float(row["Amount"] or 0)
+            acc[2] += 1
+        return [key + tuple(acc) for key, acc in buckets.items()]
+
+    def merge(self, db, rows):
+        # Sums only: a row is never in two chunks, so the boundary rows need no dedupe.
+        db.executemany(self.insert_sql, self._aggregate(rows))
+
+    def replace_partitions(self, db, partitions, rows):
+        partitions = set(partitions)
+        db.executemany("DELETE FROM item_daily WHERE branch = ? AND day = ?", list(partitions))
+        db.executemany(self.insert_sql, [r for r in self._aggregate(rows) if r[:2] in partitions])
+
+    def items(self, start=None, end=None, branch=None, group=None):
+        """Total qty per item for covered days in ``[start, end)``."""
+        window = self._covered(start, end)
+        if window is None:
+            return {}
+        where, params = self._range_where(*window, branch)
+        if group:
+            where.append("grp = ?")
+            params.append(group)
+        sql = "SELECT item, SUM(qty) FROM item_daily WHERE " + " AND ".join(where) + " GROUP BY item"
+        with self._connect() as db:
+            return {item: float(qty) for item, qty in db.execute(sql, params)}
+
+
+class TableDailyRollup(RollupStore):
+    """Per (branch, voucher date, table) dine-in totals with a voucher sketch.
+
+    Backs ``/table-spending``: amounts sum across days and order counts come
+    from merging the sketches, so any date range is answered without
+    re-reading the view.
+    """
+
+    name = "tables_daily"
+    table = "table_daily"
+    key_columns = ("branch", "day", "table_code", "table_name")
+    sketched = True
+    schema = """
+        CREATE TABLE IF NOT EXISTS table_daily (
+            branch TEXT NOT NULL,
+            day TEXT NOT NULL,
+            table_code NOT NULL,
+            table_name TEXT NOT NULL,
+            amount REAL NOT NULL,
+            orders INTEGER NOT NULL,
+            lines INTEGER NOT NULL,
+            sketch BLOB NOT NULL,
+            PRIMARY KEY (branch, day, table_code, table_name)
+        );
+        CREATE INDEX IF NOT EXISTS ix_table_daily_day ON table_daily (day);
+    """
+    columns = ("BranchName", "EntryTime", "VoucherNo", "Amount", "VoucherDate", "SaleType", "TableCode", "TableName")
+    partition_column = "VoucherDate"
+    source_filter = "SaleType = 'D'"
+    settle = ItemDailyRollup.settle
+    source_sql = TABLE_SOURCE_SQL
+
+    def load(self, db, fetched):
+        buckets = {}
+        for branch, day, code, table, voucher, amount, lines in fetched:
+            key = (branch or "", as_day(day), "" if code is None else code, table or "")
+            self._add(buckets, key, voucher, amount, int(lines))
+        self._upsert(db, buckets)
+
+    def _aggregate(self, rows):
+        buckets = {}
+        for row in rows:
+            if row["SaleType"] != "D" or row["VoucherDate"] is None:
+                continue
+            code = "" if row["TableCode"] is None else row["TableCode"]
+            key = (row["BranchName"] or "", as_day(row["VoucherDate"]), code, row["TableName"] or "")
+            self._add(buckets, key, row["VoucherNo"], row["Amount"], 1)
+        return buckets
+
+    def merge(self, db, rows):
+        self._upsert(db, self._aggregate(rows))
+
+    def replace_partitions(self, db, partitions, rows):
+        self._replace_sketched(db, partitions, self._aggregate(rows))
+
+    def tables(self, start=None, end=None, branch=None):
+        """``{(code, name): [amount, voucher sketch]}`` for covered days in ``[start, end)``."""
+        window = self._covered(start, end)
+        if window is None:
+            return {}
+        where, params = self._range_where(*window, branch)
+        totals = {}
+        with self._connect() as db:
+            for code, table, amount, sketch in db.execute(
+                    "SELECT table_code, table_name, amount, sketch FROM table_daily WHERE "
+                    + " AND ".join(where), params):
+                slot = totals.get((code, table))
+                if slot is None:
+                    slot = totals[(code, table)] = [0.0, self.sketcher.new()]
+                slot[0] += amount
+                slot[1].merge_blob(sketch)
+        return totals
+
+
+class RollupRefresher:
+    """Incrementally folds new ``vwSaleDetail`` rows into the rollup stores.
+
+    Each run reads the source high-watermark, pulls rows with ``EntryTime``
+    between the stored watermark and the new one in ``chunk``-sized windows,
+    and merges them into every store. Vouchers numbered above the stored
+    ``VoucherNo`` watermark but timed before the stored ``EntryTime`` one
+    arrived late; their (branch, day) partitions are re-aggregated from
+    scratch instead. With ``recheck_days`` set, the last few days are also
+    fingerprinted against the source to pick up edited vouchers.
+
+    A run holds a SQLite write transaction on the rollup file, so several
+    processes can share one file without double-counting.
+    """
+
+    def __init__(self, stores, fetch, chunk=timedelta(hours=6), recheck_days=0):
+        self.stores = [s for s in stores if s is not None]
+        self.fetch = fetch
+        self.chunk = chunk
+        self.recheck_days = recheck_days
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        if not self.stores:
+            return {}
+        started = time.monotonic()
+        source_time, source_voucher = self.fetch("SELECT MAX(EntryTime), MAX(VoucherNo) FROM vwSaleDetail")[0]
+        if source_time is None:
+            return {}
+        new_through = as_datetime(source_time) + timedelta(microseconds=1)
+        db = self.stores[0]._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            summary = {}
+            for store in self.stores:
+                summary[store.name] = self._refresh_store(db, store, new_through, source_voucher)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.last_run = {"at": datetime.now().isoformat(sep=" ", timespec="seconds"),
+                         "seconds": round(time.monotonic() - started, 3),
+                         "through": new_through.isoformat(sep=" "),
+                         "stores": summary}
+        return self.last_run
+
+    def _columns(self, store):
+        cols = list(store.columns)
+        for c in ("BranchName", "EntryTime", "VoucherNo", store.partition_column):
+            if c not in cols:
+                cols.append(c)
+        return cols
+
+    def _select(self, cols, where, params):
+        sql = f"SELECT {', '.join(cols)} FROM vwSaleDetail WHERE {where}"
+        return [dict(zip(cols, r)) for r in self.fetch(sql, params)]
+
+    def _refresh_store(self, db, store, new_through, source_voucher):
+        state = store.state(db)
+        if state is None:
+            return {"skipped": "not built"}
+        lo, through, voucher = state
+        cols = self._columns(store)
+        result = {"rows": 0, "late_partitions": 0, "rechecked_partitions": 0}
+        new_through = max(new_through, through)
+
+        for c_start, c_end in _chunks(through, new_through, self.chunk, align=floor_hour):
+            rows = self._select(cols, "EntryTime >= ? AND EntryTime < ?", [c_start, c_end])
+            store.merge(db, rows)
+            result["rows"] += len(rows)
+
+        dirty = set()
+        if voucher is not None:
+            late = self._select(cols, "VoucherNo > ? AND EntryTime < ? AND EntryTime >= ?", [voucher, through, lo])
+            dirty.update(store.partition_of(r) for r in late)
+            result["late_partitions"] = len(dirty)
+        if self.recheck_days:
+            since = day_start(new_through) - timedelta(days=self.recheck_days)
+            stale = self._stale_partitions(db, store, max(since, day_start(lo)), new_through)
+            result["rechecked_partitions"] = len(stale - dirty)
+            dirty |= stale
+        if dirty:
+            self._rebuild_partitions(db, store, dirty, lo, new_through)
+
+        store.set_state(db, lo, new_through, source_voucher)
+        return result
+
+    def _stale_partitions(self, db, store, since, until):
+        start, stop = since, day_start(until) + timedelta(days=1)
+        if store.partition_column in DATE_COLUMNS:
+            start, stop = start.date(), stop.date()
+        source = {(r[0] or "", as_day(r[1])): (float(r[2]), int(r[3]))
+                  for r in self.fetch(store.fingerprint_sql(), [start, stop, until])}
+        local = store.fingerprints(db, since.date().isoformat())
+        stale = set()
+        for key in source.keys() | local.keys():
+            a, b = source.get(key, (0.0, 0)), local.get(key, (0.0, 0))
+            if abs(a[0] - b[0]) > 0.005 or a[1] != b[1]:
+                stale.add(key)
+        return stale
+
+    def _rebuild_partitions(self, db, store, partitions, lo, until):
+        cols = self._columns(store)
+        col = store.partition_column
+        # NULL branches are partitioned as ''
+        where = (f"(BranchName = ? OR (? = '' AND BranchName IS NULL)) AND {col} >= ? AND {col} < ? "
+                 "AND EntryTime >= ? AND EntryTime < ?")
+        if store.source_filter:
+            where += f" AND {store.source_filter}"
+        for branch, day in sorted(partitions):
+            start = datetime.strptime(day, "%Y-%m-%d")
+            stop = start + timedelta(days=1)
+            if col in DATE_COLUMNS:
+                start, stop = start.date(), stop.date()
+            rows = self._select(cols, where, [branch, branch, start, stop, lo, until])
+            store.replace_partitions(db, [(branch, day)], rows)
+
+    def start(self, interval):
+        """Run :meth:`run_once` every ``interval`` seconds on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.run_once()
+                except sqlite3.OperationalError as e:
+                    # Another process holds the rollup write lock; try again next tick.
+                    print("⚠️ Rollup refresh skipped:", e)
+                except Exception as e:
+                    print("❌ Rollup refresh failed:", e)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="rollup-refresh", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def _chunks(start, end, size, align=None):
+    bounds = []
+    lo = start
+    while lo < end:
+        hi = lo + size
+        if align is not None and align(hi) > lo:
+            hi = align(hi)
+        hi = min(hi, end)
+        bounds.append((lo, hi))
+        lo = hi
+    return bounds
+
+
+def hourly_query(start=None, end=None, branch=None, dialect="mssql"):
+    hour = DIALECTS[dialect]["hour"].format("EntryTime")
+    q = Query(f"""{hour} AS Hour,
+           SUM(COALESCE(Amount, 0)) AS TotalAmount,
+           COUNT(DISTINCT VoucherNo) AS TotalOrders""", uses=["Amount", "VoucherNo"])
+    q.time_range("EntryTime", start, end).branch(branch)
+    return q.group_by(hour, columns=["EntryTime"])
+
+
+def raw_hourly(fetch, start=None, end=None, branch=None, dialect="mssql"):
+    q = hourly_query(start, end, branch, dialect)
+    return {int(r[0]): [float(r[1]), int(r[2])] for r in fetch(q.sql(dialect), q.params)}
+
+
+def _gaps(cov, start, end):
+    """Parts of ``[start, end)`` outside the covered window, as (lo, hi) with None for open ends."""
+    lo, hi = cov
+    gaps = []
+    if start is None or start < lo:
+        gaps.append((start, lo if end is None else min(lo, end)))
+    if end is None or end > hi:
+        gaps.append((hi if start is None else max(hi, start), end))
+    return [(g_lo, g_hi) for g_lo, g_hi in gaps if g_lo is None or g_hi is None or g_lo < g_hi]
+
+
+def hourly_profile(store, fetch, start=None, end=None, branch=None, dialect="mssql"):
+    """Per-hour ``[amount, orders]`` for ``EntryTime`` in ``[start, end)``.
+
+    Covered hours come from the rollup's sketches; the gaps before and
+    after the covered window are aggregated per hour by the source database
+    and their order counts added on. The gaps and the covered window never
+    share an ``EntryTime`` hour, so only a voucher whose lines sit in the
+    same hour of two different days across the boundary is counted twice.
+    """
+    cov = store.coverage() if store is not None else None
+    if cov is None:
+        return raw_hourly(fetch, start, end, branch, store.dialect_name if store is not None else dialect)
+    profile = {hour: [amount, sketch.count()] for hour, (amount, sketch) in store.hourly(start, end, branch).items()}
+    for g_start, g_end in _gaps(cov, start, end):
+        for hour, (amount, orders) in raw_hourly(fetch, g_start, g_end, branch, store.dialect_name).items():
+            slot = profile.setdefault(hour, [0.0, 0])
+            slot[0] += amount
+            slot[1] += orders
+    return profile
+
+
+def item_query(start=None, end=None, branch=None, group=None):
+    """Raw per-item qty for ``VoucherDate`` in ``[start, end)`` (dates)."""
+    q = Query("ItemName, SUM(Qty) AS TotalQty", uses=["ItemName", "Qty"])
+    if group:
+        q.equals("GroupName", group)
+    q.time_range("VoucherDate", start, end).branch(branch)
+    return q.group_by("ItemName")
+
+
+def item_totals(store, fetch, start=None, end=None, branch=None, group=None, dialect="mssql"):
+    """Per-item qty for voucher days in ``[start, end)``, rollup plus raw gaps."""
+    dialect = store.dialect_name if store is not None else dialect
+    cov = store.coverage() if store is not None else None
+    if cov is None:
+        gaps, totals = [(start, end)], {}
+    else:
+        gaps, totals = _gaps(cov, start, end), store.items(start, end, branch, group)
+    for g_start, g_end in gaps:
+        q = item_query(g_start.date() if g_start else None, g_end.date() if g_end else None, branch, group)
+        for item, qty in fetch(q.sql(dialect), q.params):
+            totals[item] = totals.get(item, 0.0) + float(qty or 0)
+    return totals
+
+
+def top_items(store, fetch, start=None, end=None, branch=None, group=None, n=10, dialect="mssql"):
+    """``[(item, qty)]`` by qty descending (name breaks ties); all items when ``n`` is None."""
+    totals = item_totals(store, fetch, start, end, branch, group, dialect)
+    key = lambda kv: (-kv[1], kv[0])
+    if n is None:
+        return sorted(totals.items(), key=key)
+    return heapq.nsmallest(n, totals.items(), key=key)
+
+
+def table_query(start=None, end=None, branch=None):
+    """Dine-in orders and amounts by table for ``VoucherDate`` in ``[start, end)`` (dates)."""
+    q = Query("TableCode, TableName, COUNT(DISTINCT VoucherNo) AS TotalOrders, SUM(Amount) AS TotalAmount",
+              uses=["VoucherNo", "Amount"])
+    q.time_range("VoucherDate", start, end).equals("SaleType", "D").branch(branch)
+    return q.group_by("TableCode", "TableName")
+
+
+def table_totals(store, fetch, start, end, branch=None):
+    """``[(code, name, orders, amount)]`` for voucher days in ``[start, end)``, rollup plus raw gaps.
+
+    A voucher has one ``VoucherDate``, so the per-table counts the source
+    database returns for the gap days add exactly to the rollup's.
+    """
+    totals = {key: [amount, sketch.count()] for key, (amount, sketch) in store.tables(start, end, branch).items()}
+    for g_start, g_end in _gaps(store.coverage(), start, end):
+        q = table_query(g_start.date() if g_start else None, g_end.date() if g_end else None, branch)
+        for code, table, orders, amount in fetch(q.sql(store.dialect_name), q.params):
+            slot = totals.setdefault(("" if code is None else code, table or ""), [0.0, 0])
+            slot[0] += float(amount or 0)
+            slot[1] += int(orders)
+    return [(None if code == "" else code, table or None, orders, amount)
+            for (code, table), (amount, orders) in totals.items()]
@@ -0,0 +1,76 @@
+# scheduler.py
+import heapq
+import os
+import random
+import threading
+import time
+
+
+class Scheduler:
+    """Runs periodic jobs on one daemon thread, each on its own jittered clock.
+
+    A job first runs within ``startup_spread`` seconds of :meth:`start`, then
+    every ``interval`` seconds give or take ``jitter`` (a fraction of it), so
+    jobs with the same cadence, and the same job in several workers, drift
+    apart instead of hitting the database together. Jobs run one at a time;
+    a failing job is logged and keeps its schedule.
+    """
+
+    def __init__(self, jitter=0.2, startup_spread=10.0):
+        self.jitter = jitter
+        self.startup_spread = startup_spread
+        self._jobs = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, prefix="WARM_"):
+        env = os.environ
+        return cls(jitter=float(env.get(prefix + "JITTER", 0.2)),
+                   startup_spread=float(env.get(prefix + "STARTUP_SPREAD", 10)))
+
+    def add(self, name, fn, interval):
+        self._jobs[name] = {"fn": fn, "interval": interval, "runs": 0, "errors": 0, "last_run": None,
+                            "last_seconds": None}
+
+    def delay(self, interval):
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def run(self, name):
+        job = self._jobs[name]
+        started = time.perf_counter()
+        try:
+            job["fn"]()
+        except Exception as e:
+            print(f"❌ Scheduled job {name} failed:", e)
+            job["errors"] += 1
+        job["runs"] += 1
+        job["last_run"] = time.time()
+        job["last_seconds"] = round(time.perf_counter() - started, 3)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        now = time.monotonic()
+        queue = [(now + random.uniform(0, self.startup_spread), name) for name in self._jobs]
+        heapq.heapify(queue)
+
+        def loop():
+            while queue:
+                due, name = queue[0]
+                if self._stop.wait(max(0.0, due - time.monotonic())):
+                    return
+                heapq.heappop(queue)
+                self.run(name)
+                heapq.heappush(queue, (time.monotonic() + self.delay(self._jobs[name]["interval"]), name))
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="scheduler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {name: {k: v for k, v in job.items() if k != "fn"} for name, job in self._jobs.items()}
@@ -0,0 +1,64 @@
+# single_flight.py
+import threading
+
+
+class Abandoned(Exception):
+    """Raised by a call whose work was given up for its own caller's sake.
+
+    Waiters do not share it; one of them runs the call again instead.
+    """
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight block and get the same result (or the same exception, unless it
+    is :class:`Abandoned`). Nothing is kept once the call finishes, so this
+    never serves stale data.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {"executions": 0, "shared": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters["executions"] += 1
+            else:
+                self._counters["shared"] += 1
+        if not leader:
+            call.done.wait()
+            if isinstance(call.error, Abandoned):
+                return self.do(key, fn)
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), **self._counters}
@@ -0,0 +1,180 @@
+# sketches.py
+"""Mergeable distinct-count sketches for ``COUNT(DISTINCT VoucherNo)``.
+
+Two kinds, chosen with ``SKETCH_KIND``:
+
+``exact`` (default)
+    The sorted voucher numbers, delta/varint encoded. Merging is a set
+    union and counts are exact. Size grows with the number of vouchers,
+    a few bytes each.
+
+``hll``
+    HyperLogLog with ``2**SKETCH_HLL_PRECISION`` registers (default 12,
+    i.e. 4096). The relative standard error is ``1.04 / sqrt(2**p)``:
+    1.6% at p=12 and 0.8% at p=14, so about 99.7% of estimates fall
+    within three times that (4.9% at p=12). Counts below ``2.5 * 2**p``
+    use linear counting and are usually exact for a few hundred vouchers.
+    Sketches are stored sparsely until they fill up, so an hour with a
+    dozen vouchers costs ~40 bytes either way.
+
+Sketches of different kinds or precisions cannot be merged; rollup stores
+record the spec they were built with and rebuild when it changes.
+"""
+import hashlib
+import math
+import os
+
+_EXACT, _HLL_SPARSE, _HLL_DENSE = 0, 1, 2
+
+
+def _varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varints(data, pos):
+    n = shift = 0
+    for b in data[pos:]:
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            yield n
+            n = shift = 0
+        else:
+            shift += 7
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class ExactSet:
+    """Exact distinct set of integer voucher numbers."""
+
+    def __init__(self):
+        self.values = set()
+
+    def add(self, value):
+        self.values.add(int(value))
+
+    def merge(self, other):
+        self.values |= other.values
+
+    def merge_blob(self, blob):
+        if blob[0] != _EXACT:
+            raise ValueError("Cannot merge sketches of different kinds")
+        prev, first = 0, True
+        for delta in _read_varints(blob, 1):
+            if first:
+                # First value is zigzag-encoded so negative numbers survive
+                prev, first = (delta >> 1) ^ -(delta & 1), False
+            else:
+                prev += delta
+            self.values.add(prev)
+
+    def count(self):
+        return len(self.values)
+
+    def to_bytes(self):
+        out = bytearray([_EXACT])
+        prev = None
+        for v in sorted(self.values):
+            _varint((v << 1) ^ (v >> 63) if prev is None else v - prev, out)
+            prev = v
+        return bytes(out)
+
+
+class HyperLogLog:
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = {}
+
+    def add(self, value):
+        h = _hash64(value)
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers.get(idx, 0):
+            self.registers[idx] = rank
+
+    def _merge_register(self, idx, rank):
+        if rank > self.registers.get(idx, 0):
+            self.registers[idx] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        for idx, rank in other.registers.items():
+            self._merge_register(idx, rank)
+
+    def merge_blob(self, blob):
+        if blob[0] not in (_HLL_SPARSE, _HLL_DENSE) or blob[1] != self.p:
+            raise ValueError("Cannot merge sketches of different kinds")
+        if blob[0] == _HLL_DENSE:
+            for idx, rank in enumerate(blob[2:]):
+                if rank:
+                    self._merge_register(idx, rank)
+        else:
+            for i in range(2, len(blob), 3):
+                self._merge_register(int.from_bytes(blob[i:i + 2], "big"), blob[i + 2])
+
+    def count(self):
+        m = self.m
+        zeros = m - len(self.registers)
+        if zeros == m:
+            return 0
+        alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        total = zeros + sum(2.0 ** -r for r in self.registers.values())
+        estimate = alpha * m * m / total
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        if 3 * len(self.registers) < self.m:
+            out = bytearray([_HLL_SPARSE, self.p])
+            for idx in sorted(self.registers):
+                out += idx.to_bytes(2, "big")
+                out.append(self.registers[idx])
+            return bytes(out)
+        dense = bytearray(self.m)
+        for idx, rank in self.registers.items():
+            dense[idx] = rank
+        return bytes([_HLL_DENSE, self.p]) + bytes(dense)
+
+
+class Sketcher:
+    """Makes and decodes sketches of one configured kind."""
+
+    def __init__(self, kind="exact", precision=12):
+        if kind not in ("exact", "hll"):
+            raise ValueError(f"Unknown sketch kind: {kind}")
+        self.kind = kind
+        self.precision = precision
+        if kind == "hll":
+            HyperLogLog(precision)
+
+    @classmethod
+    def from_env(cls, prefix="SKETCH_"):
+        return cls(os.environ.get(prefix + "KIND", "exact"), int(os.environ.get(prefix + "HLL_PRECISION", 12)))
+
+    @property
+    def spec(self):
+        return self.kind if self.kind == "exact" else f"hll{self.precision}"
+
+    @property
+    def relative_error(self):
+        """Relative standard error of a count (0 for exact sketches)."""
+        return 0.0 if self.kind == "exact" else round(1.04 / math.sqrt(1 << self.precision), 4)
+
+    def new(self):
+        return ExactSet() if self.kind == "exact" else HyperLogLog(self.precision)
+
+    def loads(self, blob):
+        sketch = self.new()
+        sketch.merge_blob(blob)
+        return sketch
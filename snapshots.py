@@ -0,0 +1,193 @@
+# snapshots.py
+"""Parquet snapshots of ``vwSaleDetail`` for offline analytics.
+
+One file per branch per business day, in a hive layout::
+
+    <root>/VoucherDate=2024-01-31/BranchName=Main%20Hall/part-0.parquet
+
+The partition values live only in the path; each file holds the remaining
+columns, sorted by ``EntryTime``. Serve the routes from the directory with
+``DB_BACKEND=duckdb DB_PATH=<root>``: DuckDB prunes whole files on the
+``VoucherDate``/``BranchName`` filters, skips row groups on ``EntryTime``
+and decodes only the columns a query names, so a year-long /top-items reads
+the item, group, qty and amount columns of the matching partitions and
+nothing else.
+
+Exports are incremental. ``_manifest.json`` keeps a fingerprint per
+partition (lines, amount, qty, last voucher); a run fingerprints the source
+days and rewrites only partitions that are new or differ, and deletes those
+that vanished. Files are replaced atomically, so readers never see a
+partial partition. Needs pyarrow.
+"""
+import json
+import os
+import urllib.parse
+from datetime import date, timedelta
+
+from rollups import as_datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+MANIFEST = "_manifest.json"
+MANIFEST_VERSION = 1
+
+# Hive partition columns and their DuckDB types; they are not stored in the files
+PARTITION_TYPES = {"VoucherDate": "DATE", "BranchName": "VARCHAR"}
+# (name, Arrow type) of the stored columns
+SNAPSHOT_COLUMNS = [
+    ("VoucherNo", "int64"),
+    ("EntryTime", "timestamp[us]"),
+    ("SaleType", "string"),
+    ("TableCode", "string"),
+    ("TableName", "string"),
+    ("ItemName", "string"),
+    ("GroupName", "string"),
+    ("Qty", "float64"),
+    ("Amount", "float64"),
+]
+
+FINGERPRINT_SQL = """
+    SELECT BranchName, VoucherDate, COUNT(*) AS TotalLines, SUM(COALESCE(Amount, 0)) AS TotalAmount,
+           SUM(COALESCE(Qty, 0)) AS TotalQty, MAX(VoucherNo) AS LastVoucher
+    FROM vwSaleDetail
+    WHERE VoucherDate >= ? AND VoucherDate < ?
+    GROUP BY BranchName, VoucherDate
+"""
+
+EXPORT_SQL = f"""
+    SELECT BranchName, VoucherDate, {", ".join(name for name, _ in SNAPSHOT_COLUMNS)}
+    FROM vwSaleDetail
+    WHERE VoucherDate >= ? AND VoucherDate < ?
+"""
+
+# pyodbc returns DECIMAL columns as Decimal, which Arrow will not take as a double
+CASTS = {"int64": int, "float64": float}
+
+# DuckDB's own writer spells a NULL partition value this way
+NULL_PARTITION = "NULL"
+
+
+def parquet_available():
+    return pq is not None
+
+
+def as_date(value):
+    return value if type(value) is date else as_datetime(value).date()
+
+
+def _fingerprint(lines, amount, qty, voucher):
+    return [int(lines), round(float(amount or 0), 2), round(float(qty or 0), 3),
+            None if voucher is None else int(voucher)]
+
+
+class SnapshotExporter:
+    def __init__(self, root, fetch, chunk_days=7, row_group_size=64 * 1024):
+        self.root = root
+        self.fetch = fetch
+        self.chunk = timedelta(days=chunk_days)
+        self.row_group_size = row_group_size
+
+    @classmethod
+    def from_env(cls, fetch, name="SNAPSHOT_DIR", default="snapshots"):
+        path = os.environ.get(name, default)
+        if not path:
+            return None
+        return cls(path, fetch, int(os.environ.get("SNAPSHOT_CHUNK_DAYS", 7)))
+
+    def partition_path(self, day, branch):
+        value = NULL_PARTITION if branch is None else urllib.parse.quote(branch, safe=" ")
+        return os.path.join(self.root, f"VoucherDate={day}", f"BranchName={value}", "part-0.parquet")
+
+    def load_manifest(self):
+        """``{(day, branch): fingerprint}`` of what is on disk; empty after a layout change."""
+        try:
+            with open(os.path.join(self.root, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        layout = [MANIFEST_VERSION, [list(c) for c in SNAPSHOT_COLUMNS]]
+        if [manifest.get("version"), manifest.get("columns")] != layout:
+            return {}
+        return {(day, branch): fp for day, branch, fp in manifest["partitions"]}
+
+    def _save_manifest(self, partitions):
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "columns": SNAPSHOT_COLUMNS,
+                       "partitions": [[day, branch, fp] for (day, branch), fp in partitions.items()]}, f)
+        os.replace(path + ".tmp", path)
+
+    def coverage(self):
+        days = [day for day, _ in self.load_manifest()]
+        return (min(days), max(days)) if days else (None, None)
+
+    def _write(self, day, branch, rows):
+        rows.sort(key=lambda r: (r[3] is None, r[3] or 0))
+        columns = list(zip(*rows))[2:] if rows else [()] * len(SNAPSHOT_COLUMNS)
+        arrays = {}
+        for (name, kind), values in zip(SNAPSHOT_COLUMNS, columns):
+            cast = CASTS.get(kind)
+            if cast is not None:
+                values = [None if v is None else cast(v) for v in values]
+            arrays[name] = pa.array(values, type=pa.type_for_alias(kind))
+        table = pa.table(arrays)
+        path = self.partition_path(day, branch)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path + ".tmp", row_group_size=self.row_group_size, compression="zstd")
+        os.replace(path + ".tmp", path)
+
+    def _remove(self, day, branch):
+        path = self.partition_path(day, branch)
+        try:
+            os.remove(path)
+            os.removedirs(os.path.dirname(path))
+        except OSError:
+            pass
+
+    def _rows(self, lo, hi, wanted):
+        """Source rows of the ``wanted`` partitions between ``lo`` and ``hi``, grouped by partition."""
+        parts = {key: [] for key in wanted}
+        for r in self.fetch(EXPORT_SQL, [lo, hi]):
+            rows = parts.get((as_date(r[1]).isoformat(), r[0]))
+            if rows is not None:
+                entered = r[3]
+                rows.append(tuple(r[:3]) + (None if entered is None else as_datetime(entered),) + tuple(r[4:]))
+        return parts
+
+    def export(self, since, through=None):
+        """Bring the partitions for days ``[since, through)`` in line with the source."""
+        if pq is None:
+            raise RuntimeError("pyarrow is not installed; it is needed to write Parquet snapshots")
+        since = as_date(since)
+        through = as_date(through) if through else date.today() + timedelta(days=1)
+        os.makedirs(self.root, exist_ok=True)
+        partitions = self.load_manifest()
+        result = {"written": 0, "unchanged": 0, "removed": 0, "rows": 0}
+        lo = since
+        while lo < through:
+            hi = min(lo + self.chunk, through)
+            current = {(as_date(d).isoformat(), b): _fingerprint(*fp)
+                       for b, d, *fp in self.fetch(FINGERPRINT_SQL, [lo, hi])}
+            old = {key for key in partitions if lo.isoformat() <= key[0] < hi.isoformat()}
+            changed = {key for key, fp in current.items() if partitions.get(key) != fp}
+            if changed:
+                first = date.fromisoformat(min(day for day, _ in changed))
+                last = date.fromisoformat(max(day for day, _ in changed))
+                for (day, branch), rows in self._rows(first, last + timedelta(days=1), changed).items():
+                    self._write(day, branch, rows)
+                    partitions[day, branch] = current[day, branch]
+                    result["rows"] += len(rows)
+            for day, branch in old - current.keys():
+                self._remove(day, branch)
+                del partitions[day, branch]
+            result["written"] += len(changed)
+            result["unchanged"] += len(current) - len(changed)
+            result["removed"] += len(old - current.keys())
+            # Saved per chunk, so an interrupted export resumes where it stopped
+            self._save_manifest(partitions)
+            lo = hi
+        return result
@@ -0,0 +1,626 @@
+    let currentTableData = [];
+    let filteredData = [];
+    // Panels fetched in one /dashboard round trip on page load; each is used once.
+    let preloadedPanels = {};
+    // Dashboard panel and loader behind each section that fills itself in
+    const SECTION_PANELS = {
+      'avg-spending': ['avg_spending', loadAvgSpending],
+      'peak-time': ['peak_times', loadPeakTimes],
+    };
+
+    function takePreloadedPanel(name) {
+      const panel = preloadedPanels[name];
+      delete preloadedPanels[name];
+      return panel && panel.ok ? panel : null;
+    }
+
+    function takePreloaded(name) {
+      const panel = takePreloadedPanel(name);
+      return panel ? Promise.resolve(panel.data) : null;
+    }
+
+    // Preload only the sections on screen; hidden ones fetch when first opened.
+    function loadDashboard() {
+      const visible = Object.keys(SECTION_PANELS)
+        .filter(id => !document.getElementById(id).classList.contains('d-none'));
+      if (!visible.length) {
+        return Promise.resolve();
+      }
+      const panels = visible.map(id => SECTION_PANELS[id][0]);
+      return fetch(`/dashboard?panels=${panels.join(',')}&limit=${PAGE_SIZE}`)
+        .then(response => response.json())
+        .then(doc => { preloadedPanels = doc.panels || {}; })
+        .catch(() => { preloadedPanels = {}; })
+        .then(() => visible.forEach(id => SECTION_PANELS[id][1]()));
+    }
+
+    // Toggle sidebar for mobile
+    function toggleSidebar() {
+      const sidebar = document.getElementById('sidebar');
+      const overlay = document.getElementById('sidebarOverlay');
+      const mainContent = document.getElementById('mainContent');
+
+      sidebar.classList.toggle('show');
+      overlay.classList.toggle('show');
+
+      if (window.innerWidth > 1024) {
+        sidebar.classList.toggle('collapsed');
+        mainContent.classList.toggle('expanded');
+      }
+    }
+
+    // Show section
+    function showSection(sectionId) {
+      // Hide all sections
+      document.querySelectorAll('.section').forEach(section => {
+        section.classList.add('d-none');
+      });
+
+      // Show selected section
+      document.getElementById(sectionId).classList.remove('d-none');
+
+      // Update active nav item
+      document.querySelectorAll('.sidebar-nav a').forEach(link => {
+        link.classList.remove('active');
+      });
+      event.target.classList.add('active');
+
+      // Close sidebar on mobile after selection
+      if (window.innerWidth <= 11024) {
+        toggleSidebar();
+      }
+
+      // Load data for specific sections
+      if (sectionId === 'avg-spending') {
+        loadAvgSpending();
+      } else if (sectionId === 'peak-time') {
+        loadPeakTimes();
+      }
+    }
+
+    // Load top items
+function loadTopItems() {
+  const start = document.getElementById('start').value;
+  const end = document.getElementById('end').value;
+  const branch = document.getElementById('branch').value;
+
+  // 🛑 Enforce both or none logic
+  if ((start && !end) || (!start && end)) {
+    alert('⚠️ Please select both Start and End dates.');
+    return;
+  }
+
+  // ✅ At least require both dates
+  if (!start || !end) {
+    alert('⚠️ Date range is required.');
+    return;
+  }
+
+  const url = `/top-items?start=${start}&end=${end}&branch=${encodeURIComponent(branch)}`;
+  loadPagedTable('top-selling-output', url, ['ItemName', 'TotalQty']);
+}
+
+
+    // Load average spending
+    function loadAvgSpending() {
+      loadPagedTable('avg-output', '/avg-spending', ['Branch', 'Table', 'AvgAmount'], takePreloadedPanel('avg_spending'));
+    }
+
+    // Load peak times
+    function loadPeakTimes() {
+      const output = document.getElementById('peak-output');
+      output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
+
+      (takePreloaded('peak_times') || fetch('/peak-times').then(response => response.json()))
+        .then(data => {
+          renderPeakStats(data, 'peak-output');
+        })
+        .catch(error => {
+          output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
+        });
+    }
+
+    // Load peak by date
+    function loadPeakDate() {
+      const date = document.getElementById('peak-date-input').value;
+      if (!date) {
+        alert('Please select a date');
+        return;
+      }
+
+      const output = document.getElementById('peak-date-output');
+      output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
+
+      fetch(`/peak-by-date?date=${date}`)
+        .then(response => response.json())
+        .then(data => {
+          // The hourly profile ships with the peaks, so the chart needs no second request
+          filteredData = data.profile || [];
+          renderPeakStats(data, 'peak-date-output');
+        })
+        .catch(error => {
+          output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
+        });
+    }
+
+    // Load table spending
+  function loadTableSpending() {
+  const start = document.getElementById('ts-start').value;
+  const end = document.getElementById('ts-end').value;
+  const branch = document.getElementById('ts-branch').value;
+
+  if (!start || !end) {
+    alert('Please select start and end dates');
+    return;
+  }
+
+  loadPagedTable('table-spending-output', `/table-spending?start=${start}&end=${end}&branch=${encodeURIComponent(branch)}`,
+                 ['TableCode', 'TableName', 'TotalOrders', 'TotalSpending', 'AvgSpending']);
+}
+
+
+    // Render table with search functionality
+    function renderTable(containerId, data, columns, options = {}) {
+      const container = document.getElementById(containerId);
+      const paged = !!options.paged;
+
+      if (!paged && (!data || data.length === 0)) {
+        container.innerHTML = '<div class="no-data"><i class="fas fa-inbox"></i><p>No data found</p></div>';
+        return;
+      }
+
+      // Create search bar
+      const searchId = `search-${containerId}`;
+      const tableId = `table-${containerId}`;
+      const total = paged ? options.total : data.length;
+      const onSearch = paged
+        ? `searchPagedTable('${containerId}', this.value)`
+        : `filterTable('${searchId}', '${tableId}', '${containerId}')`;
+
+      let html = `
+        <div class="search-container">
+          <i class="fas fa-search search-icon"></i>
+          <input type="text" 
+                 id="${searchId}" 
+                 class="form-control search-input" 
+                 placeholder="Search in results..." 
+                 onkeyup="${onSearch}">
+        </div>
+        <div class="table-container">
+          <div class="table-responsive">
+            <table class="table table-hover" id="${tableId}">
+              <thead>
+                <tr>
+                  <th><i class="fas fa-hashtag me-1"></i>#</th>
+      `;
+
+      // Add column headers (server-sorted when paged)
+      columns.forEach(col => {
+        let icon = getColumnIcon(col);
+        const sortable = paged ? ` style="cursor:pointer" onclick="sortPagedTable('${containerId}', '${col}')"` : '';
+        html += `<th${sortable}><i class="${icon} me-1"></i>${formatColumnName(col)}</th>`;
+      });
+      html += '</tr></thead><tbody>';
+
+      // Add data rows
+      html += data.map((row, index) => tableRowHtml(row, columns, index)).join('');
+
+      html += '</tbody></table></div>';
+      if (paged) {
+        html += `<div id="sentinel-${containerId}" style="height:1px"></div>`;
+      }
+      html += `<div class="records-info">
+                 <span><i class="fas fa-info-circle me-1"></i>Showing <span id="showing-${containerId}">${data.length}</span> of <span id="total-${containerId}">${total}</span> records</span>
+                 <span><i class="fas fa-database me-1"></i>Total Records: <span id="count-${containerId}">${total}</span></span>
+               </div>`;
+      html += '</div>';
+
+      container.innerHTML = html;
+
+      // Store original data for filtering
+      window[`originalData_${containerId}`] = data;
+    }
+
+    function tableRowHtml(row, columns, index) {
+      let html = `<tr><td><span class="badge bg-primary">${index + 1}</span></td>`;
+      columns.forEach(col => {
+        let value = row[col];
+        if (col.includes('Amount') || col.includes('Avg')) {
+          value = `<span class="fw-bold text-success">Rs. ${Number(value).toLocaleString()}</span>`;
+        } else if (col.includes('Date')) {
+          value = `<span class="text-muted">${value}</span>`;
+        } else if (col.includes('Qty')) {
+          value = `<span class="badge bg-info">${value}</span>`;
+        }
+        html += `<td>${value}</td>`;
+      });
+      return html + '</tr>';
+    }
+
+    // Server-paged tables: search, sort and "load more" on scroll go back to the API
+    const PAGE_SIZE = 50;
+    const pagedTables = {};
+
+    function loadPagedTable(containerId, url, columns, firstPage) {
+      pagedTables[containerId] = { url, columns, q: '', sort: '', next: null, rows: [], total: 0, loading: false, timer: null };
+      if (firstPage) {
+        applyPage(containerId, firstPage.data, firstPage.next, firstPage.total, true);
+        return;
+      }
+      document.getElementById(containerId).innerHTML = '<div class="loading"><div class="spinner"></div></div>';
+      fetchPage(containerId, true);
+    }
+
+    function fetchPage(containerId, reset) {
+      const state = pagedTables[containerId];
+      if (!state || state.loading || (!reset && !state.next)) return;
+      state.loading = true;
+      const params = new URLSearchParams({ limit: PAGE_SIZE });
+      if (state.q) params.set('q', state.q);
+      if (state.sort) params.set('sort', state.sort);
+      if (!reset) params.set('after', state.next);
+      const sep = state.url.includes('?') ? '&' : '?';
+      fetch(`${state.url}${sep}${params}`)
+        .then(response => {
+          if (!response.ok) throw new Error(response.statusText);
+          return response.json().then(data => [response, data]);
+        })
+        .then(([response, data]) => {
+          state.loading = false;
+          const total = Number(response.headers.get('X-Total-Count') || data.length);
+          applyPage(containerId, data, response.headers.get('X-Next-Cursor'), total, reset);
+        })
+        .catch(error => {
+          state.loading = false;
+          document.getElementById(containerId).innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
+        });
+    }
+
+    function applyPage(containerId, rows, next, total, reset) {
+      const state = pagedTables[containerId];
+      const offset = reset ? 0 : state.rows.length;
+      state.rows = reset ? rows.slice() : state.rows.concat(rows);
+      state.next = next;
+      state.total = total;
+      const tbody = document.querySelector(`#table-${containerId} tbody`);
+      if (reset && !tbody) {
+        renderTable(containerId, state.rows, state.columns, { paged: true, total });
+        observePagedTable(containerId);
+      } else {
+        const html = rows.map((row, i) => tableRowHtml(row, state.columns, offset + i)).join('');
+        if (reset) tbody.innerHTML = html; else tbody.insertAdjacentHTML('beforeend', html);
+      }
+      document.getElementById(`showing-${containerId}`).textContent = state.rows.length;
+      document.getElementById(`total-${containerId}`).textContent = total;
+      document.getElementById(`count-${containerId}`).textContent = total;
+      currentTableData = state.rows;
+      filteredData = [...state.rows];
+    }
+
+    function observePagedTable(containerId) {
+      const sentinel = document.getElementById(`sentinel-${containerId}`);
+      if (!sentinel || !('IntersectionObserver' in window)) return;
+      new IntersectionObserver(entries => {
+        if (entries.some(e => e.isIntersecting)) fetchPage(containerId, false);
+      }).observe(sentinel);
+    }
+
+    function searchPagedTable(containerId, value) {
+      const state = pagedTables[containerId];
+      clearTimeout(state.timer);
+      state.timer = setTimeout(() => {
+        if (state.q === value.trim()) return;
+        state.q = value.trim();
+        fetchPage(containerId, true);
+      }, 250);
+    }
+
+    function sortPagedTable(containerId, column) {
+      const state = pagedTables[containerId];
+      state.sort = state.sort === column ? `-${column}` : column;
+      fetchPage(containerId, true);
+    }
+
+    // Filter table based on search input
+    function filterTable(searchId, tableId, containerId) {
+      const searchInput = document.getElementById(searchId);
+      const table = document.getElementById(tableId);
+      const searchTerm = searchInput.value.toLowerCase();
+      const tbody = table.getElementsByTagName('tbody')[0];
+      const rows = tbody.getElementsByTagName('tr');
+
+      let visibleCount = 0;
+
+      for (let i = 0; i < rows.length; i++) {
+        let row = rows[i];
+        let text = row.textContent || row.innerText;
+
+        if (text.toLowerCase().indexOf(searchTerm) > -1) {
+          row.style.display = '';
+          visibleCount++;
+          // Update row number
+          row.cells[0].innerHTML = `<span class="badge bg-primary">${visibleCount}</span>`;
+        } else {
+          row.style.display = 'none';
+        }
+      }
+
+      // Update records info
+      const showingElement = document.getElementById(`showing-${containerId}`);
+      if (showingElement) {
+        showingElement.textContent = visibleCount;
+      }
+    }
+
+    // Render peak statistics
+    function renderPeakStats(data, containerId) {
+      const container = document.getElementById(containerId);
+
+      const html = `
+        <div class="row">
+          <div class="col-md-6 mb-3">
+            <div class="stats-card">
+              <div class="icon">
+                <i class="fas fa-money-bill-wave"></i>
+              </div>
+              <h3>Rs. ${Number(data.peak_amount.amount).toLocaleString()}</h3>
+              <p>Peak Revenue Hour</p>
+              <div class="mt-2">
+                <span class="badge bg-success fs-6">${data.peak_amount.hour}</span>
+              </div>
+            </div>
+          </div>
+          <div class="col-md-6 mb-3">
+            <div class="stats-card">
+              <div class="icon">
+                <i class="fas fa-shopping-cart"></i>
+              </div>
+              <h3>${data.peak_orders.orders}</h3>
+              <p>Peak Orders Hour</p>
+              <div class="mt-2">
+                <span class="badge bg-info fs-6">${data.peak_orders.hour}</span>
+              </div>
+            </div>
+          </div>
+        </div>
+      `;
+
+      container.innerHTML = html;
+    }
+
+    // Get appropriate icon for column
+    function getColumnIcon(columnName) {
+      const icons = {
+        'ItemName': 'fas fa-box',
+        'TotalQty': 'fas fa-chart-bar',
+        'Branch': 'fas fa-building',
+        'Table': 'fas fa-chair',
+        'AvgAmount': 'fas fa-calculator',
+        'Date': 'fas fa-calendar',
+        'Type': 'fas fa-tag',
+        'TypeName': 'fas fa-tags',
+        'Amount': 'fas fa-dollar-sign',
+        'TableCode': 'fas fa-hashtag',
+        'TotalOrders': 'fas fa-receipt',
+        'TotalSpending': 'fas fa-wallet',
+        'AvgSpending': 'fas fa-balance-scale'
+
+      };
+      return icons[columnName] || 'fas fa-circle';
+    }
+
+    // Format column name for display
+    function formatColumnName(columnName) {
+      const names = {
+        'ItemName': 'Item Name',
+        'TotalQty': 'Total Quantity',
+        'AvgAmount': 'Average Amount',
+        'TypeName': 'Sale Type'
+      };
+      return names[columnName] || columnName;
+    }
+
+    // Handle window resize
+    window.addEventListener('resize', function() {
+      const sidebar = document.getElementById('sidebar');
+      const overlay = document.getElementById('sidebarOverlay');
+
+      if (window.innerWidth > 1024) {
+        sidebar.classList.remove('show');
+        overlay.classList.remove('show');
+      }
+    });
+
+    // Fill the branch dropdowns from /branches, keeping "All" and any current choice
+    function loadBranches() {
+      return fetch('/branches')
+        .then(response => response.json())
+        .then(branches => {
+          if (!Array.isArray(branches)) return;
+          ['branch', 'pb-branch', 'ts-branch'].forEach(id => {
+            const select = document.getElementById(id);
+            const selected = select.value;
+            select.innerHTML = '<option value="All">All</option>';
+            branches.forEach(name => select.add(new Option(name, name)));
+            select.value = branches.includes(selected) ? selected : 'All';
+          });
+        })
+        .catch(error => console.error('Error loading branches:', error));
+    }
+
+    // Initialize page
+    window.addEventListener('DOMContentLoaded', function() {
+      // Set default dates
+      const today = new Date();
+      const oneWeekAgo = new Date(today.getTime() - 7 * 24 * 60 * 60 * 1000);
+
+      document.getElementById('start').value = oneWeekAgo.toISOString().split('T')[0];
+      document.getElementById('end').value = today.toISOString().split('T')[0];
+      document.getElementById('peak-date-input').value = today.toISOString().split('T')[0];
+      document.getElementById('ts-start').value = oneWeekAgo.toISOString().split('T')[0];
+      document.getElementById('ts-end').value = today.toISOString().split('T')[0];
+    });
+window.addEventListener('DOMContentLoaded', () => {
+  // Top Selling
+  document.getElementById('start').value = '';
+  document.getElementById('end').value = '';
+
+  // Peak by Date
+  document.getElementById('peak-date-input').value = '';
+
+  // Table Spending
+  document.getElementById('ts-start').value = '';
+  document.getElementById('ts-end').value = '';
+
+  loadBranches();
+  loadDashboard();
+});
+  let tableChart = null;
+  function renderSpendingChart() {
+  if (!filteredData || filteredData.length === 0) {
+    alert('Please get data first before showing chart.');
+    return;
+  }
+
+  // Show popup modal
+  const modal = document.getElementById('tableChartModal');
+  modal.style.display = 'flex';
+
+  const ctx = document.getElementById('tableSpendingChart').getContext('2d');
+  if (window.tableChart) window.tableChart.destroy();
+
+  const labels = filteredData.map(row => row.TableName || row.TableCode);
+  const spending = filteredData.map(row => row.TotalSpending);
+
+  window.tableChart = new Chart(ctx, {
+    type: 'bar',
+    data: {
+      labels,
+      datasets: [{
+        label: 'Total Spending (Rs.)',
+        data: spending,
+        backgroundColor: 'rgba(102, 126, 234, 0.6)',
+        borderColor: 'rgba(102, 126, 234, 1)',
+        borderWidth: 1
+      }]
+    },
+    options: {
+      responsive: true,
+      plugins: {
+        title: {
+          display: true,
+          text: 'Total Spending per Table',
+          font: { size: 18 }
+        },
+        tooltip: {
+          callbacks: {
+            label: ctx => `Rs. ${Number(ctx.raw).toLocaleString()}`
+          }
+        }
+      },
+      scales: {
+        y: {
+          beginAtZero: true,
+          ticks: {
+            callback: value => `Rs. ${value}`
+          },
+          title: {
+            display: true,
+            text: 'Total Spending (Rs.)'
+          }
+        },
+        x: {
+          title: {
+            display: true,
+            text: 'Table'
+          }
+        }
+      }
+    }
+  });
+}
+function closeTableChartPopup() {
+  document.getElementById('tableChartModal').style.display = 'none';
+}
+
+
+  function loadPeakByDateRange() {
+  const start = document.getElementById('pb-start').value;
+  const end = document.getElementById('pb-end').value;
+  const branch = document.getElementById('pb-branch').value;
+  const output = document.getElementById('peak-date-output');
+
+  if (!start || !end) {
+    alert('Please select both Start and End dates.');
+    return;
+  }
+
+  output.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
+
+  fetch(`/peak-by-date-range?start=${start}&end=${end}&branch=${encodeURIComponent(branch)}`)
+    .then(response => response.json())
+    .then(data => {
+      currentTableData = data;
+      filteredData = [...data];
+      renderTable('peak-date-output', data, ['HourRange', 'TotalAmount', 'TotalOrders']);
+    })
+    .catch(error => {
+      output.innerHTML = '<div class="no-data"><i class="fas fa-exclamation-triangle"></i><p>Error loading data</p></div>';
+    });
+}
+
+function showPeakChartPopup() {
+  if (!filteredData || filteredData.length === 0) {
+    alert('Please analyze data first.');
+    return;
+  }
+
+  const modal = document.getElementById('peakChartModal');
+  modal.style.display = 'flex';
+
+  const ctx = document.getElementById('peakChartCanvas').getContext('2d');
+  if (window.peakChart) window.peakChart.destroy();
+
+  const labels = filteredData.map(r => r.HourRange);
+  const amounts = filteredData.map(r => r.TotalAmount);
+
+  window.peakChart = new Chart(ctx, {
+    type: 'bar',
+    data: {
+      labels,
+      datasets: [{
+        label: 'Total Amount (Rs.)',
+        data: amounts,
+        backgroundColor: 'rgba(245, 87, 108, 0.6)',
+        borderColor: 'rgba(245, 87, 108, 1)',
+        borderWidth: 1
+      }]
+    },
+    options: {
+      responsive: true,
+      plugins: {
+        title: {
+          display: true,
+          text: 'Total Sale by Hour',
+          font: { size: 18 }
+        },
+        tooltip: {
+          callbacks: {
+            label: ctx => `Rs. ${Number(ctx.raw).toLocaleString()}`
+          }
+        }
+      },
+      scales: {
+        y: {
+          beginAtZero: true,
+          ticks: { callback: val => `Rs. ${val}` },
+          title: { display: true, text: 'Total Sale (Rs.)' }
+        }
+      }
+    }
+  });
+}
+
+function closePeakChartPopup() {
+  document.getElementById('peakChartModal').style.display = 'none';
+}
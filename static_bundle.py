@@ -0,0 +1,171 @@
+# static_bundle.py
+"""Build and serve the front end as a static, fingerprinted bundle.
+
+``build`` reads ``static/src/index.html`` and every stylesheet and script it
+links to. Local files are minified. CDN files (and the fonts their CSS
+points at) are vendored into ``static/vendor/``, so later builds need no
+network. Each file is written to ``static/dist/assets/`` under a
+content-hashed name, and ``dist/index.html`` is rewritten to point at
+those copies. At run time ``StaticBundle`` holds the page and assets in
+memory with their compressed variants; nothing is templated per request.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from urllib.parse import urljoin, urlsplit
+from urllib.request import urlopen
+
+from http_cache import IMMUTABLE, PrecompressedBody
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(ROOT, "static", "src")
+DIST_DIR = os.path.join(ROOT, "static", "dist")
+VENDOR_DIR = os.path.join(ROOT, "static", "vendor")
+ASSET_URL = "/assets/"
+LOCAL_PREFIX = "/static/src/"
+
+_REF = re.compile(r'(<(?:link|script)\b[^>]*?\b(?:href|src)=")([^"]+)(")')
+_CSS_URL = re.compile(r"""url\((['"]?)([^'")]+)\1\)""")
+_SOURCE_MAP = re.compile(r"(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*)")
+_TEXT_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    return re.sub(r"\s*([{};,>])\s*", r"\1", text).strip()
+
+
+def minify_js(text):
+    """Line-level only: drop indentation, blank lines and whole-line comments."""
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+def minify_html(text):
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.S)
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js, ".html": minify_html}
+
+
+def fingerprinted(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha1(data).hexdigest()[:10]}{ext}"
+
+
+def vendored(url, vendor_dir=VENDOR_DIR, offline=False):
+    """Bytes of a CDN file, downloading it into the vendor directory once."""
+    parts = urlsplit(url)
+    path = os.path.join(vendor_dir, parts.netloc, parts.path.lstrip("/"))
+    if not os.path.exists(path):
+        if offline:
+            raise FileNotFoundError(f"{url} is not vendored yet (expected {path})")
+        with urlopen(url, timeout=30) as resp:
+            data = resp.read()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class _Builder:
+    def __init__(self, src_dir, dist_dir, vendor_dir, offline):
+        self.src_dir = src_dir
+        self.assets_dir = os.path.join(dist_dir, "assets")
+        self.vendor_dir = vendor_dir
+        self.offline = offline
+        self.manifest = {}
+
+    def emit(self, source, name, data):
+        out = fingerprinted(name, data)
+        with open(os.path.join(self.assets_dir, out), "wb") as f:
+            f.write(data)
+        self.manifest[source] = ASSET_URL + out
+        return ASSET_URL + out
+
+    def local(self, ref):
+        name = ref[len(LOCAL_PREFIX):]
+        with open(os.path.join(self.src_dir, name), encoding="utf-8") as f:
+            text = f.read()
+        minify = MINIFIERS.get(os.path.splitext(name)[1])
+        return self.emit(ref, os.path.basename(name), (minify(text) if minify else text).encode("utf-8"))
+
+    def remote(self, url):
+        if url in self.manifest:
+            return self.manifest[url]
+        data = vendored(url, self.vendor_dir, self.offline)
+        name = os.path.basename(urlsplit(url).path)
+        if name.endswith((".css", ".js")):
+            text = _SOURCE_MAP.sub("", data.decode("utf-8"))
+            if name.endswith(".css"):
+                text = _CSS_URL.sub(lambda m: self.css_url(url, m), text)
+            data = text.encode("utf-8")
+        return self.emit(url, name, data)
+
+    def css_url(self, base, match):
+        ref = match.group(2)
+        if ref.startswith(("data:", "#")):
+            return match.group(0)
+        url = urljoin(base, ref)
+        clean = url.split("#")[0].split("?")[0]
+        return f"url({self.remote(clean)})"
+
+    def ref(self, ref):
+        if ref.startswith(LOCAL_PREFIX):
+            return self.local(ref)
+        if ref.startswith(("http://", "https://")):
+            return self.remote(ref)
+        return ref
+
+
+def build(src_dir=SRC_DIR, dist_dir=DIST_DIR, vendor_dir=VENDOR_DIR, offline=False):
+    """Write the bundle to ``dist_dir``; returns the source -> asset URL manifest."""
+    with open(os.path.join(src_dir, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+    staging = dist_dir + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    builder = _Builder(src_dir, staging, vendor_dir, offline)
+    os.makedirs(builder.assets_dir)
+    html = _REF.sub(lambda m: m.group(1) + builder.ref(m.group(2)) + m.group(3), html)
+    with open(os.path.join(staging, "index.html"), "w", encoding="utf-8") as f:
+        f.write(minify_html(html))
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(builder.manifest, f, indent=2)
+    # Swap in the finished bundle so a running server never sees half of one
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.replace(staging, dist_dir)
+    return builder.manifest
+
+
+def _body(path, cache_control):
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        data = f.read()
+    return PrecompressedBody(data, mimetype, cache_control, compress=mimetype.startswith(_TEXT_TYPES))
+
+
+class StaticBundle:
+    """The built page and its fingerprinted assets, held in memory.
+
+    Falls back to ``static/src/index.html`` (CDN links, unminified) when no
+    bundle has been built, which is what a development checkout serves.
+    """
+
+    def __init__(self, dist_dir=DIST_DIR, src_dir=SRC_DIR, immutable_max_age=31536000):
+        self.built = os.path.exists(os.path.join(dist_dir, "index.html"))
+        self.page = _body(os.path.join(dist_dir if self.built else src_dir, "index.html"), "no-cache")
+        self.assets = {}
+        assets_dir = os.path.join(dist_dir, "assets")
+        if self.built:
+            for name in os.listdir(assets_dir):
+                self.assets[name] = _body(os.path.join(assets_dir, name), IMMUTABLE.format(immutable_max_age))
+
+    def asset(self, name):
+        return self.assets.get(name)
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synth import SynthSpec, generate  # noqa: E402
+
+# About five weeks of a small restaurant: quick to generate, enough for every route
+SPEC = SynthSpec(branches=3, tables=8, items=40, vouchers_per_day=60, years=0.1, end="2024-12-31")
+
+
+@pytest.fixture(scope="session")
+def spec():
+    return SPEC
+
+
+@pytest.fixture(scope="session")
+def synth_sqlite(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("synth") / "vwSaleDetail.sqlite3")
+    generate(path, SPEC)
+    return path
+
+
+@pytest.fixture(scope="session")
+def synth_duckdb(tmp_path_factory):
+    pytest.importorskip("duckdb")
+    path = str(tmp_path_factory.mktemp("synth") / "vwSaleDetail.duckdb")
+    generate(path, SPEC, backend="duckdb")
+    return path
+
+
+@pytest.fixture(scope="session")
+def connect_fetch():
+    """Opens a ``fetch(sql, params)`` over a SQLite file, binding datetimes the way the app does."""
+    from backends import SqliteBackend
+
+    def connect(path):
+        SqliteBackend(path)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        return lambda sql, params=(): conn.execute(sql, list(params)).fetchall()
+    return connect
+
+
+@pytest.fixture(scope="session")
+def app_main(synth_sqlite):
+    """The app, served from the synthetic SQLite data with rollups off; imported once per session."""
+    pytest.importorskip("flask")
+    os.environ.update(DB_BACKEND="sqlite", DB_PATH=synth_sqlite, ROLLUP_DB_PATH="")
+    import main
+    main.app.config["TESTING"] = True
+    return main
+
+
+@pytest.fixture
+def client(app_main):
+    return app_main.app.test_client()
@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from admission import DISCONNECTED, AdmissionControl, QueryCancelled, RouteBudget  # noqa: E402
+from single_flight import SingleFlight  # noqa: E402
+
+
+class OperationalError(Exception):
+    pass
+
+
+class SlowCursor:
+    """Blocks in ``execute`` until cancelled, like a long-running statement."""
+
+    def __init__(self, timeout=5):
+        self.cancelled = threading.Event()
+        self.timeout = timeout
+
+    def execute(self):
+        if self.cancelled.wait(self.timeout):
+            raise OperationalError("HY008", "Operation canceled")
+        raise OperationalError("HYT00", "Query timeout expired")
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def make_app(limit=1, queue=0, wait_timeout=5.0, watch_interval=0.01):
+    app = flask.Flask(__name__)
+    admission = AdmissionControl({"slow": RouteBudget(limit, queue, wait_timeout), "stream": RouteBudget(1)},
+                                 retry_after=7, watch_interval=watch_interval)
+    admission.init_app(app)
+    app.gate = threading.Event()
+    app.entered = threading.Semaphore(0)
+
+    @app.route("/slow")
+    def slow():
+        app.entered.release()
+        app.gate.wait(5)
+        return "done"
+
+    @app.route("/stream")
+    def stream():
+        return flask.Response(iter([b"a", b"b"]))
+
+    @app.route("/query")
+    def query():
+        cursor = SlowCursor(float(flask.request.args.get("timeout", 5)))
+        with admission.watch(cursor):
+            cursor.execute()
+        return "unreachable"
+
+    return app, admission
+
+
+def in_thread(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()))
+    thread.start()
+    return thread, result
+
+
+def test_full_queue_is_shed_with_retry_after():
+    app, admission = make_app(limit=1, queue=0)
+    thread, first = in_thread(lambda: app.test_client().get("/slow"))
+    assert app.entered.acquire(timeout=5)
+    busy = app.test_client().get("/slow")
+    assert busy.status_code == 503 and busy.headers["Retry-After"] == "7"
+    app.gate.set()
+    thread.join()
+    assert first["value"].status_code == 200
+    stats = admission.stats()["routes"]["slow"]
+    assert stats["shed"] == 1 and stats["running"] == 0
+
+
+def test_queued_request_runs_when_a_slot_frees():
+    app, admission = make_app(limit=1, queue=1)
+    thread, first = in_thread(lambda: app.test_client().get("/slow"))
+    assert app.entered.acquire(timeout=5)
+    waiter, second = in_thread(lambda: app.test_client().get("/slow"))
+    while admission.budgets["slow"].stats()["waiting"] == 0:
+        time.sleep(0.001)
+    app.gate.set()
+    thread.join()
+    waiter.join()
+    assert first["value"].status_code == second["value"].status_code == 200
+    assert admission.budgets["slow"].stats()["queued"] == 1
+
+
+def test_queued_request_times_out():
+    app, admission = make_app(limit=1, queue=1, wait_timeout=0.05)
+    thread, _ = in_thread(lambda: app.test_client().get("/slow"))
+    assert app.entered.acquire(timeout=5)
+    started = time.monotonic()
+    response = app.test_client().get("/slow")
+    assert response.status_code == 503 and time.monotonic() - started >= 0.05
+    app.gate.set()
+    thread.join()
+    assert admission.budgets["slow"].stats()["wait_timeouts"] == 1
+
+
+def test_streamed_response_holds_its_slot_until_closed():
+    app, admission = make_app()
+    budget = admission.budgets["stream"]
+    response = app.test_client().get("/stream", buffered=False)
+    assert budget.running == 1
+    assert app.test_client().get("/stream").status_code == 503
+    assert b"".join(response.response) == b"ab"
+    response.close()
+    assert budget.running == 0
+    assert app.test_client().get("/stream").status_code == 200
+
+
+def test_disconnect_cancels_the_running_statement():
+    app, admission = make_app()
+    gone = threading.Event()
+    threading.Timer(0.05, gone.set).start()
+    response = app.test_client().get("/query", environ_base={DISCONNECTED: gone})
+    assert response.status_code == 499
+    assert admission.stats()["cancelled"] == 1 and admission.stats()["watching"] == 0
+
+
+def test_statement_timeout_is_not_a_cancellation():
+    app, admission = make_app()
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+    with pytest.raises(OperationalError) as e:
+        app.test_client().get("/query?timeout=0.01", environ_base={DISCONNECTED: threading.Event()})
+    assert e.value.args[0] == "HYT00" and not isinstance(e.value, QueryCancelled)
+    assert admission.stats()["cancelled"] == 0
+
+
+def test_waiters_rerun_a_query_whose_leader_was_cancelled():
+    flight = SingleFlight()
+    leader_in, release_leader = threading.Event(), threading.Event()
+    runs = []
+
+    def leader_query():
+        runs.append("leader")
+        leader_in.set()
+        release_leader.wait(5)
+        raise QueryCancelled("Client disconnected")
+
+    def waiter_query():
+        runs.append("waiter")
+        return ["rows"]
+
+    leader, leader_result = in_thread(lambda: _raises(lambda: flight.do("q", leader_query)))
+    assert leader_in.wait(5)
+    waiter, waiter_result = in_thread(lambda: flight.do("q", waiter_query))
+    while flight.stats()["shared"] == 0:
+        time.sleep(0.001)
+    release_leader.set()
+    leader.join()
+    waiter.join()
+    assert isinstance(leader_result["value"], QueryCancelled)
+    assert waiter_result["value"] == ["rows"] and runs == ["leader", "waiter"]
+
+
+def _raises(fn):
+    try:
+        fn()
+    except Exception as e:
+        return e
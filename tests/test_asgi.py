@@ -0,0 +1,82 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("asgiref")
+
+from admission import DISCONNECTED  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def asgi(app_main):
+    import asgi
+    return asgi
+
+
+def scope(path, query=b""):
+    return {"type": "http", "method": "GET", "path": path, "query_string": query, "headers": [],
+            "http_version": "1.1", "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 5000)}
+
+
+async def call(app, path, disconnect_after=None):
+    """Run one request; returns ``(status, body)``. The client hangs up after ``disconnect_after`` seconds."""
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope(path), receive, send)
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_serves_the_flask_routes(asgi):
+    status, body = asyncio.run(call(asgi.app, "/branches"))
+    assert status == 200 and json.loads(body)[0] == "Branch 1"
+
+
+def test_disconnect_sets_the_environ_event(asgi):
+    seen = {}
+
+    def wsgi(environ, start_response):
+        seen["disconnected"] = environ[DISCONNECTED].wait(5)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"late"]
+
+    asyncio.run(call(asgi.FlaskAsgi(wsgi), "/", disconnect_after=0.05))
+    assert seen["disconnected"] is True
+
+
+def test_requests_run_concurrently_and_results_are_closed(asgi):
+    closed = []
+
+    class Body(list):
+        def close(self):
+            closed.append(threading.current_thread().name)
+
+    def wsgi(environ, start_response):
+        time.sleep(0.2)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return Body([b"ok"])
+
+    app = asgi.FlaskAsgi(asgi._closing(wsgi))
+
+    async def both():
+        return await asyncio.gather(*(call(app, "/") for _ in range(4)))
+
+    started = time.perf_counter()
+    results = asyncio.run(both())
+    assert time.perf_counter() - started < 0.6
+    assert results == [(200, b"ok")] * 4
+    assert len(closed) == 4 and all(name.startswith("asgi") for name in closed)
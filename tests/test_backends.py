@@ -0,0 +1,40 @@
+import pytest
+
+from backends import DuckDBBackend, SqliteBackend
+from db_pool import ConnectionPool
+
+COUNT_SQL = "SELECT COUNT(*) FROM vwSaleDetail"
+
+
+def checkout_twice(pool):
+    with pool.connection() as conn:
+        cur = conn.cursor(COUNT_SQL)
+        cur.execute(COUNT_SQL)
+        first = cur.fetchall()
+    # ping_interval=0 pings every checkout, so this query runs after a ping closed its cursor
+    with pool.connection() as conn:
+        cur = conn.cursor(COUNT_SQL)
+        cur.execute(COUNT_SQL)
+        return first, cur.fetchall()
+
+
+@pytest.mark.parametrize("make", [
+    lambda synth_sqlite, request: SqliteBackend(synth_sqlite),
+    lambda synth_sqlite, request: DuckDBBackend(request.getfixturevalue("synth_duckdb")),
+], ids=["sqlite", "duckdb"])
+def test_query_after_ping(make, synth_sqlite, request):
+    pool = ConnectionPool(make(synth_sqlite, request).connect, min_size=0, max_size=1, ping_interval=0)
+    first, second = checkout_twice(pool)
+    assert first == second and first[0][0] > 0
+    stats = pool.stats()
+    assert stats["failed_pings"] == 0
+    assert stats["connections_opened"] == 1
+
+
+def test_duckdb_survives_statement_cache_eviction(synth_duckdb):
+    pool = ConnectionPool(DuckDBBackend(synth_duckdb).connect, min_size=0, max_size=1, statement_cache_size=1)
+    with pool.connection() as conn:
+        for sql in (COUNT_SQL, "SELECT MAX(VoucherNo) FROM vwSaleDetail", COUNT_SQL):
+            cur = conn.cursor(sql)
+            cur.execute(sql)
+            assert cur.fetchall()[0][0] is not None
@@ -0,0 +1,41 @@
+import pytest
+
+URLS = [
+    ("top-items", "/top-items?start=2024-12-01&end=2024-12-10"),
+    ("avg-spending", "/avg-spending"),
+    ("table-spending", "/table-spending?start=2024-12-01&end=2024-12-10"),
+    ("peak-by-date-range", "/peak-by-date-range?start=2024-12-01&end=2024-12-10"),
+]
+
+
+def as_records(body):
+    return [dict(zip(body["names"], values)) for values in zip(*(body["columns"][n] for n in body["names"]))]
+
+
+@pytest.mark.parametrize("route,url", URLS)
+def test_columns_match_json_rows(client, app_main, route, url):
+    rows = client.get(url).get_json()
+    resp = client.get(url + ("&" if "?" in url else "?") + "format=columns")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["names"] == [name for name, _ in app_main.ROUTE_COLUMNS[route]]
+    assert body["rows"] == len(rows) > 0
+    assert as_records(body) == [{n: r[n] for n in body["names"]} for r in rows]
+
+
+@pytest.mark.parametrize("route,url", URLS)
+def test_arrow_stream_matches_json_rows(client, app_main, route, url):
+    pa = pytest.importorskip("pyarrow")
+    rows = client.get(url).get_json()
+    # Streamed bodies hold their admission slot until closed
+    with client.get(url + ("&" if "?" in url else "?") + "format=arrow") as resp:
+        assert resp.status_code == 200 and resp.mimetype == "application/vnd.apache.arrow.stream"
+        table = pa.ipc.open_stream(resp.data).read_all()
+    assert table.column_names == [name for name, _ in app_main.ROUTE_COLUMNS[route]]
+    assert table.to_pylist() == [{n: r[n] for n in table.column_names} for r in rows]
+
+
+def test_peak_profile_columns_match_json(client):
+    profile = client.get("/peak-times").get_json()["profile"]
+    body = client.get("/peak-times?format=columns").get_json()
+    assert as_records(body) == [{n: r[n] for n in body["names"]} for r in profile]
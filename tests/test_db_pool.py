@@ -0,0 +1,193 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout, is_disconnect
+
+
+class OperationalError(Exception):
+    pass
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.closed = False
+
+    def execute(self, sql, params=()):
+        if self.conn.dead:
+            raise OperationalError("08S01", "Communication link failure")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.dead = False
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.dead:
+            raise OperationalError("08S01", "Communication link failure")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def connect(opened):
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+    return connect
+
+
+def test_reuses_the_most_recent_connection(connect, opened):
+    pool = ConnectionPool(connect, min_size=0, max_size=3)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire() is b
+    assert len(opened) == 2 and b.raw.rollbacks == 1
+    assert pool.stats()["checkouts"] == 3
+
+
+def test_waits_for_a_release_then_times_out(connect):
+    pool = ConnectionPool(connect, min_size=0, max_size=1, checkout_timeout=0.05)
+    conn = pool.acquire()
+    threading.Timer(0.02, pool.release, [conn]).start()
+    assert pool.acquire(timeout=2) is conn
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["waits"] == 2 and stats["timeouts"] == 1 and stats["size"] == 1
+
+
+def test_never_opens_more_than_max_size(connect, opened):
+    pool = ConnectionPool(connect, min_size=0, max_size=4)
+    peak, lock = [0], threading.Lock()
+
+    def work():
+        for _ in range(50):
+            with pool.connection():
+                with lock:
+                    peak[0] = max(peak[0], pool.stats()["in_use"])
+                time.sleep(0.0005)
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(opened) <= 4 and peak[0] <= 4
+    assert pool.stats()["in_use"] == 0 and pool.stats()["checkouts"] == 600
+
+
+def test_dead_connection_is_replaced_after_a_failed_ping(connect, opened):
+    pool = ConnectionPool(connect, min_size=0, max_size=1, ping_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.raw.dead = True
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.raw.closed and not fresh.raw.dead
+    stats = pool.stats()
+    assert stats["failed_pings"] == 1 and stats["connections_opened"] == 2 and stats["size"] == 1
+
+
+def test_disconnects_discard_but_statement_errors_do_not(connect, opened):
+    pool = ConnectionPool(connect, min_size=0, max_size=1)
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("bad statement")
+    with pytest.raises(OperationalError):
+        with pool.connection() as conn:
+            raise OperationalError("08S01", "Communication link failure")
+    assert len(opened) == 1 and conn.raw.closed
+    assert pool.stats()["connections_closed"] == 1 and pool.stats()["size"] == 0
+
+
+def test_is_disconnect():
+    assert is_disconnect(OperationalError("08S01"))
+    assert is_disconnect(ConnectionResetError())
+    assert not is_disconnect(OperationalError("HYT00", "Query timeout expired"))
+    assert not is_disconnect(ValueError("08S01"))
+
+
+def test_sqlite_statement_errors_keep_the_connection():
+    pool = ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), max_size=1)
+    for sql in ("SELECT * FROM missing", "SELEC 1"):
+        with pytest.raises(sqlite3.OperationalError) as e:
+            with pool.connection() as conn:
+                conn.cursor().execute(sql)
+        assert not is_disconnect(e.value)
+    assert pool.stats()["connections_opened"] == 1 and pool.stats()["connections_closed"] == 0
+
+
+def test_idle_connections_above_min_size_are_evicted(connect, opened):
+    pool = ConnectionPool(connect, min_size=1, max_size=3, idle_timeout=0.01)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    time.sleep(0.02)
+    pool.evict_idle()
+    stats = pool.stats()
+    assert stats["size"] == 1 and stats["idle_evictions"] == 2
+    assert sum(c.closed for c in opened) == 2
+
+
+def test_connect_errors_free_their_slot():
+    calls = []
+
+    def connect():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("08001", "Cannot open server")
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, min_size=0, max_size=1, checkout_timeout=0.05)
+    with pytest.raises(OperationalError):
+        pool.acquire()
+    assert pool.acquire().raw is not None
+    assert pool.stats()["connect_errors"] == 1
+
+
+def test_statement_cursors_are_reused_and_evicted(connect):
+    pool = ConnectionPool(connect, min_size=0, max_size=1, statement_cache_size=2)
+    with pool.connection() as conn:
+        first = conn.cursor("SELECT 1")
+        assert conn.cursor("SELECT 1") is first
+        conn.cursor("SELECT 2")
+        conn.cursor("SELECT 3")
+        assert first.closed
+        assert conn.cursor() is not conn.cursor()
+    stats = pool.stats()
+    assert stats["statement_cache_hits"] == 1 and stats["statement_cache_misses"] == 3
+
+
+def test_close_closes_idle_and_later_released_connections(connect, opened):
+    pool = ConnectionPool(connect, min_size=0, max_size=2)
+    busy, idle = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.close()
+    assert idle.raw.closed and not busy.raw.closed
+    pool.release(busy)
+    assert busy.raw.closed
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,92 @@
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from bench.synth import SynthSpec, generate
+from rollups import day_start, item_query, raw_hourly, table_query
+
+np = pytest.importorskip("numpy")
+
+from hot_window import HotWindow  # noqa: E402
+
+# The window follows the clock, so this data ends today
+RECENT = SynthSpec(branches=2, tables=6, items=30, vouchers_per_day=40, years=0.03, end=date.today().isoformat())
+
+
+@pytest.fixture
+def source(tmp_path, connect_fetch):
+    path = str(tmp_path / "recent.sqlite3")
+    generate(path, RECENT)
+    return path, connect_fetch(path)
+
+
+def insert(path, voucher, entered, amount=500.0):
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO vwSaleDetail VALUES ('Branch 1', ?, ?, ?, 'D', 'T01', 'Table 1', 'Item 0001', "
+                     "'BAR', 1, ?)", [voucher, entered.date().isoformat(), entered.isoformat(" "), amount])
+    conn.close()
+
+
+def assert_matches_sql(window, fetch):
+    lo, hi = window.lo, day_start(datetime.now()) + timedelta(days=2)
+    for branch in (None, "Branch 2"):
+        assert window.hourly(lo, hi, branch) == pytest.approx(raw_hourly(fetch, lo, hi, branch, "sqlite"))
+        q = item_query(lo.date(), hi.date(), branch)
+        assert window.item_totals(lo, hi, branch) == pytest.approx(dict(fetch(q.sql("sqlite"), q.params)))
+        q = table_query(lo.date(), hi.date(), branch)
+        want = sorted((code, name, orders, pytest.approx(amount))
+                      for code, name, orders, amount in fetch(q.sql("sqlite"), q.params))
+        assert sorted(window.table_totals(lo, hi, branch)) == want
+
+
+def test_load_matches_sql(source):
+    path, fetch = source
+    window = HotWindow(fetch, days=5)
+    window.load()
+    assert window.lo == day_start(datetime.now()) - timedelta(days=4)
+    assert window.stats()["rows"] > 0
+    assert_matches_sql(window, fetch)
+
+
+def test_refresh_picks_up_new_and_overlapping_rows(source):
+    path, fetch = source
+    window = HotWindow(fetch, days=5, overlap=timedelta(hours=1))
+    window.load()
+    voucher = fetch("SELECT MAX(VoucherNo) FROM vwSaleDetail")[0][0]
+    latest = window._latest()
+    insert(path, voucher + 1, latest + timedelta(seconds=1))
+    insert(path, voucher + 2, latest - timedelta(minutes=30))
+    window.refresh()
+    assert window.stats()["deltas"] == 1
+    assert_matches_sql(window, fetch)
+
+
+def test_rows_older_than_the_overlap_need_a_reload(source):
+    path, fetch = source
+    window = HotWindow(fetch, days=5, overlap=timedelta(hours=1), reload_interval=0.05)
+    window.load()
+    assert not window.reload_due()
+    voucher = fetch("SELECT MAX(VoucherNo) FROM vwSaleDetail")[0][0]
+    insert(path, voucher + 1, day_start(datetime.now()) - timedelta(days=2, hours=-13))
+    window.refresh()
+    with pytest.raises(AssertionError):
+        assert_matches_sql(window, fetch)
+    time.sleep(0.05)
+    assert window.reload_due()
+    window.load()
+    assert_matches_sql(window, fetch)
+
+
+def test_background_thread_reloads_periodically(source):
+    path, fetch = source
+    window = HotWindow(fetch, days=5, reload_interval=0.05)
+    window.start(0.01)
+    try:
+        deadline = time.monotonic() + 5
+        while window.stats()["loads"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        window.stop()
+    assert window.stats()["loads"] >= 3 and window.stats()["errors"] == 0
@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from result_cache import range_is_closed
+
+
+def test_past_dashboard_with_all_time_panels_is_revalidated(client):
+    resp = client.get("/dashboard?start=2024-12-01&end=2024-12-02&panels=avg_spending,peak_times")
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+
+def test_past_dashboard_of_dated_panels_is_closed_for_hours(client):
+    resp = client.get("/dashboard?start=2024-12-01&end=2024-12-02&date=2024-12-01"
+                      "&panels=peak_by_date,table_spending")
+    assert resp.headers["Cache-Control"] == "public, max-age=21600"
+
+
+def test_yesterday_is_not_closed_before_it_settles(client):
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    resp = client.get(f"/table-spending?start={yesterday}&end={yesterday}")
+    # Closed only once ITEM_ROLLUP_SETTLE_HOURS of today have passed
+    expected = "public, max-age=21600" if range_is_closed({"end": yesterday}) else "no-cache"
+    assert resp.headers["Cache-Control"] == expected
+
+
+def test_etag_changes_with_app_version(client, app_main):
+    url = "/table-spending?start=2024-12-01&end=2024-12-02"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    version = app_main.http_cache.version
+    app_main.http_cache.version = version + "-next"
+    try:
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+    finally:
+        app_main.http_cache.version = version
@@ -0,0 +1,43 @@
+import re
+
+from metrics import LATENCY_BUCKETS, Metrics, RequestTimer
+
+
+def samples(text, name):
+    """``{labels: value}`` for every sample of metric ``name``."""
+    out = {}
+    for line in text.splitlines():
+        m = re.fullmatch(rf"{name}(?:\{{(.*)\}})? (\S+)", line)
+        if m:
+            out[m.group(1) or ""] = float(m.group(2))
+    return out
+
+
+def test_latency_histogram_buckets_are_cumulative():
+    metrics = Metrics()
+    for seconds in (0.002, 0.002, 0.3):
+        timer = RequestTimer()
+        timer.add("execute", seconds)
+        metrics.record("/x", 200, timer, 10)
+    buckets = samples(metrics.render(), "dbanalytics_phase_seconds_bucket")
+    counts = [buckets[f'route="/x",phase="execute",le="{float(b)}"'] for b in LATENCY_BUCKETS]
+    assert counts == sorted(counts) and counts[0] == 0 and counts[1] == 2 and counts[-1] == 3
+    assert buckets['route="/x",phase="execute",le="+Inf"'] == 3
+
+
+def test_metrics_endpoint_exposes_latency_and_pool_gauges(client):
+    assert client.get("/table-spending?start=2024-12-01&end=2024-12-10").status_code == 200
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert "# TYPE dbanalytics_request_seconds histogram" in text
+    count = samples(text, "dbanalytics_request_seconds_count")['route="/table-spending"']
+    assert samples(text, "dbanalytics_request_seconds_bucket")['route="/table-spending",le="+Inf"'] == count >= 1
+    phases = samples(text, "dbanalytics_phase_seconds_count")
+    assert {'route="/table-spending",phase="execute"', 'route="/table-spending",phase="fetch"'} <= set(phases)
+    assert samples(text, "dbanalytics_requests_total")['route="/table-spending",status="200"'] >= 1
+
+    assert "# TYPE dbanalytics_pool_connections gauge" in text
+    pool = samples(text, "dbanalytics_pool_connections")
+    assert pool['state="in_use"'] == 0 and pool['state="idle"'] >= 1
+    assert samples(text, "dbanalytics_pool_max_connections")[""] >= 1
+    assert samples(text, "dbanalytics_admission_requests")['route="table_spending",state="running"'] == 0
@@ -0,0 +1,77 @@
+import base64
+import json
+
+import pytest
+
+from paging import PageSpec, PagingError, decode_cursor, encode_cursor, paginate
+
+SPEC = PageSpec(search=["Name"], sort=["Name", "Qty"], key=["Name"], default_sort="-Qty")
+ROWS = [{"Name": f"item {i:02}", "Qty": i % 7} for i in range(30)] + [{"Name": "nothing", "Qty": None}]
+
+
+def cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("sort", ["Name", "-Name", "Qty", "-Qty"])
+def test_pages_cover_every_row_once_in_order(sort):
+    seen, after = [], None
+    while True:
+        page, after, total = paginate(ROWS, SPEC, sort=sort, limit="4", after=after)
+        seen += page
+        if after is None:
+            break
+    assert total == len(ROWS)
+    assert sorted(r["Name"] for r in seen) == sorted(r["Name"] for r in ROWS)
+    assert len(seen) == len(ROWS)
+    whole, _, _ = paginate(ROWS, SPEC, sort=sort, limit="1000")
+    assert seen == whole
+
+
+def test_search_filters_before_counting():
+    page, after, total = paginate(ROWS, SPEC, q="ITEM 1", sort="Name", limit="3")
+    assert total == 10
+    assert [r["Name"] for r in page] == ["item 10", "item 11", "item 12"]
+    assert decode_cursor(after, 2) == decode_cursor(encode_cursor(decode_cursor(after)))
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "abc", "1001"])
+def test_limit_out_of_range(limit):
+    with pytest.raises(PagingError):
+        paginate(ROWS, SPEC, limit=limit)
+
+
+@pytest.mark.parametrize("after", [
+    "not base64!",
+    cursor(1),
+    cursor([1]),
+    cursor([[False, "a", "a"]]),
+    cursor([[False, "a", "a"], [False, "b", "b"], [False, "c", "c"]]),
+    cursor([[False, "a"], [False, "b", "b"]]),
+    cursor([[False, {}, ""], [False, "b", "b"]]),
+    cursor([["no", 1, ""], [False, "b", "b"]]),
+    # Well-formed, but a name where the numeric sort column belongs
+    cursor([[False, "a", "a"], [False, "b", "b"]]),
+])
+def test_malformed_cursor_is_a_paging_error(after):
+    with pytest.raises(PagingError):
+        paginate(ROWS, SPEC, sort="Qty", after=after)
+
+
+def test_bad_paging_args_are_rejected_before_querying(client, monkeypatch, app_main):
+    def fail(*args, **kwargs):
+        raise AssertionError("queried")
+    monkeypatch.setattr(app_main, "query_avg_spending", fail)
+    for query in ("limit=0", "after=WzFd", "sort=Nope", "limit=5000"):
+        response = client.get(f"/avg-spending?{query}")
+        assert response.status_code == 400, query
+    assert client.get("/dashboard?panels=top_items&limit=0").status_code == 400
+
+
+def test_route_pages_follow_the_cursor(client):
+    first = client.get("/avg-spending?limit=5&sort=Table")
+    assert first.status_code == 200 and len(first.get_json()) == 5
+    after = first.headers["X-Next-Cursor"]
+    second = client.get(f"/avg-spending?limit=5&sort=Table&after={after}")
+    assert second.status_code == 200
+    assert not {(r["Branch"], r["Table"]) for r in first.get_json()} & {(r["Branch"], r["Table"]) for r in second.get_json()}
@@ -0,0 +1,81 @@
+import threading
+import time
+from datetime import datetime
+
+import result_cache
+from result_cache import ResultCache, normalize_args, range_is_closed
+
+
+def test_normalize_args_drops_empty_values_and_all_branch():
+    assert normalize_args({"start": " 2024-01-01 ", "end": "", "branch": "All", "n": None}) == \
+        (("start", "2024-01-01"),)
+
+
+def test_yesterday_is_live_until_it_settles(monkeypatch):
+    monkeypatch.setattr(result_cache, "SETTLE", result_cache.timedelta(hours=6))
+    args = {"start": "2024-12-01", "end": "2024-12-30"}
+    assert not range_is_closed(args, now=datetime(2024, 12, 31, 1, 0))
+    assert not range_is_closed(args, now=datetime(2024, 12, 31, 5, 59))
+    assert range_is_closed(args, now=datetime(2024, 12, 31, 6, 0))
+    assert not range_is_closed({"date": "not-a-date"}, now=datetime(2030, 1, 1))
+    assert not range_is_closed({}, now=datetime(2030, 1, 1))
+
+
+def test_live_entry_is_recomputed_when_watermark_moves():
+    watermark = [1]
+    cache = ResultCache(watermark=lambda: watermark[0], watermark_interval=0, stale_ttl=0)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+    args = {"start": "2999-01-01", "end": "2999-01-02"}
+    assert cache.get_or_compute("r", args, compute) == 1
+    assert cache.get_or_compute("r", args, compute) == 1
+    watermark[0] = 2
+    assert cache.get_or_compute("r", args, compute) == 2
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    gate, calls = threading.Event(), []
+
+    def compute():
+        calls.append(1)
+        gate.wait(2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("r", {}, compute)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == ["value"] * 8 and len(calls) == 1
+
+
+def test_stale_entry_is_served_while_it_is_recomputed():
+    cache = ResultCache(live_ttl=0.05, stale_ttl=60)
+    values = iter(["old", "new"])
+    cache.get_or_compute("r", {}, lambda: next(values))
+    time.sleep(0.06)
+    assert cache.get_or_compute("r", {}, lambda: next(values)) == "old"
+    deadline = time.monotonic() + 2
+    while cache.stats()["revalidating"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get_or_compute("r", {}, lambda: "unused") == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_memoize_keys_with_defaults_filled_in():
+    cache = ResultCache()
+    calls = []
+
+    @cache.memoize("r")
+    def query(start=None, n=10):
+        calls.append(n)
+        return n
+
+    assert query(start="2000-01-01") == query(start="2000-01-01", n=10) == 10
+    assert calls == [10]
@@ -0,0 +1,169 @@
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from query_builder import Query
+from rollups import (HourlyRollup, ItemDailyRollup, RollupRefresher, TableDailyRollup, hourly_profile, item_query,
+                     raw_hourly, table_query, table_totals, top_items)
+
+
+@pytest.fixture(scope="module")
+def fetch(synth_sqlite, connect_fetch):
+    return connect_fetch(synth_sqlite)
+
+
+def built(store, fetch, spec):
+    # Cover only the middle of the data, so reads need both gaps from the raw view
+    first = datetime.combine(spec.first_day, datetime.min.time())
+    store.build(fetch, first + timedelta(days=7), datetime.combine(spec.last_day, datetime.min.time()) - timedelta(days=5))
+    return store
+
+
+def test_hourly_profile_with_gaps_matches_raw(tmp_path, fetch, spec):
+    store = built(HourlyRollup(str(tmp_path / "r.sqlite3"), "sqlite"), fetch, spec)
+    start = datetime.combine(spec.first_day, datetime.min.time()) + timedelta(days=3, hours=13)
+    for lo, hi in ((None, None), (start, start + timedelta(days=20)), (start, None)):
+        for branch in (None, "Branch 2"):
+            got = hourly_profile(store, fetch, lo, hi, branch)
+            want = raw_hourly(fetch, lo, hi, branch, "sqlite")
+            assert got.keys() == want.keys()
+            for hour, (amount, orders) in want.items():
+                assert got[hour][0] == pytest.approx(amount)
+                assert got[hour][1] == orders
+
+
+def test_table_totals_with_gaps_match_raw(tmp_path, fetch, spec):
+    store = built(TableDailyRollup(str(tmp_path / "r.sqlite3"), "sqlite"), fetch, spec)
+    lo = datetime.combine(spec.first_day, datetime.min.time())
+    hi = datetime.combine(spec.last_day, datetime.min.time()) + timedelta(days=1)
+    q = table_query(lo.date(), hi.date())
+    want = {(code, name): (orders, amount) for code, name, orders, amount in fetch(q.sql("sqlite"), q.params)}
+    got = {(code, name): (orders, amount) for code, name, orders, amount in table_totals(store, fetch, lo, hi)}
+    assert got.keys() == want.keys()
+    for key, (orders, amount) in want.items():
+        assert got[key][0] == orders
+        assert got[key][1] == pytest.approx(amount)
+
+
+@pytest.fixture
+def source(tmp_path, synth_sqlite, connect_fetch):
+    """A writable copy of the synthetic view: ``(path, fetch)``."""
+    path = str(tmp_path / "source.sqlite3")
+    shutil.copyfile(synth_sqlite, path)
+    return path, connect_fetch(path)
+
+
+def write(path, sql, params=()):
+    with sqlite3.connect(path) as conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def refreshed_stores(tmp_path, fetch, spec, recheck_days=2):
+    """Stores built up to four days before the end of the data, then refreshed to the end."""
+    rollup_path = str(tmp_path / "rollups.sqlite3")
+    stores = [HourlyRollup(rollup_path, "sqlite"), ItemDailyRollup(rollup_path, "sqlite"),
+              TableDailyRollup(rollup_path, "sqlite")]
+    first = datetime.combine(spec.first_day, datetime.min.time())
+    cut = datetime.combine(spec.last_day, datetime.min.time()) - timedelta(days=4, hours=-13)
+    for store in stores:
+        store.build(fetch, first, cut)
+    refresher = RollupRefresher(stores, fetch, chunk=timedelta(hours=6), recheck_days=recheck_days)
+    refresher.run_once()
+    return stores, refresher
+
+
+def assert_rollups_match_raw(stores, fetch):
+    hourly, items, tables = stores
+    lo, hi = hourly.coverage()
+    want = raw_hourly(fetch, lo, hi, dialect="sqlite")
+    got = {hour: [amount, sketch.count()] for hour, (amount, sketch) in hourly.hourly(lo, hi).items()}
+    assert got.keys() == want.keys()
+    for hour, (amount, orders) in want.items():
+        assert got[hour][0] == pytest.approx(amount) and got[hour][1] == orders
+
+    lo, hi = items.coverage()
+    q = item_query(lo.date(), hi.date())
+    assert items.items(lo, hi) == pytest.approx({item: qty for item, qty in fetch(q.sql("sqlite"), q.params)})
+
+    lo, hi = tables.coverage()
+    q = table_query(lo.date(), hi.date())
+    want = {(code, name): (orders, amount) for code, name, orders, amount in fetch(q.sql("sqlite"), q.params)}
+    got = {key: (sketch.count(), amount) for key, (amount, sketch) in tables.tables(lo, hi).items()}
+    assert got.keys() == want.keys()
+    for key, (orders, amount) in want.items():
+        assert got[key][0] == orders and got[key][1] == pytest.approx(amount)
+
+
+def test_incremental_refresh_matches_raw(tmp_path, source, spec):
+    path, fetch = source
+    stores, refresher = refreshed_stores(tmp_path, fetch, spec)
+    assert refresher.last_run["stores"]["hourly"]["rows"] > 0
+    # Nothing changed in the recheck window, so nothing is rebuilt
+    assert all(s["rechecked_partitions"] == 0 for s in refresher.last_run["stores"].values())
+    assert all(s.state()[1] > datetime.combine(spec.last_day, datetime.min.time()) for s in stores)
+    assert_rollups_match_raw(stores, fetch)
+
+
+def test_late_voucher_rebuilds_its_partitions(tmp_path, source, spec):
+    path, fetch = source
+    stores, refresher = refreshed_stores(tmp_path, fetch, spec, recheck_days=0)
+    # A new voucher number, entered with a time the stores have already covered
+    day = spec.last_day - timedelta(days=10)
+    voucher = fetch("SELECT MAX(VoucherNo) FROM vwSaleDetail")[0][0] + 1
+    write(path, "INSERT INTO vwSaleDetail VALUES (?, ?, ?, ?, 'D', 'T01', 'Table 1', 'Item 0001', 'BAR', 2, 500)",
+          ["Branch 1", voucher, day.isoformat(), f"{day.isoformat()} 13:30:00"])
+    summary = refresher.run_once()["stores"]
+    assert all(s["late_partitions"] == 1 for s in summary.values())
+    assert_rollups_match_raw(stores, fetch)
+
+
+def test_edited_voucher_is_found_by_the_recheck(tmp_path, source, spec):
+    path, fetch = source
+    stores, refresher = refreshed_stores(tmp_path, fetch, spec)
+    day = (spec.last_day - timedelta(days=1)).isoformat()
+    write(path, "UPDATE vwSaleDetail SET Amount = Amount + 1000, Qty = Qty + 1 "
+                "WHERE VoucherNo = (SELECT MIN(VoucherNo) FROM vwSaleDetail WHERE VoucherDate = ? AND SaleType = 'D')",
+          [day])
+    summary = refresher.run_once()["stores"]
+    assert all(s["rechecked_partitions"] == 1 for s in summary.values())
+    assert_rollups_match_raw(stores, fetch)
+
+
+def test_edited_voucher_without_a_branch_is_rebuilt(tmp_path, source, spec):
+    path, fetch = source
+    day = (spec.last_day - timedelta(days=1)).isoformat()
+    voucher = "(SELECT MIN(VoucherNo) FROM vwSaleDetail WHERE VoucherDate = ? AND SaleType = 'D')"
+    write(path, f"UPDATE vwSaleDetail SET BranchName = NULL WHERE VoucherNo = {voucher}", [day])
+    stores, refresher = refreshed_stores(tmp_path, fetch, spec)
+    write(path, f"UPDATE vwSaleDetail SET Amount = Amount + 800 WHERE VoucherNo = {voucher}", [day])
+    summary = refresher.run_once()["stores"]
+    assert all(s["rechecked_partitions"] == 1 for s in summary.values())
+    assert_rollups_match_raw(stores, fetch)
+    # Rebuilt for good: the next run finds nothing to recheck
+    summary = refresher.run_once()["stores"]
+    assert all(s["rechecked_partitions"] == 0 for s in summary.values())
+
+
+def test_branches_leave_out_null_branch_names(tmp_path, source, spec):
+    path, fetch = source
+    day = spec.last_day - timedelta(days=10)
+    write(path, "INSERT INTO vwSaleDetail VALUES (NULL, 1, ?, ?, 'T', NULL, NULL, 'Item 0001', 'BAR', 1, 100)",
+          [day.isoformat(), f"{day.isoformat()} 12:00:00"])
+    store = HourlyRollup(str(tmp_path / "r.sqlite3"), "sqlite")
+    store.build(fetch, datetime.combine(spec.first_day, datetime.min.time()),
+                datetime.combine(spec.last_day, datetime.min.time()))
+    assert store.branches() == [f"Branch {b + 1}" for b in range(spec.branches)]
+
+
+def test_gap_queries_use_the_backend_dialect(tmp_path, fetch, spec, monkeypatch):
+    dialects = []
+    sql = Query.sql
+    monkeypatch.setattr(Query, "sql", lambda self, dialect="mssql": dialects.append(dialect) or sql(self, dialect))
+    lo = datetime.combine(spec.first_day, datetime.min.time())
+    hi = datetime.combine(spec.last_day, datetime.min.time())
+    top_items(None, fetch, lo, hi, dialect="sqlite")
+    table_totals(built(TableDailyRollup(str(tmp_path / "r.sqlite3"), "sqlite"), fetch, spec), fetch, lo, hi)
+    assert dialects and set(dialects) == {"sqlite"}
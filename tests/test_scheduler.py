@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import Scheduler
+
+
+@pytest.mark.parametrize("jitter", [0.0, 0.2, 0.5])
+def test_delay_stays_within_the_jitter_band(jitter):
+    scheduler = Scheduler(jitter=jitter)
+    delays = [scheduler.delay(60) for _ in range(2000)]
+    assert all(60 * (1 - jitter) <= d <= 60 * (1 + jitter) for d in delays)
+    if jitter:
+        # Spread over the band rather than pinned to the interval
+        assert max(delays) - min(delays) > 60 * jitter
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.005)
+
+
+def test_failing_job_keeps_its_schedule():
+    scheduler = Scheduler(jitter=0.1, startup_spread=0.01)
+    ran = []
+
+    def broken():
+        raise RuntimeError("database unavailable")
+
+    scheduler.add("broken", broken, 0.01)
+    scheduler.add("fine", lambda: ran.append(1), 0.01)
+    scheduler.start()
+    try:
+        wait_for(lambda: scheduler.stats()["broken"]["runs"] >= 3 and len(ran) >= 3)
+    finally:
+        scheduler.stop()
+    stats = scheduler.stats()
+    assert stats["broken"]["errors"] == stats["broken"]["runs"] >= 3
+    assert stats["fine"]["errors"] == 0 and stats["fine"]["last_run"] is not None
+
+
+def test_first_runs_are_spread_over_startup():
+    scheduler = Scheduler(startup_spread=0.2)
+    started = {}
+    for name in "abc":
+        scheduler.add(name, lambda name=name: started.setdefault(name, time.monotonic()), 60)
+    t0 = time.monotonic()
+    scheduler.start()
+    try:
+        wait_for(lambda: len(started) == 3)
+    finally:
+        scheduler.stop()
+    assert all(0 <= t - t0 <= 0.2 + 0.1 for t in started.values())
+    assert all(scheduler.stats()[name]["runs"] == 1 for name in "abc")
+
+
+def test_stop_ends_the_loop_and_start_is_idempotent():
+    scheduler = Scheduler(startup_spread=0)
+    gate = threading.Event()
+    scheduler.add("job", gate.set, 60)
+    thread = scheduler.start()
+    assert scheduler.start() is thread
+    assert gate.wait(5)
+    scheduler.stop()
+    thread.join(5)
+    assert not thread.is_alive()
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from sketches import ExactSet, HyperLogLog, Sketcher
+
+
+def test_exact_set_round_trip():
+    values = [5, -3, 0, 2 ** 40, 100001, 100002, 7, 7]
+    sketch = ExactSet()
+    for v in values:
+        sketch.add(v)
+    loaded = Sketcher("exact").loads(sketch.to_bytes())
+    assert loaded.values == set(values)
+    assert loaded.count() == len(set(values))
+
+
+def test_exact_set_merge_is_a_union():
+    a, b = ExactSet(), ExactSet()
+    for v in range(0, 100):
+        a.add(v)
+    for v in range(50, 150):
+        b.add(v)
+    a.merge_blob(b.to_bytes())
+    assert a.count() == 150
+
+
+@pytest.mark.parametrize("precision", [12, 14])
+@pytest.mark.parametrize("n", [100, 5000, 50000])
+def test_hll_within_three_standard_errors(precision, n):
+    sketcher = Sketcher("hll", precision)
+    sketch = sketcher.new()
+    for v in random.Random(n).sample(range(10 ** 9), n):
+        sketch.add(v)
+    assert abs(sketch.count() - n) <= 3 * sketcher.relative_error * n
+
+
+def test_hll_merge_matches_a_single_sketch():
+    whole, left, right = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+    for v in range(20000):
+        whole.add(v)
+        (left if v % 3 else right).add(v)
+        if v % 10 == 0:
+            right.add(v)
+    left.merge_blob(right.to_bytes())
+    assert left.count() == whole.count()
+
+
+def test_hll_sparse_and_dense_encodings_round_trip():
+    for n in (10, 3000):
+        sketch = HyperLogLog(12)
+        for v in range(n):
+            sketch.add(v)
+        assert Sketcher("hll", 12).loads(sketch.to_bytes()).registers == sketch.registers
+
+
+def test_mismatched_sketches_do_not_merge():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge_blob(HyperLogLog(14).to_bytes())
+    with pytest.raises(ValueError):
+        ExactSet().merge_blob(HyperLogLog(12).to_bytes())
@@ -0,0 +1,95 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from snapshots import SnapshotExporter
+
+pytest.importorskip("pyarrow")
+
+ODD_BRANCH = 'Café / "Roof" 100%'
+
+
+@pytest.fixture
+def source(tmp_path, synth_sqlite, connect_fetch):
+    """A writable copy of the synthetic view, with a NULL and an awkwardly named branch: ``(path, fetch)``."""
+    path = str(tmp_path / "source.sqlite3")
+    shutil.copyfile(synth_sqlite, path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE vwSaleDetail SET BranchName = NULL WHERE BranchName = 'Branch 1' AND VoucherDate = '2024-12-02'")
+        conn.execute("UPDATE vwSaleDetail SET BranchName = ? WHERE BranchName = 'Branch 3' AND VoucherDate = '2024-12-03'",
+                     [ODD_BRANCH])
+    return path, connect_fetch(path)
+
+
+def files(root):
+    found = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(".parquet"):
+                path = os.path.join(dirpath, name)
+                found[os.path.relpath(path, root)] = os.stat(path).st_mtime_ns
+    return found
+
+
+def snapshot_rows(root, sql):
+    from backends import DuckDBBackend
+    conn = DuckDBBackend(root).connect()
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    return sorted(cursor.fetchall(), key=repr)
+
+
+TOTALS = ("SELECT BranchName, CAST(VoucherDate AS VARCHAR), COUNT(*), ROUND(SUM(Amount), 2) "
+          "FROM vwSaleDetail WHERE VoucherDate < '2024-12-08' GROUP BY BranchName, VoucherDate")
+
+
+def test_export_round_trips_through_duckdb(tmp_path, source):
+    pytest.importorskip("duckdb")
+    path, fetch = source
+    root = str(tmp_path / "snap")
+    result = SnapshotExporter(root, fetch, chunk_days=3).export("2024-11-26", "2024-12-08")
+    assert result["written"] == len(files(root)) and result["unchanged"] == result["removed"] == 0
+    assert os.path.exists(os.path.join(root, "VoucherDate=2024-12-02", "BranchName=NULL", "part-0.parquet"))
+    assert snapshot_rows(root, TOTALS) == sorted(fetch(TOTALS.replace("CAST(VoucherDate AS VARCHAR)", "VoucherDate")),
+                                                 key=repr)
+    branches = snapshot_rows(root, "SELECT DISTINCT BranchName FROM vwSaleDetail WHERE VoucherDate = '2024-12-03'")
+    assert (ODD_BRANCH,) in branches
+
+
+def test_incremental_export_rewrites_only_changed_partitions(tmp_path, source):
+    path, fetch = source
+    root = str(tmp_path / "snap")
+    exporter = SnapshotExporter(root, fetch, chunk_days=3)
+    exporter.export("2024-11-26", "2024-12-08")
+    before = files(root)
+
+    again = exporter.export("2024-11-26", "2024-12-08")
+    assert again["written"] == again["removed"] == 0 and again["unchanged"] == len(before)
+    assert files(root) == before
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE vwSaleDetail SET Amount = Amount + 1 WHERE BranchName IS NULL AND VoucherDate = '2024-12-02'")
+        conn.execute("UPDATE vwSaleDetail SET Qty = Qty + 1 WHERE BranchName = ? AND VoucherDate = '2024-12-03'",
+                     [ODD_BRANCH])
+        conn.execute("DELETE FROM vwSaleDetail WHERE BranchName = 'Branch 2' AND VoucherDate = '2024-12-04'")
+    result = exporter.export("2024-11-26", "2024-12-08")
+    assert (result["written"], result["removed"]) == (2, 1)
+    after = files(root)
+    changed = {name for name in before.keys() & after.keys() if before[name] != after[name]}
+    assert changed == {exporter.partition_path(day, branch)[len(root) + 1:]
+                       for day, branch in (("2024-12-02", None), ("2024-12-03", ODD_BRANCH))}
+    assert before.keys() - after.keys() == {exporter.partition_path("2024-12-04", "Branch 2")[len(root) + 1:]}
+    assert exporter.coverage() == ("2024-11-26", "2024-12-07")
+
+
+def test_cli_resumes_from_the_last_export(tmp_path, app_main, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snap"))
+    runner = app_main.app.test_cli_runner()
+    assert "pass --since" in runner.invoke(args=["export-snapshots"]).output
+    first = runner.invoke(args=["export-snapshots", "--since", "2024-12-20", "--through", "2025-01-01"])
+    assert first.exit_code == 0 and "'unchanged': 0" in first.output
+    resumed = runner.invoke(args=["export-snapshots", "--through", "2025-01-01", "--recheck-days", "2"])
+    assert resumed.exit_code == 0 and "'written': 0" in resumed.output
+    assert "covers 2024-12-20 to 2024-12-31" in resumed.output
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+URLS = ["/avg-spending", "/table-spending?start=2024-11-25&end=2024-12-31"]
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_ndjson_rows_match_json(client, url):
+    rows = client.get(url).get_json()
+    # Streamed bodies hold their admission slot until closed
+    with client.get(url + ("&" if "?" in url else "?") + "format=ndjson") as resp:
+        assert resp.status_code == 200 and resp.mimetype == "application/x-ndjson"
+        lines = resp.get_data(as_text=True).splitlines()
+    assert len(lines) == len(rows) > 0
+    assert [json.loads(line) for line in lines] == rows
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_json_stream_is_one_array(client, url):
+    rows = client.get(url).get_json()
+    with client.get(url + ("&" if "?" in url else "?") + "format=json-stream") as resp:
+        assert json.loads(resp.get_data(as_text=True)) == rows
+
+
+def test_batches_smaller_than_the_result(client, app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "STREAM_BATCH_SIZE", 5)
+    rows = client.get("/avg-spending").get_json()
+    assert len(rows) > 5
+    with client.get("/avg-spending?format=json-stream") as resp:
+        assert json.loads(resp.get_data(as_text=True)) == rows
+    with client.get("/avg-spending?format=ndjson") as resp:
+        assert [json.loads(line) for line in resp.get_data(as_text=True).splitlines()] == rows
+
+
+def test_abandoned_stream_returns_its_connection(client, app_main):
+    resp = client.get("/avg-spending?format=ndjson", buffered=False)
+    next(iter(resp.response))
+    resp.close()
+    assert app_main.db_pool.stats()["in_use"] == 0
+    assert app_main.admission.stats()["routes"]["avg_spending"]["running"] == 0
@@ -0,0 +1,15 @@
+import json
+
+
+def test_trace_log_names_arguments_without_values(client, app_main, tmp_path, monkeypatch):
+    log = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(app_main.tracer, "log", str(log))
+    monkeypatch.setattr(app_main.tracer, "slow_ms", 0.0)
+    response = client.get("/top-items?start=2024-12-01&end=2024-12-07&branch=Branch%202&n=5")
+    assert response.status_code == 200
+    assert "trace;desc=" in response.headers["Server-Timing"]
+    line = log.read_text().strip().splitlines()[-1]
+    entry = json.loads(line)
+    assert entry["args"] == ["branch", "end", "n", "start"]
+    assert "Branch 2" not in line and "2024-12-01" not in line
+    assert all(isinstance(p, str) for span in entry["spans"] for p in span.get("params", []))
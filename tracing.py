@@ -0,0 +1,125 @@
+# tracing.py
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from flask import request
+
+from metrics import current
+
+# Server-Timing metric name and description per timer phase
+TIMING_NAMES = {
+    "connect": ("pool", "Pool wait"),
+    "execute": ("sql", "SQL execute"),
+    "fetch": ("fetch", "Fetch rows"),
+    "serialize": ("json", "JSON encode"),
+}
+
+
+def sql_fingerprint(sql):
+    """Short stable id for a statement, ignoring whitespace."""
+    return hashlib.sha1(" ".join(sql.split()).encode()).hexdigest()[:12]
+
+
+def param_shape(params):
+    """Parameter types without their values, e.g. ``["datetime", "str"]``."""
+    return [type(p).__name__ for p in params]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _span_attrs(attrs):
+    out = {}
+    for name, value in (attrs or {}).items():
+        if name == "sql":
+            out["sql"] = sql_fingerprint(value)
+        elif name == "params":
+            out["params"] = param_shape(value)
+        else:
+            out[name] = value
+    return out
+
+
+def server_timing(timer, trace_id=None):
+    parts = []
+    for phase, seconds in timer.phases.items():
+        name, desc = TIMING_NAMES.get(phase, (phase, phase))
+        parts.append(f'{name};dur={_ms(seconds)};desc="{desc}"')
+    for name, value in timer.notes:
+        parts.append(f'{name};desc="{value}"')
+    parts.append(f"total;dur={_ms(time.perf_counter() - timer.started)}")
+    if trace_id:
+        parts.append(f'trace;desc="{trace_id}"')
+    return ", ".join(parts)
+
+
+class Tracer:
+    """``Server-Timing`` on every response plus an optional span log.
+
+    With ``log`` set (a file path, or ``-`` for stdout) each request slower
+    than ``slow_ms`` is written as one JSON line listing its spans, with
+    SQL fingerprints, parameter types and query argument names but never
+    parameter or argument values. The line's ``id`` is also sent as
+    ``Server-Timing: trace;desc=...`` so a slow call seen in the browser
+    can be found in the log.
+    """
+
+    def __init__(self, log=None, slow_ms=0.0):
+        self.log = log
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix="TRACE_"):
+        env = os.environ
+        return cls(log=env.get(prefix + "LOG") or None, slow_ms=float(env.get(prefix + "SLOW_MS", 0)))
+
+    def init_app(self, app):
+        """Register right after :class:`metrics.Metrics`, before hooks that may answer early."""
+
+        @app.before_request
+        def _start_spans():
+            timer = current()
+            if timer is not None and self.log:
+                timer.spans = []
+
+        @app.after_request
+        def _server_timing(response):
+            timer = current()
+            if timer is None:
+                return response
+            trace_id = uuid.uuid4().hex[:16] if self.log else None
+            response.headers["Server-Timing"] = server_timing(timer, trace_id)
+            if trace_id:
+                entry = {"id": trace_id, "method": request.method, "path": request.path,
+                         "args": sorted(request.args), "status": response.status_code}
+                if response.is_streamed:
+                    response.call_on_close(lambda: self.write(entry, timer))
+                else:
+                    self.write(entry, timer)
+            return response
+
+    def write(self, entry, timer):
+        ms = _ms(time.perf_counter() - timer.started)
+        if ms < self.slow_ms:
+            return
+        entry["ms"] = ms
+        entry["rows"] = timer.rows
+        entry["notes"] = [f"{name}:{value}" for name, value in timer.notes]
+        entry["spans"] = [{"name": name, "at": _ms(started - timer.started), "ms": _ms(seconds), **_span_attrs(attrs)}
+                          for name, started, seconds, attrs in sorted(timer.spans or (), key=lambda s: s[1])]
+        line = json.dumps(entry, default=str)
+        try:
+            with self._lock:
+                if self.log == "-":
+                    print(line, flush=True)
+                else:
+                    with open(self.log, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+        except OSError as e:
+            print("❌ Trace log Error:", e)